@@ -0,0 +1,42 @@
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    Настраивает новое соединение с базой данных (обработчик сигнала connection_created).
+
+    Для SQLite включает журнал SQLITE_JOURNAL_MODE (по умолчанию WAL: читатели не блокируют писателя
+    и не блокируются им), режим синхронизации SQLITE_SYNCHRONOUS и ожидание блокировки
+    SQLITE_BUSY_TIMEOUT секунд вместо немедленной ошибки "database is locked". Режим журнала
+    сохраняется в файле базы данных; для базы данных в памяти он не меняется.
+
+    Args:
+        sender (type): Класс обертки соединения.
+        connection (BaseDatabaseWrapper): Обертка нового соединения.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT * 1000)}')
+        if settings.SQLITE_JOURNAL_MODE and not connection.is_in_memory_db():
+            cursor.execute(f'PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}')
+        if settings.SQLITE_SYNCHRONOUS:
+            cursor.execute(f'PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}')
+
+
+def sqlite_pragmas(connection):
+    """
+    Возвращает текущие настройки соединения SQLite, которые задает configure_connection.
+
+    Args:
+        connection (BaseDatabaseWrapper): Обертка соединения.
+
+    Returns:
+        dict: Значения journal_mode, synchronous и busy_timeout (в миллисекундах).
+    """
+    pragmas = {}
+    with connection.cursor() as cursor:
+        for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+            cursor.execute(f'PRAGMA {name}')
+            pragmas[name] = cursor.fetchone()[0]
+    return pragmas
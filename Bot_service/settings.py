@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bot.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,17 +77,54 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Bot_service.wsgi.application'
+ASGI_APPLICATION = 'Bot_service.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE=postgresql переключает проект на PostgreSQL (параметры DATABASE_NAME, DATABASE_USER,
+# DATABASE_PASSWORD, DATABASE_HOST, DATABASE_PORT). Соединения переиспользуются DATABASE_CONN_MAX_AGE секунд
+# и проверяются перед повторным использованием. За PgBouncer в режиме transaction укажите
+# DATABASE_PGBOUNCER=1: серверные курсоры не переживают смену соединения между транзакциями.
+# Соединения SQLite настраивает Bot_service.db.configure_connection: журнал SQLITE_JOURNAL_MODE,
+# синхронизация SQLITE_SYNCHRONOUS и ожидание блокировки SQLITE_BUSY_TIMEOUT секунд. Бэкенд Bot_service.sqlite
+# начинает транзакции командой BEGIN SQLITE_TRANSACTION_MODE (IMMEDIATE: блокировка записи берется сразу
+# и ожидается, а не завершается ошибкой "database is locked"; пустое значение - BEGIN DEFERRED, как в Django).
+
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite3')
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', 60))
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5))
+SQLITE_TRANSACTION_MODE = os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DATABASE_NAME', 'bot_service'),
+            'USER': os.getenv('DATABASE_USER', ''),
+            'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
+            'HOST': os.getenv('DATABASE_HOST', ''),
+            'PORT': os.getenv('DATABASE_PORT', ''),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DATABASE_PGBOUNCER', '') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'Bot_service.sqlite',
+            'NAME': os.getenv('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
 
 
 # Password validation
@@ -132,11 +170,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'bot.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS':(
         'rest_framework.schemas.coreapi.AutoSchema',
     ),
+    # Попытки входа, получения токена и регистрации (bot.throttling); счетчики хранятся в кэше Django.
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('LOGIN_THROTTLE_RATE', '20/min'),
+        'login_username': os.getenv('LOGIN_USERNAME_THROTTLE_RATE', '5/min'),
+    },
 }
 
 REST_USE_JWT = True
@@ -147,4 +190,196 @@ SWAGGER_SETTINGS = {
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 API = os.getenv('OPENWEATHERMAP_API_KEY')
-NEWS_API = os.getenv('NEWS_API_KEY')
\ No newline at end of file
+NEWS_API = os.getenv('NEWS_API_KEY')
+
+
+# Weather cache
+# WEATHER_CACHE_ALIAS - алиас из CACHES для общего кэша между процессами бота (пусто - только локальный кэш)
+
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', 1024))
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', 600))
+WEATHER_CACHE_NEGATIVE_TTL = int(os.getenv('WEATHER_CACHE_NEGATIVE_TTL', 60))
+WEATHER_CACHE_STALE_TTL = int(os.getenv('WEATHER_CACHE_STALE_TTL', 3600))
+WEATHER_CACHE_ALIAS = os.getenv('WEATHER_CACHE_ALIAS')
+
+
+# API token cache
+# Проверенные токены доступа хранятся в памяти процесса не дольше AUTH_TOKEN_CACHE_TTL секунд: изменения
+# пользователя в других процессах (например, блокировка через админку) вступают в силу не позже этого срока.
+
+AUTH_TOKEN_CACHE_TTL = float(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000))
+
+
+# News pool
+
+NEWS_DEFAULT_COUNTRY = os.getenv('NEWS_DEFAULT_COUNTRY', 'us')
+NEWS_POOL_INTERVAL = int(os.getenv('NEWS_POOL_INTERVAL', 600))
+NEWS_POOL_JITTER = float(os.getenv('NEWS_POOL_JITTER', 0.1))
+NEWS_POOL_MAX_BACKOFF = int(os.getenv('NEWS_POOL_MAX_BACKOFF', 900))
+NEWS_POOL_FIRST_WAIT = float(os.getenv('NEWS_POOL_FIRST_WAIT', 5))
+
+
+# Bot runtime
+# BOT_MEDIA_DIR - каталог с локальными копиями изображений бота (<BOT_MEDIA_DIR>/weather/sunny.jpg и т.д.);
+# пусто - первая отправка изображения по URL.
+
+BOT_CONCURRENCY = int(os.getenv('BOT_CONCURRENCY', 64))
+BOT_HTTP_POOL_SIZE = int(os.getenv('BOT_HTTP_POOL_SIZE', 32))
+BOT_HTTP_TIMEOUT = float(os.getenv('BOT_HTTP_TIMEOUT', 10))
+OPENWEATHERMAP_URL = os.getenv('OPENWEATHERMAP_URL', 'https://api.openweathermap.org/data/2.5/weather')
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/top-headlines')
+BOT_MEDIA_DIR = os.getenv('BOT_MEDIA_DIR')
+
+
+# Bot polling
+# Offset getUpdates сохраняется в БД (модель BotState) раз в BOT_OFFSET_FLUSH_INTERVAL секунд и при остановке;
+# по SIGTERM бот дообрабатывает принятые обновления не дольше BOT_SHUTDOWN_TIMEOUT секунд.
+
+BOT_POLL_TIMEOUT = int(os.getenv('BOT_POLL_TIMEOUT', 10))
+BOT_POLL_LIMIT = int(os.getenv('BOT_POLL_LIMIT', 100))
+BOT_OFFSET_FLUSH_INTERVAL = float(os.getenv('BOT_OFFSET_FLUSH_INTERVAL', 1))
+BOT_SHUTDOWN_TIMEOUT = float(os.getenv('BOT_SHUTDOWN_TIMEOUT', 30))
+
+
+# Bot worker processes
+# BOT_WORKERS > 1: процесс приема обновлений распределяет их по BOT_WORKERS процессам по chat_id.
+# BOT_WORKER_QUEUE_SIZE - очередь процесса в пачках getUpdates; процесс, не обновлявший отметку
+# активности BOT_WORKER_HEALTH_TIMEOUT секунд, перезапускается. Процессы удаляют обработанные обновления
+# из PendingUpdate раз в BOT_OFFSET_FLUSH_INTERVAL секунд.
+
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', 1))
+BOT_WORKER_QUEUE_SIZE = int(os.getenv('BOT_WORKER_QUEUE_SIZE', 100))
+BOT_WORKER_HEALTH_TIMEOUT = float(os.getenv('BOT_WORKER_HEALTH_TIMEOUT', 30))
+
+
+# Upstream APIs
+# Таймауты, повторы и автоматический выключатель для запросов к OpenWeatherMap и newsapi.
+# Выключатель размыкается после UPSTREAM_BREAKER_THRESHOLD неудач подряд на UPSTREAM_BREAKER_RESET секунд.
+
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 3))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 5))
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', 2))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv('UPSTREAM_RETRY_BACKOFF', 0.2))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', 5))
+UPSTREAM_BREAKER_RESET = float(os.getenv('UPSTREAM_BREAKER_RESET', 30))
+
+
+# Telegram send queue
+# Ограничения частоты отправки сообщений (сообщений в секунду): OUTBOX_GLOBAL_RATE для всех чатов
+# с пачкой до OUTBOX_GLOBAL_BURST, OUTBOX_CHAT_RATE в личном чате и OUTBOX_GROUP_RATE в группе; 0 - без ограничения.
+
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 16))
+OUTBOX_GLOBAL_RATE = float(os.getenv('OUTBOX_GLOBAL_RATE', 25))
+OUTBOX_GLOBAL_BURST = float(os.getenv('OUTBOX_GLOBAL_BURST', 5))
+OUTBOX_CHAT_RATE = float(os.getenv('OUTBOX_CHAT_RATE', 1))
+OUTBOX_GROUP_RATE = float(os.getenv('OUTBOX_GROUP_RATE', 20 / 60))
+OUTBOX_MAX_QUEUE = int(os.getenv('OUTBOX_MAX_QUEUE', 100000))
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv('OUTBOX_DRAIN_TIMEOUT', 30))
+
+
+# Broadcasts
+# Рассылка обходит реестр чатов кусками по BROADCAST_CHUNK_SIZE и сохраняет прогресс после каждого куска.
+# Рассылку, прогресс которой не сохранялся BROADCAST_STALE_AFTER секунд, продолжает другой процесс бота.
+# Во время отправки куска отметка активности обновляется раз в BROADCAST_HEARTBEAT_INTERVAL секунд.
+# BROADCAST_RUNNER=0 отключает выполнение рассылок в процессе бота; в многопроцессном режиме (BOT_WORKERS > 1)
+# рассылки выполняет только первый процесс-обработчик.
+
+BROADCAST_CHUNK_SIZE = int(os.getenv('BROADCAST_CHUNK_SIZE', 1000))
+BROADCAST_POLL_INTERVAL = float(os.getenv('BROADCAST_POLL_INTERVAL', 5))
+BROADCAST_STALE_AFTER = float(os.getenv('BROADCAST_STALE_AFTER', 300))
+BROADCAST_HEARTBEAT_INTERVAL = float(os.getenv('BROADCAST_HEARTBEAT_INTERVAL', 30))
+BROADCAST_RUNNER = os.getenv('BROADCAST_RUNNER', '1') == '1'
+
+
+# Telegram webhook
+# TELEGRAM_WEBHOOK_SECRET передается Telegram в setWebhook и проверяется в заголовке
+# X-Telegram-Bot-Api-Secret-Token каждого входящего обновления.
+
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+TELEGRAM_WEBHOOK_MAX_QUEUE = int(os.getenv('TELEGRAM_WEBHOOK_MAX_QUEUE', 10000))
+TELEGRAM_BOT_API_URL = os.getenv('TELEGRAM_BOT_API_URL')
+
+
+# Message persistence
+# MESSAGE_WRITE_MODE: best_effort - ответ отправляется, не дожидаясь записи сообщения в БД;
+# flush_before_reply - обработчик ждет сохранения пачки с сообщением перед ответом.
+
+MESSAGE_WRITE_MODE = os.getenv('MESSAGE_WRITE_MODE', 'best_effort')
+MESSAGE_BUFFER_MAX_BATCH = int(os.getenv('MESSAGE_BUFFER_MAX_BATCH', 500))
+MESSAGE_BUFFER_MAX_DELAY = float(os.getenv('MESSAGE_BUFFER_MAX_DELAY', 1.0))
+MESSAGE_BUFFER_MAX_QUEUE = int(os.getenv('MESSAGE_BUFFER_MAX_QUEUE', 100000))
+MESSAGE_BULK_BATCH_SIZE = int(os.getenv('MESSAGE_BULK_BATCH_SIZE', 500))
+
+
+# Dashboard
+# DASHBOARD_PUSH_INTERVAL - минимальный интервал между вычислениями данных для WebSocket /ws/dashboard/, в секундах
+# DASHBOARD_PUBLISHER - embedded: изменения рассылает ASGI-процесс, пока есть подписчики;
+# external: изменения рассылает команда publish_dashboard (несколько ASGI-процессов с общим слоем каналов)
+
+DASHBOARD_WINDOW_HOURS = int(os.getenv('DASHBOARD_WINDOW_HOURS', 24))
+DASHBOARD_PUSH_INTERVAL = float(os.getenv('DASHBOARD_PUSH_INTERVAL', 2))
+DASHBOARD_PUBLISHER = os.getenv('DASHBOARD_PUBLISHER', 'embedded')
+
+
+# Channel layer
+# Без CHANNEL_REDIS_URL используется слой каналов в памяти процесса (один ASGI-процесс, локальная разработка);
+# с CHANNEL_REDIS_URL нужен пакет channels_redis
+
+CHANNEL_REDIS_URL = os.getenv('CHANNEL_REDIS_URL', '')
+
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [CHANNEL_REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+
+# Message retention
+# Сообщения старше MESSAGE_RETENTION_DAYS суток команда archive_messages переносит в сжатые файлы NDJSON
+# в MESSAGE_ARCHIVE_DIR (файл на сутки) и удаляет из таблицы пачками по MESSAGE_ARCHIVE_DELETE_BATCH строк
+# с паузой MESSAGE_ARCHIVE_DELETE_PAUSE секунд между пачками
+
+MESSAGE_RETENTION_DAYS = int(os.getenv('MESSAGE_RETENTION_DAYS', 90))
+MESSAGE_ARCHIVE_DIR = os.getenv('MESSAGE_ARCHIVE_DIR', BASE_DIR / 'archive')
+MESSAGE_ARCHIVE_DELETE_BATCH = int(os.getenv('MESSAGE_ARCHIVE_DELETE_BATCH', 1000))
+MESSAGE_ARCHIVE_DELETE_PAUSE = float(os.getenv('MESSAGE_ARCHIVE_DELETE_PAUSE', 0.01))
+
+
+# Message search
+# GET /api/messages/search/?order=rank ранжирует все совпадения: время поиска очень частого слова растет
+# с их числом (около 0,75 с для самого частого слова в 1 млн сообщений, bench_search). SEARCH_RANK_WINDOW > 0
+# ограничивает ранжирование последними совпадениями; ответ с неполным ранжированием содержит "truncated": true
+
+SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', 0))
+
+
+# Message API pagination
+
+MESSAGE_PAGE_SIZE = int(os.getenv('MESSAGE_PAGE_SIZE', 100))
+MESSAGE_PAGE_MAX_SIZE = int(os.getenv('MESSAGE_PAGE_MAX_SIZE', 1000))
+
+
+# Bulk message ingest
+# Количество строк, сохраняемых одной транзакцией при массовой загрузке через POST /api/messages/.
+
+MESSAGE_INGEST_BATCH_SIZE = int(os.getenv('MESSAGE_INGEST_BATCH_SIZE', 20000))
+
+
+# Metrics
+# GET /metrics отдает показатели запросов к API в текстовом формате Prometheus (bot.metrics.MetricsMiddleware);
+# если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer <METRICS_TOKEN>. Запросы дольше
+# SLOW_REQUEST_THRESHOLD секунд (0 - не записывать) записываются в журнал bot.metrics вместе с SQL
+# (не больше SLOW_REQUEST_MAX_QUERIES запросов).
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 1))
+SLOW_REQUEST_MAX_QUERIES = int(os.getenv('SLOW_REQUEST_MAX_QUERIES', 50))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд SQLite, который начинает транзакции командой BEGIN SQLITE_TRANSACTION_MODE.
+
+    Django 4.2 начинает транзакцию (transaction.atomic) командой BEGIN, то есть DEFERRED: блокировка записи
+    берется при первом изменении. Если к этому моменту другой поток уже записал данные, в режиме WAL SQLite
+    не может повысить блокировку транзакции и сразу возвращает "database is locked", не дожидаясь
+    busy_timeout. BEGIN IMMEDIATE берет блокировку записи в начале транзакции и при занятой базе данных
+    ждет ее не дольше SQLITE_BUSY_TIMEOUT секунд. Все транзакции проекта что-то записывают, поэтому
+    читатели вне транзакций этим не затрагиваются.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        mode = settings.SQLITE_TRANSACTION_MODE
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
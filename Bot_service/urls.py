@@ -17,7 +17,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path
-from bot.views import TokenObtainPairView, MessageDetailView, MessageListCreateView, DashboardView, UserLoginView, UserRegistrationView
+from bot.views import TokenObtainPairView, MessageDetailView, MessageListCreateView, DashboardView, MessageHistoryView, MessageExportView, MessageSearchView, UserLoginView, UserRegistrationView, TelegramWebhookView, BroadcastListCreateView, BroadcastDetailView, BroadcastCancelView, MetricsView
 
 
 from rest_framework import permissions
@@ -38,10 +38,18 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token-obtain-pair'),
     path('api/messages/', MessageListCreateView.as_view(), name='message-list-create'),
+    path('api/messages/history/', MessageHistoryView.as_view(), name='message-history'),
+    path('api/messages/export/', MessageExportView.as_view(), name='message-export'),
+    path('api/messages/search/', MessageSearchView.as_view(), name='message-search'),
     path('api/messages/<int:pk>/', MessageDetailView.as_view(), name='message-detail'),
     path('api/dashboard/', DashboardView.as_view(), name='dashboard'),
     path('api/register/', UserRegistrationView.as_view(), name='user-register'),
     path('api/login/', UserLoginView.as_view(), name='user-login'),
+    path('api/broadcasts/', BroadcastListCreateView.as_view(), name='broadcast-list-create'),
+    path('api/broadcasts/<int:pk>/', BroadcastDetailView.as_view(), name='broadcast-detail'),
+    path('api/broadcasts/<int:pk>/cancel/', BroadcastCancelView.as_view(), name='broadcast-cancel'),
+    path('api/telegram/webhook/', TelegramWebhookView.as_view(), name='telegram-webhook'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class BotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bot'
+
+    def ready(self):
+        from Bot_service.db import configure_connection
+
+        from .authentication import invalidate_user_tokens
+        from .metrics import track_connection
+
+        connection_created.connect(configure_connection, dispatch_uid='configure_connection')
+        connection_created.connect(track_connection, dispatch_uid='track_connection')
+        post_save.connect(invalidate_user_tokens, sender=settings.AUTH_USER_MODEL,
+                          dispatch_uid='invalidate_user_tokens_save')
+        post_delete.connect(invalidate_user_tokens, sender=settings.AUTH_USER_MODEL,
+                            dispatch_uid='invalidate_user_tokens_delete')
@@ -0,0 +1,267 @@
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .filters import date_range, match_conditions, match_messages
+from .models import Message, MessageArchive
+from .serializers import MESSAGE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = MESSAGE_FIELDS
+
+# Фильтры истории и поля описи с различными значениями поля в файле архива.
+ARCHIVE_INDEXES = {'chat_id': 'chat_ids', 'user_id': 'user_ids', 'command': 'commands'}
+
+
+def day_start(day):
+    """
+    Возвращает начало суток (UTC).
+
+    Args:
+        day (date): Сутки.
+
+    Returns:
+        datetime: Полночь UTC.
+    """
+    return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def archive_cutoff(days, now=None):
+    """
+    Возвращает границу срока хранения: сообщения раньше нее переносятся в архив.
+
+    Граница округляется вниз до начала суток (UTC), чтобы в архив попадали только целые сутки.
+
+    Args:
+        days (int): Срок хранения сообщений в таблице Message, в сутках.
+        now (datetime, optional): Текущее время.
+
+    Returns:
+        datetime: Начало суток (UTC).
+    """
+    now = timezone.localtime(now or timezone.now(), dt_timezone.utc)
+    return day_start((now - timedelta(days=days)).date())
+
+
+def archive_path(day):
+    """
+    Возвращает путь файла архива за сутки относительно MESSAGE_ARCHIVE_DIR.
+
+    Args:
+        day (date): Сутки (UTC).
+
+    Returns:
+        str: Путь вида "2023/08/messages-2023-08-01.ndjson.gz".
+    """
+    return f'{day:%Y}/{day:%m}/messages-{day:%Y-%m-%d}.ndjson.gz'
+
+
+def archived_until():
+    """
+    Возвращает границу архива: все сообщения раньше нее читаются из файлов архива.
+
+    Returns:
+        datetime: Начало суток после последних архивных суток или None, если архив пуст.
+    """
+    day = MessageArchive.objects.aggregate(day=Max('day'))['day']
+    return day_start(day + timedelta(days=1)) if day is not None else None
+
+
+def write_archive(day, chunk_size=2000):
+    """
+    Записывает сообщения за сутки в сжатый файл NDJSON и создает запись описи.
+
+    Сообщения записываются в порядке (date, id) во временный файл, который после fsync переименовывается
+    в файл архива, поэтому прерванная запись не оставляет неполного файла архива. В опись записываются
+    различные значения полей ARCHIVE_INDEXES, по которым история и выгрузка пропускают файлы без
+    подходящих сообщений.
+
+    Args:
+        day (date): Сутки (UTC).
+        chunk_size (int): Количество строк, читаемых из базы данных за раз.
+
+    Returns:
+        MessageArchive: Запись описи или None, если за сутки нет сообщений.
+    """
+    start = day_start(day)
+    rows = (
+        Message.objects.filter(date__gte=start, date__lt=start + timedelta(days=1))
+        .order_by('date', 'id').values_list(*ARCHIVE_FIELDS).iterator(chunk_size=chunk_size)
+    )
+    name = archive_path(day)
+    path = Path(settings.MESSAGE_ARCHIVE_DIR) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+
+    count, first_id, last_id = 0, None, None
+    values = {name: set() for name in ARCHIVE_INDEXES}
+    with open(temporary, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+            for row in rows:
+                record = dict(zip(ARCHIVE_FIELDS, row))
+                record['date'] = timezone.localtime(record['date'], dt_timezone.utc).isoformat()
+                out.write(json.dumps(record, ensure_ascii=False).encode() + b'\n')
+                count += 1
+                first_id = record['id'] if first_id is None else min(first_id, record['id'])
+                last_id = record['id'] if last_id is None else max(last_id, record['id'])
+                for key in values:
+                    if record[key] is not None:
+                        values[key].add(record[key])
+        raw.flush()
+        os.fsync(raw.fileno())
+    if not count:
+        temporary.unlink()
+        return None
+    os.replace(temporary, path)
+    indexes = {field: sorted(values[key]) for key, field in ARCHIVE_INDEXES.items()}
+    return MessageArchive.objects.create(day=day, path=name, rows=count, first_id=first_id, last_id=last_id,
+                                         size=path.stat().st_size, **indexes)
+
+
+def delete_archived(entry, batch_size, pause=0.0):
+    """
+    Удаляет из таблицы Message сообщения, записанные в файл архива, небольшими пачками.
+
+    Каждая пачка удаляется отдельной короткой транзакцией, а между пачками делается пауза, поэтому
+    сохранение новых сообщений ботом не ждет удаления архива целиком.
+
+    Args:
+        entry (MessageArchive): Запись описи.
+        batch_size (int): Количество строк, удаляемых одной транзакцией.
+        pause (float): Пауза между пачками, в секундах.
+
+    Returns:
+        int: Количество удаленных строк.
+    """
+    start = day_start(entry.day)
+    archived = Message.objects.filter(date__gte=start, date__lt=start + timedelta(days=1),
+                                      id__gte=entry.first_id, id__lte=entry.last_id)
+    deleted = 0
+    while True:
+        ids = list(archived.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Message.objects.filter(id__in=ids).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+def archive_messages(cutoff, batch_size=None, pause=None, progress=None):
+    """
+    Переносит сообщения раньше cutoff из таблицы Message в файлы архива по суткам.
+
+    Сутки обрабатываются по возрастанию: файл архива, запись описи, затем удаление строк пачками.
+    Если предыдущий запуск был прерван во время удаления, оставшиеся строки уже записанных суток
+    удаляются без повторной записи файла. Агрегаты MessageRollup и реестр чатов не изменяются:
+    они продолжают учитывать архивные сообщения.
+
+    Args:
+        cutoff (datetime): Граница срока хранения (начало суток UTC, см. archive_cutoff).
+        batch_size (int, optional): Строк в пачке удаления, по умолчанию settings.MESSAGE_ARCHIVE_DELETE_BATCH.
+        pause (float, optional): Пауза между пачками, по умолчанию settings.MESSAGE_ARCHIVE_DELETE_PAUSE.
+        progress (callable, optional): Вызывается после каждых суток с записью описи и количеством
+                                       удаленных строк.
+
+    Returns:
+        tuple: (количество обработанных суток, количество удаленных строк).
+    """
+    batch_size = batch_size or settings.MESSAGE_ARCHIVE_DELETE_BATCH
+    pause = settings.MESSAGE_ARCHIVE_DELETE_PAUSE if pause is None else pause
+    days = deleted_total = 0
+    after = None
+    while True:
+        remaining = Message.objects.filter(date__lt=cutoff)
+        if after is not None:
+            remaining = remaining.filter(date__gte=after)
+        oldest = remaining.order_by('date').values_list('date', flat=True).first()
+        if oldest is None:
+            return days, deleted_total
+        day = timezone.localtime(oldest, dt_timezone.utc).date()
+        after = day_start(day + timedelta(days=1))
+
+        entry = MessageArchive.objects.filter(day=day).first() or write_archive(day)
+        if entry is None:
+            continue
+        deleted = delete_archived(entry, batch_size, pause)
+        if Message.objects.filter(date__gte=day_start(day), date__lt=after).exists():
+            logger.warning('Сообщения за %s, сохраненные после записи файла архива, остались в таблице Message '
+                           'и не видны в истории и выгрузке', day)
+        days += 1
+        deleted_total += deleted
+        if progress is not None:
+            progress(entry, deleted)
+
+
+def read_archive(entry):
+    """
+    Читает сообщения из файла архива в порядке (date, id).
+
+    Args:
+        entry (MessageArchive): Запись описи.
+
+    Returns:
+        iterator: Словари с полями ARCHIVE_FIELDS, дата - datetime (UTC).
+    """
+    with gzip.open(Path(settings.MESSAGE_ARCHIVE_DIR) / entry.path, 'rb') as lines:
+        for line in lines:
+            record = json.loads(line)
+            record['date'] = datetime.fromisoformat(record['date'])
+            yield record
+
+
+def archived_rows(params, cursor=None, after_id=None):
+    """
+    Читает из архива сообщения, подходящие под фильтры запроса, в порядке (date, id).
+
+    Читаются только файлы суток, попадающих в интервал date_from / date_to и расположенных после курсора;
+    файлы, в описи которых нет значения фильтра chat_id, user_id или command, пропускаются без чтения.
+
+    Args:
+        params (QueryDict): Параметры запроса с фильтрами, как для filter_messages.
+        cursor (tuple, optional): Позиция (date, id): выводить только сообщения после нее.
+        after_id (int, optional): Выводить только сообщения с id больше указанного.
+
+    Returns:
+        iterator: Словари с полями ARCHIVE_FIELDS.
+
+    Raises:
+        ValidationError: Если значение параметра некорректно.
+    """
+    match = match_messages(params)
+    date_from, date_to = date_range(params)
+    entries = MessageArchive.objects.order_by('day')
+    if date_from is not None:
+        entries = entries.filter(day__gte=timezone.localtime(date_from, dt_timezone.utc).date())
+    if date_to is not None:
+        last = date_to - timedelta(microseconds=1)
+        entries = entries.filter(day__lte=timezone.localtime(last, dt_timezone.utc).date())
+    if cursor is not None:
+        entries = entries.filter(day__gte=timezone.localtime(cursor[0], dt_timezone.utc).date())
+    if after_id is not None:
+        entries = entries.filter(last_id__gt=after_id)
+    conditions = [(ARCHIVE_INDEXES[name], value) for name, value in match_conditions(params)
+                  if name in ARCHIVE_INDEXES]
+    entries = [entry for entry in entries if all(
+        getattr(entry, field) is None or value in getattr(entry, field) for field, value in conditions
+    )]
+    return _archived_rows(entries, match, cursor, after_id)
+
+
+def _archived_rows(entries, match, cursor, after_id):
+    for entry in entries:
+        for row in read_archive(entry):
+            if cursor is not None and (row['date'], row['id']) <= cursor:
+                continue
+            if after_id is not None and row['id'] <= after_id:
+                continue
+            if match(row):
+                yield row
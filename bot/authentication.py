@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class TokenCache:
+    """
+    Потокобезопасный кэш проверенных токенов доступа с ограничением размера (LRU).
+
+    Запись живет до истечения срока действия токена, но не дольше ttl секунд. Изменение или удаление
+    пользователя в этом процессе сразу удаляет его записи (invalidate_user вызывается сигналами модели
+    пользователя); изменения, сделанные другими процессами или через QuerySet.update, вступают в силу
+    не позже чем через ttl секунд.
+
+    Attributes:
+        maxsize (int): Максимальное количество записей.
+        ttl (float): Максимальное время жизни записи, в секундах.
+        hits (int): Количество запросов, аутентифицированных из кэша.
+        misses (int): Количество запросов, для которых токен проверялся и пользователь загружался из БД.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает кэш с параметрами из настроек проекта.
+
+        Returns:
+            TokenCache: Кэш, настроенный через AUTH_TOKEN_CACHE_* в settings.
+        """
+        return cls(maxsize=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, ttl=settings.AUTH_TOKEN_CACHE_TTL)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, raw_token):
+        """
+        Возвращает пользователя и проверенный токен из кэша.
+
+        Args:
+            raw_token (bytes): Токен из заголовка Authorization.
+
+        Returns:
+            tuple: (пользователь, проверенный токен) или None, если записи нет или она истекла.
+        """
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is None or entry[2] <= time.time():
+                if entry is not None:
+                    self._remove(raw_token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(raw_token)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, raw_token, user, validated_token):
+        """
+        Сохраняет пользователя и проверенный токен.
+
+        Args:
+            raw_token (bytes): Токен из заголовка Authorization.
+            user (User): Пользователь, которому выдан токен.
+            validated_token (Token): Проверенный токен.
+        """
+        expires = min(validated_token['exp'], time.time() + self.ttl)
+        with self._lock:
+            if raw_token in self._entries:
+                self._remove(raw_token)
+            self._entries[raw_token] = (user, validated_token, expires)
+            self._by_user.setdefault(user.pk, set()).add(raw_token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        """
+        Удаляет записи всех токенов пользователя.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+        """
+        with self._lock:
+            for raw_token in self._by_user.pop(user_id, ()):
+                self._entries.pop(raw_token, None)
+
+    def clear(self):
+        """
+        Удаляет все записи.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, raw_token):
+        user, _, _ = self._entries.pop(raw_token)
+        tokens = self._by_user.get(user.pk)
+        if tokens is not None:
+            tokens.discard(raw_token)
+            if not tokens:
+                del self._by_user[user.pk]
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """
+    Возвращает общий для процесса кэш токенов, создавая его при первом обращении.
+
+    Returns:
+        TokenCache: Кэш токенов.
+    """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache.from_settings()
+    return _token_cache
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """
+    Удаляет из кэша токены измененного или удаленного пользователя (обработчик post_save и post_delete).
+
+    Args:
+        sender (type): Модель пользователя.
+        instance (User): Пользователь.
+    """
+    if _token_cache is not None:
+        _token_cache.invalidate_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT с кэшированием проверенных токенов.
+
+    Первый запрос с токеном проверяет подпись и срок действия и загружает пользователя из БД, как
+    JWTAuthentication; следующие запросы с тем же токеном получают пользователя из кэша процесса
+    (TokenCache) без проверки подписи и запросов к БД. Неактивные пользователи и неверные токены
+    не кэшируются.
+    """
+
+    def authenticate(self, request):
+        """
+        Аутентифицирует запрос по заголовку Authorization.
+
+        Args:
+            request (Request): Запрос.
+
+        Returns:
+            tuple: (пользователь, проверенный токен) или None, если заголовок не содержит токен.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return self.authenticate_token(raw_token)
+
+    def authenticate_token(self, raw_token):
+        """
+        Аутентифицирует токен доступа, переданный не в заголовке (например, при подключении WebSocket).
+
+        Args:
+            raw_token (bytes): Токен доступа.
+
+        Returns:
+            tuple: (пользователь, проверенный токен).
+
+        Raises:
+            InvalidToken: Если токен неверный или истек.
+            AuthenticationFailed: Если пользователь не найден или неактивен.
+        """
+        cache = get_token_cache()
+        cached = cache.get(raw_token)
+        if cached is not None:
+            return cached
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+        cache.set(raw_token, user, validated_token)
+        return user, validated_token
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from telegram.error import Forbidden
+
+from .models import Broadcast, BroadcastDelivery, Chat
+from .outbox import BROADCAST
+
+logger = logging.getLogger(__name__)
+
+
+def create_broadcast(text):
+    """
+    Создает рассылку по всем чатам, не заблокировавшим бота.
+
+    Args:
+        text (str): Текст сообщения.
+
+    Returns:
+        Broadcast: Рассылка в состоянии "pending".
+    """
+    return Broadcast.objects.create(text=text, total=Chat.objects.filter(blocked_at__isnull=True).count())
+
+
+def claim_broadcast(broadcast_id=None, stale_after=None):
+    """
+    Захватывает рассылку для выполнения.
+
+    Подходит рассылка в состоянии "pending" или "running", задача которой не сохраняла прогресс дольше
+    stale_after секунд (процесс, выполнявший ее, остановился). Захват выполняется условным UPDATE и
+    записывает в рассылку новую метку claim: прогресс сохраняет только задача с этой меткой, поэтому
+    задача, у которой рассылку захватил другой процесс, прекращает ее выполнение.
+
+    Args:
+        broadcast_id (int, optional): Идентификатор рассылки; по умолчанию - самая ранняя подходящая.
+        stale_after (float, optional): Через сколько секунд без сохранения прогресса рассылка считается
+                                       брошенной, по умолчанию settings.BROADCAST_STALE_AFTER.
+
+    Returns:
+        Broadcast: Захваченная рассылка или None, если подходящих рассылок нет.
+    """
+    if stale_after is None:
+        stale_after = settings.BROADCAST_STALE_AFTER
+    now = timezone.now()
+    claim = uuid.uuid4()
+    claimable = Q(status=Broadcast.PENDING) | Q(status=Broadcast.RUNNING, heartbeat__lt=now - timedelta(seconds=stale_after))
+    candidates = Broadcast.objects.filter(claimable).order_by('id')
+    if broadcast_id is not None:
+        candidates = candidates.filter(pk=broadcast_id)
+
+    for pk in candidates.values_list('id', flat=True)[:10]:
+        claimed = Broadcast.objects.filter(claimable, pk=pk).update(
+            status=Broadcast.RUNNING, heartbeat=now, claim=claim,
+            started=Coalesce(F('started'), Value(now, output_field=DateTimeField())),
+        )
+        if claimed:
+            return Broadcast.objects.get(pk=pk)
+    return None
+
+
+def cancel_broadcast(broadcast_id):
+    """
+    Отменяет рассылку, которая еще не завершена. Выполняющая задача остановится после текущего куска.
+
+    Args:
+        broadcast_id (int): Идентификатор рассылки.
+
+    Returns:
+        bool: True, если рассылка отменена; False, если она уже завершена или отменена.
+    """
+    return bool(Broadcast.objects.filter(pk=broadcast_id, status__in=[Broadcast.PENDING, Broadcast.RUNNING])
+                .update(status=Broadcast.CANCELLED, finished=timezone.now()))
+
+
+async def run_broadcast(broadcast, outbox, chunk_size=None, progress=None, heartbeat_interval=None):
+    """
+    Выполняет захваченную рассылку через очередь исходящих сообщений с приоритетом BROADCAST.
+
+    Чаты читаются из реестра Chat по возрастанию chat_id кусками по chunk_size, поэтому в памяти
+    одновременно находится только один кусок. После отправки куска результаты по каждому чату,
+    счетчики и last_chat_id сохраняются одной транзакцией; чаты, заблокировавшие бота, отмечаются
+    в реестре и пропускаются следующими рассылками. Пока кусок отправляется, задача раз в heartbeat_interval
+    секунд обновляет отметку активности, чтобы медленный кусок не сочли брошенным. Если рассылку захватил
+    другой процесс (claim_broadcast), отправка куска прекращается, а его результаты не сохраняются. Если
+    выполнение прервано, сообщения последнего незавершенного куска при продолжении будут отправлены повторно.
+
+    Args:
+        broadcast (Broadcast): Рассылка, захваченная claim_broadcast.
+        outbox (Outbox): Очередь исходящих сообщений.
+        chunk_size (int, optional): Количество чатов в куске, по умолчанию settings.BROADCAST_CHUNK_SIZE.
+        progress (callable, optional): Функция progress(broadcast), вызываемая после каждого куска.
+        heartbeat_interval (float, optional): Интервал отметки активности во время отправки куска, в секундах,
+                                              по умолчанию settings.BROADCAST_HEARTBEAT_INTERVAL.
+
+    Returns:
+        Broadcast: Рассылка в итоговом состоянии ("done" или "cancelled") или в состоянии на момент остановки.
+    """
+    chunk_size = chunk_size or settings.BROADCAST_CHUNK_SIZE
+    heartbeat_interval = heartbeat_interval or settings.BROADCAST_HEARTBEAT_INTERVAL
+    while True:
+        chat_ids = await sync_to_async(_next_chunk)(broadcast, chunk_size)
+        if chat_ids is None:
+            logger.info('Рассылка %s остановлена: %s', broadcast.pk, broadcast.status)
+            return broadcast
+        if not chat_ids:
+            break
+        futures = [outbox.send_message(chat_id, broadcast.text, BROADCAST) for chat_id in chat_ids]
+        heartbeat = asyncio.create_task(_heartbeat(broadcast, futures, heartbeat_interval))
+        try:
+            results = await asyncio.gather(*futures, return_exceptions=True)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            heartbeat.cancel()
+        if any(isinstance(result, asyncio.CancelledError) for result in results):
+            # Очередь остановлена вместе с ботом или рассылку захватил другой процесс;
+            # кусок будет отправлен при продолжении рассылки.
+            logger.info('Рассылка %s прервана, продолжение с chat_id > %s', broadcast.pk, broadcast.last_chat_id)
+            return broadcast
+        if not await sync_to_async(_checkpoint)(broadcast, chat_ids, results):
+            logger.warning('Рассылка %s захвачена другим процессом, результаты куска не сохранены', broadcast.pk)
+            return broadcast
+        if progress is not None:
+            progress(broadcast)
+
+    await sync_to_async(_finish)(broadcast)
+    return broadcast
+
+
+async def _heartbeat(broadcast, futures, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            owned = await sync_to_async(_touch)(broadcast)
+        except Exception:
+            logger.exception('Не удалось обновить отметку активности рассылки %s', broadcast.pk)
+            continue
+        if not owned:
+            logger.warning('Рассылка %s захвачена другим процессом, отправка куска прекращена', broadcast.pk)
+            for future in futures:
+                future.cancel()
+            return
+
+
+def _touch(broadcast):
+    return bool(Broadcast.objects.filter(pk=broadcast.pk, claim=broadcast.claim).update(heartbeat=timezone.now()))
+
+
+def _next_chunk(broadcast, chunk_size):
+    broadcast.status, claim = Broadcast.objects.filter(pk=broadcast.pk).values_list('status', 'claim').get()
+    if broadcast.status != Broadcast.RUNNING or claim != broadcast.claim:
+        return None
+    chats = Chat.objects.filter(blocked_at__isnull=True).order_by('chat_id')
+    if broadcast.last_chat_id is not None:
+        chats = chats.filter(chat_id__gt=broadcast.last_chat_id)
+    return list(chats.values_list('chat_id', flat=True)[:chunk_size])
+
+
+def _checkpoint(broadcast, chat_ids, results):
+    now = timezone.now()
+    deliveries = []
+    blocked = []
+    counts = Counter()
+    for chat_id, result in zip(chat_ids, results):
+        if isinstance(result, Forbidden):
+            status = BroadcastDelivery.BLOCKED
+            blocked.append(chat_id)
+        elif isinstance(result, BaseException):
+            status = BroadcastDelivery.FAILED
+        else:
+            status = BroadcastDelivery.SENT
+        counts[status] += 1
+        error = str(result)[:255] if isinstance(result, BaseException) else ''
+        deliveries.append(BroadcastDelivery(broadcast_id=broadcast.pk, chat_id=chat_id, status=status,
+                                            error=error, sent_at=now))
+
+    with transaction.atomic():
+        owned = Broadcast.objects.filter(pk=broadcast.pk, claim=broadcast.claim).update(
+            last_chat_id=chat_ids[-1], heartbeat=now,
+            sent=F('sent') + counts[BroadcastDelivery.SENT],
+            blocked=F('blocked') + counts[BroadcastDelivery.BLOCKED],
+            failed=F('failed') + counts[BroadcastDelivery.FAILED],
+        )
+        if not owned:
+            return False
+        BroadcastDelivery.objects.bulk_create(deliveries, batch_size=1000, ignore_conflicts=True)
+        if blocked:
+            Chat.objects.filter(chat_id__in=blocked).update(blocked_at=now)
+    broadcast.refresh_from_db(fields=['last_chat_id', 'heartbeat', 'sent', 'blocked', 'failed'])
+    return True
+
+
+def _finish(broadcast):
+    Broadcast.objects.filter(pk=broadcast.pk, status=Broadcast.RUNNING, claim=broadcast.claim).update(
+        status=Broadcast.DONE, finished=timezone.now())
+    broadcast.refresh_from_db()
+
+
+class BroadcastRunner:
+    """
+    Фоновая задача бота, выполняющая рассылки.
+
+    Раз в poll_interval секунд проверяет, нет ли рассылок для выполнения (созданных через API
+    или командой broadcast --queue, а также брошенных остановившимся процессом), и выполняет их
+    по одной через общую очередь исходящих сообщений, поэтому ответы пользователям во время
+    рассылки отправляются в первую очередь.
+
+    Attributes:
+        outbox (Outbox): Очередь исходящих сообщений.
+        poll_interval (float): Интервал проверки новых рассылок, в секундах.
+        chunk_size (int): Количество чатов в куске рассылки.
+    """
+
+    def __init__(self, outbox, poll_interval=5.0, chunk_size=1000):
+        self.outbox = outbox
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self._task = None
+
+    @classmethod
+    def from_settings(cls, outbox):
+        """
+        Создает задачу с параметрами из настроек проекта.
+
+        Args:
+            outbox (Outbox): Очередь исходящих сообщений.
+
+        Returns:
+            BroadcastRunner: Задача, настроенная через BROADCAST_* в settings.
+        """
+        return cls(outbox, poll_interval=settings.BROADCAST_POLL_INTERVAL, chunk_size=settings.BROADCAST_CHUNK_SIZE)
+
+    def start(self):
+        """
+        Запускает фоновую задачу.
+        """
+        self._task = asyncio.create_task(self._run(), name='broadcast-runner')
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу; незавершенная рассылка будет продолжена с последнего сохраненного куска.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                broadcast = await sync_to_async(claim_broadcast)()
+                if broadcast is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                logger.info('Рассылка %s: отправка в %d чатов', broadcast.pk, broadcast.total)
+                await run_broadcast(broadcast, self.outbox, self.chunk_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Ошибка выполнения рассылки')
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,54 @@
+import re
+
+# Ключевые слова текстовых запросов и соответствующие им команды бота.
+INTENTS = {
+    'погода': '/weather',
+}
+
+ARGUMENT_MAX_LENGTH = 255
+
+_COMMAND_RE = re.compile(r'/([A-Za-z0-9_]{1,32})(?:@\w+)?(?=\s|$)')
+
+
+def parse_command(text):
+    """
+    Определяет команду бота и ее аргумент по тексту сообщения.
+
+    Распознаются команды Telegram ("/news technology", "/start@MyBot") и текстовые запросы из INTENTS
+    ("погода Москва" соответствует команде /weather с аргументом "москва"). Команда приводится
+    к нижнему регистру без упоминания бота, аргумент - к нижнему регистру без лишних пробелов.
+
+    Args:
+        text (str): Текст сообщения.
+
+    Returns:
+        tuple: Пара (команда, аргумент); None вместо команды, если текст не является командой,
+               и None вместо аргумента, если аргумент не указан.
+    """
+    if not text:
+        return None, None
+    text = text.strip()
+
+    match = _COMMAND_RE.match(text)
+    if match:
+        return f'/{match.group(1).lower()}', normalize_argument(text[match.end():])
+
+    lowered = text.lower()
+    for keyword, command in INTENTS.items():
+        if lowered.startswith(keyword):
+            return command, normalize_argument(lowered[len(keyword):])
+    return None, None
+
+
+def normalize_argument(argument):
+    """
+    Приводит аргумент команды к виду, в котором он хранится в Message.argument.
+
+    Args:
+        argument (str): Аргумент в том виде, в котором его ввел пользователь.
+
+    Returns:
+        str: Аргумент без лишних пробелов в нижнем регистре или None, если аргумент пустой.
+    """
+    argument = ' '.join(argument.split()).casefold()
+    return argument[:ARGUMENT_MAX_LENGTH] or None
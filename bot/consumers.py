@@ -0,0 +1,96 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .dashboard import DASHBOARD_GROUP, get_publisher
+
+# Код закрытия WebSocket при отсутствии или неверном токене доступа.
+CLOSE_UNAUTHORIZED = 4401
+
+
+class DashboardConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket дашборда (/ws/dashboard/).
+
+    Клиент передает токен доступа JWT параметром ?token= (браузеры не позволяют задать заголовки при
+    подключении WebSocket) или в заголовке Authorization: Bearer. Без действительного токена соединение
+    закрывается с кодом 4401. После подключения клиент получает сообщение {"type": "snapshot", "data": ...}
+    с данными в формате GET /api/dashboard/, затем сообщения {"type": "delta", "data": ...} с изменениями
+    (dashboard_delta), не чаще раза в DASHBOARD_PUSH_INTERVAL секунд.
+    """
+
+    async def connect(self):
+        """
+        Аутентифицирует подключение, подписывает его на изменения и отправляет текущие данные.
+        """
+        raw_token = self.get_raw_token()
+        user = await self.authenticate(raw_token) if raw_token else None
+        await self.accept()
+        if user is None:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+
+        self.scope['user'] = user
+        await self.channel_layer.group_add(DASHBOARD_GROUP, self.channel_name)
+        self.subscribed = True
+        snapshot = await get_publisher().subscribe()
+        await self.send_json({'type': 'snapshot', 'data': snapshot})
+
+    async def disconnect(self, code):
+        """
+        Отписывает подключение от изменений.
+
+        Args:
+            code (int): Код закрытия соединения.
+        """
+        if getattr(self, 'subscribed', False):
+            self.subscribed = False
+            get_publisher().unsubscribe()
+            await self.channel_layer.group_discard(DASHBOARD_GROUP, self.channel_name)
+
+    async def dashboard_delta(self, event):
+        """
+        Отправляет клиенту изменения данных дашборда (сообщение группы с типом "dashboard.delta").
+
+        Args:
+            event (dict): Сообщение слоя каналов с изменениями в ключе data.
+        """
+        await self.send_json({'type': 'delta', 'data': event['data']})
+
+    def get_raw_token(self):
+        """
+        Возвращает токен доступа из параметра token строки запроса или заголовка Authorization.
+
+        Returns:
+            bytes: Токен или None, если он не передан.
+        """
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        if query.get('token'):
+            return query['token'][0].encode()
+        for name, value in self.scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.split()
+                if len(parts) == 2 and parts[0].lower() == b'bearer':
+                    return parts[1]
+        return None
+
+    @database_sync_to_async
+    def authenticate(self, raw_token):
+        """
+        Проверяет токен доступа так же, как API (с кэшем проверенных токенов).
+
+        Args:
+            raw_token (bytes): Токен доступа.
+
+        Returns:
+            User: Пользователь или None, если токен неверный или пользователь неактивен.
+        """
+        try:
+            user, _ = CachedJWTAuthentication().authenticate_token(raw_token)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+        return user
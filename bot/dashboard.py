@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+
+from . import rollups
+from .models import MessageRollup
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_GROUP = 'dashboard'
+
+_date_field = DateTimeField()
+
+
+def dashboard_data(window=None):
+    """
+    Вычисляет данные дашборда по агрегатам MessageRollup и реестру чатов.
+
+    Args:
+        window (timedelta, optional): Период, по умолчанию DASHBOARD_WINDOW_HOURS часов.
+
+    Returns:
+        dict: Количество чатов, писавших боту за период (active_dialogs), количество запросов
+              по часам (request_counts, даты в формате ISO 8601) и наиболее популярные команды
+              (popular_commands).
+    """
+    window = window or timedelta(hours=settings.DASHBOARD_WINDOW_HOURS)
+    return {
+        'active_dialogs': rollups.active_chats(window),
+        'request_counts': [{'date': _date_field.to_representation(row['date']), 'count': row['count']}
+                           for row in rollups.request_counts(MessageRollup.HOUR, window)],
+        'popular_commands': rollups.popular_commands(window),
+    }
+
+
+def dashboard_delta(old, new):
+    """
+    Возвращает изменения данных дашборда.
+
+    Args:
+        old (dict): Предыдущие данные dashboard_data.
+        new (dict): Новые данные dashboard_data.
+
+    Returns:
+        dict: Только изменившиеся ключи: active_dialogs и popular_commands - новое значение целиком,
+              request_counts - {"upsert": новые и изменившиеся интервалы, "remove": даты интервалов,
+              вышедших из периода}. Пустой словарь, если ничего не изменилось.
+    """
+    delta = {}
+    if old['active_dialogs'] != new['active_dialogs']:
+        delta['active_dialogs'] = new['active_dialogs']
+
+    old_counts = {row['date']: row['count'] for row in old['request_counts']}
+    new_dates = {row['date'] for row in new['request_counts']}
+    upsert = [row for row in new['request_counts'] if old_counts.get(row['date']) != row['count']]
+    remove = [date for date in old_counts if date not in new_dates]
+    if upsert or remove:
+        delta['request_counts'] = {'upsert': upsert, 'remove': remove}
+
+    if old['popular_commands'] != new['popular_commands']:
+        delta['popular_commands'] = new['popular_commands']
+    return delta
+
+
+class DashboardPublisher:
+    """
+    Рассылка изменений дашборда подписчикам WebSocket через слой каналов.
+
+    Данные дашборда вычисляются не чаще раза в interval секунд независимо от количества подписчиков,
+    одновременные запросы данных ожидают одного вычисления. Подписчикам (группа DASHBOARD_GROUP)
+    отправляются только изменения (dashboard_delta), а если ничего не изменилось - ничего. Новый
+    подписчик получает последние вычисленные данные без отдельного запроса к БД.
+
+    Во встроенном режиме (DASHBOARD_PUBLISHER=embedded) публикатор работает в процессе ASGI-сервера,
+    пока есть подписчики. Если ASGI-процессов несколько и слой каналов общий (CHANNEL_REDIS_URL),
+    изменения рассылает один процесс, запущенный командой publish_dashboard (DASHBOARD_PUBLISHER=external),
+    а публикаторы ASGI-процессов только отдают данные новым подписчикам.
+
+    Attributes:
+        interval (float): Минимальный интервал между вычислениями, в секундах.
+        publish (bool): Отправлять изменения группе подписчиков.
+        snapshot (dict): Последние вычисленные данные дашборда.
+        subscribers (int): Количество подписчиков в этом процессе.
+        computations (int): Количество вычислений данных дашборда.
+        published (int): Количество отправленных изменений.
+    """
+
+    def __init__(self, interval=2.0, publish=True, group=DASHBOARD_GROUP):
+        self.interval = interval
+        self.publish = publish
+        self.group = group
+        self.snapshot = None
+        self.subscribers = 0
+        self.computations = 0
+        self.published = 0
+        self._computed_at = None
+        self._computing = None
+        self._task = None
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает публикатор с параметрами из настроек проекта.
+
+        Returns:
+            DashboardPublisher: Публикатор, настроенный через DASHBOARD_PUSH_INTERVAL и DASHBOARD_PUBLISHER
+                                в settings.
+        """
+        return cls(interval=settings.DASHBOARD_PUSH_INTERVAL,
+                   publish=settings.DASHBOARD_PUBLISHER == 'embedded')
+
+    async def subscribe(self):
+        """
+        Учитывает нового подписчика и запускает публикацию, если она еще не запущена.
+
+        Returns:
+            dict: Текущие данные дашборда для первого сообщения подписчику.
+        """
+        self.subscribers += 1
+        if self.publish and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run(until_idle=True))
+        return await self.current()
+
+    def unsubscribe(self):
+        """
+        Учитывает отключение подписчика; без подписчиков публикация останавливается.
+        """
+        self.subscribers -= 1
+
+    async def current(self):
+        """
+        Возвращает данные дашборда, вычисляя их заново, если они старше interval секунд.
+
+        Returns:
+            dict: Данные dashboard_data.
+        """
+        if self._computed_at is None or time.monotonic() - self._computed_at >= self.interval:
+            await self.refresh()
+        return self.snapshot
+
+    async def refresh(self):
+        """
+        Вычисляет данные дашборда и отправляет изменения подписчикам.
+
+        Одновременные вызовы ожидают одного вычисления.
+
+        Returns:
+            dict: Данные dashboard_data.
+        """
+        if self._computing is None:
+            self._computing = asyncio.ensure_future(self._compute())
+        computing = self._computing
+        try:
+            await asyncio.shield(computing)
+        finally:
+            if computing.done() and self._computing is computing:
+                self._computing = None
+        return self.snapshot
+
+    async def _compute(self):
+        data = await database_sync_to_async(dashboard_data)()
+        self.computations += 1
+        self._computed_at = time.monotonic()
+        delta = dashboard_delta(self.snapshot, data) if self.snapshot is not None else {}
+        self.snapshot = data
+        if delta and self.publish:
+            await get_channel_layer().group_send(self.group, {'type': 'dashboard.delta', 'data': delta})
+            self.published += 1
+
+    async def run(self, until_idle=False):
+        """
+        Раз в interval секунд вычисляет данные дашборда и отправляет изменения группе подписчиков.
+
+        Args:
+            until_idle (bool): Остановиться, когда в этом процессе не останется подписчиков.
+        """
+        while not until_idle or self.subscribers > 0:
+            await asyncio.sleep(self.interval)
+            if until_idle and self.subscribers <= 0:
+                break
+            try:
+                await self.current()
+            except Exception:
+                logger.exception('Не удалось обновить данные дашборда')
+
+
+_publisher = None
+
+
+def get_publisher():
+    """
+    Возвращает общий для процесса публикатор дашборда, создавая его при первом обращении.
+
+    Returns:
+        DashboardPublisher: Публикатор.
+    """
+    global _publisher
+    if _publisher is None:
+        _publisher = DashboardPublisher.from_settings()
+    return _publisher
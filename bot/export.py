@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import zlib
+from itertools import chain
+
+from . import archive
+from .models import Message
+from .serializers import MESSAGE_FIELDS, format_datetime
+
+EXPORT_FIELDS = MESSAGE_FIELDS
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+
+def export_rows(queryset=None, after_id=None, chunk_size=2000):
+    """
+    Читает сообщения для выгрузки кусками, не загружая всю таблицу в память.
+
+    Строки упорядочены по id, поэтому прерванную выгрузку можно продолжить с after_id,
+    равным id последней полученной строки.
+
+    Args:
+        queryset (QuerySet, optional): Отфильтрованный набор сообщений, по умолчанию все сообщения.
+        after_id (int, optional): Выгружать только сообщения с id больше указанного.
+        chunk_size (int): Количество строк, читаемых из базы данных за раз.
+
+    Returns:
+        iterator: Кортежи значений полей EXPORT_FIELDS.
+    """
+    queryset = Message.objects.all() if queryset is None else queryset
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    return queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def export_rows_with_archive(queryset, params, after_id=None, chunk_size=2000):
+    """
+    То же, что export_rows, но сообщения раньше границы архива читаются из файлов архива.
+
+    Сначала выводятся архивные сообщения (по суткам, внутри суток в порядке (date, id)), затем сообщения
+    из таблицы Message по возрастанию id; так как id растут вместе с датой, продолжение с after_id
+    работает так же, как без архива.
+
+    Args:
+        queryset (QuerySet): Набор сообщений, отфильтрованный filter_messages по тем же параметрам.
+        params (QueryDict): Параметры запроса с фильтрами (для архивных сообщений).
+        after_id (int, optional): Выгружать только сообщения с id больше указанного.
+        chunk_size (int): Количество строк, читаемых из базы данных за раз.
+
+    Returns:
+        iterator: Кортежи значений полей EXPORT_FIELDS.
+    """
+    boundary = archive.archived_until()
+    if boundary is None:
+        return export_rows(queryset, after_id, chunk_size)
+    archived = (tuple(row[field] for field in EXPORT_FIELDS)
+                for row in archive.archived_rows(params, after_id=after_id))
+    return chain(archived, export_rows(queryset.filter(date__gte=boundary), after_id, chunk_size))
+
+
+def ndjson_lines(rows):
+    """
+    Преобразует строки в NDJSON: по одному JSON-объекту на строку.
+    """
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['date'] = format_datetime(record['date'])
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    """
+    Преобразует строки в CSV с заголовком.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(row[:-1] + (format_datetime(row[-1]),))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_stream(rows, output='ndjson', compress=False, buffer_size=64 * 1024):
+    """
+    Формирует поток байтов выгрузки, объединяя строки в блоки примерно по buffer_size байтов.
+
+    Args:
+        rows (iterator): Строки из export_rows.
+        output (str): Формат выгрузки: "ndjson" или "csv".
+        compress (bool): Сжимать ли поток в формате gzip.
+        buffer_size (int): Размер блока, отдаваемого за раз.
+
+    Returns:
+        iterator: Блоки байтов.
+    """
+    lines = ndjson_lines(rows) if output == 'ndjson' else csv_lines(rows)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            block = b''.join(chunk)
+            chunk, size = [], 0
+            if compressor is not None:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b''.join(chunk)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .commands import normalize_argument
+
+INTEGER_FILTERS = ('chat_id', 'user_id')
+
+
+def parse_date_param(name, value, end=False):
+    """
+    Разбирает дату или дату со временем из параметра запроса.
+
+    Args:
+        name (str): Имя параметра (для сообщения об ошибке).
+        value (str): Значение в формате ISO 8601 (YYYY-MM-DD или YYYY-MM-DDTHH:MM[:SS][+HH:MM]).
+        end (bool): Для даты без времени вернуть начало следующих суток (для границы "до").
+
+    Returns:
+        datetime: Дата со временем в текущем часовом поясе.
+
+    Raises:
+        ValidationError: Если значение не является датой.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            parsed = datetime.combine(day, time.min)
+            if end:
+                parsed += timedelta(days=1)
+    except ValueError:
+        raise ValidationError({name: 'Ожидается дата в формате ISO 8601.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_messages(queryset, params):
+    """
+    Применяет к набору сообщений фильтры из параметров запроса.
+
+    Поддерживаются chat_id, user_id, command, argument (вместе с command, например город для /weather)
+    и интервал дат date_from (включительно) / date_to (не включительно). Все условия совпадают
+    с индексами модели Message.
+
+    Args:
+        queryset (QuerySet): Набор сообщений.
+        params (QueryDict): Параметры запроса.
+
+    Returns:
+        QuerySet: Отфильтрованный набор сообщений.
+
+    Raises:
+        ValidationError: Если значение параметра некорректно.
+    """
+    for name in INTEGER_FILTERS:
+        value = params.get(name)
+        if value is not None:
+            try:
+                queryset = queryset.filter(**{name: int(value)})
+            except ValueError:
+                raise ValidationError({name: 'Ожидается целое число.'})
+
+    command = params.get('command')
+    if command is not None:
+        queryset = queryset.filter(command=command)
+    argument = params.get('argument')
+    if argument is not None:
+        queryset = queryset.filter(argument=normalize_argument(argument))
+
+    date_from, date_to = date_range(params)
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lt=date_to)
+    return queryset
+
+
+def date_range(params):
+    """
+    Разбирает интервал дат date_from (включительно) / date_to (не включительно) из параметров запроса.
+
+    Args:
+        params (QueryDict): Параметры запроса.
+
+    Returns:
+        tuple: Пара (date_from, date_to); отсутствующая граница - None.
+
+    Raises:
+        ValidationError: Если значение параметра некорректно.
+    """
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    return (parse_date_param('date_from', date_from) if date_from else None,
+            parse_date_param('date_to', date_to, end=True) if date_to else None)
+
+
+def match_conditions(params):
+    """
+    Разбирает из параметров запроса условия равенства фильтров chat_id, user_id, command и argument.
+
+    Args:
+        params (QueryDict): Параметры запроса.
+
+    Returns:
+        list: Пары (поле, значение).
+
+    Raises:
+        ValidationError: Если значение параметра некорректно.
+    """
+    conditions = []
+    for name in INTEGER_FILTERS:
+        value = params.get(name)
+        if value is not None:
+            try:
+                conditions.append((name, int(value)))
+            except ValueError:
+                raise ValidationError({name: 'Ожидается целое число.'})
+    if params.get('command') is not None:
+        conditions.append(('command', params['command']))
+    if params.get('argument') is not None:
+        conditions.append(('argument', normalize_argument(params['argument'])))
+    return conditions
+
+
+def match_messages(params):
+    """
+    Создает проверку сообщения на соответствие тем же фильтрам, что и filter_messages.
+
+    Используется для сообщений, которые читаются не из базы данных (из архива).
+
+    Args:
+        params (QueryDict): Параметры запроса.
+
+    Returns:
+        function: Функция, принимающая словарь с полями сообщения и возвращающая True для подходящих.
+
+    Raises:
+        ValidationError: Если значение параметра некорректно.
+    """
+    conditions = match_conditions(params)
+    date_from, date_to = date_range(params)
+
+    def match(row):
+        if date_from is not None and row['date'] < date_from:
+            return False
+        if date_to is not None and row['date'] >= date_to:
+            return False
+        return all(row[name] == value for name, value in conditions)
+    return match
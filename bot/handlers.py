@@ -0,0 +1,201 @@
+import asyncio
+import json
+from functools import partial
+
+import httpx
+from django.conf import settings
+
+from .commands import parse_command
+from .models import Message
+from .news_pool import NEWS_CATEGORIES
+from .writebehind import FLUSH_BEFORE_REPLY
+
+
+async def main(update, context):
+    """
+    Обработчик команды /start.
+
+    Бот приветствует пользователя и рассказывает о своих функциях.
+
+    Пример использования:
+    /start
+    """
+    context.bot_data['outbox'].send_message(update.effective_chat.id, f"Здравствуйте, {update.effective_user.first_name}. Я бот, который предоставляет информацию о погоде, новостях, \n/help для получения списка доступных команд")
+
+
+async def handle_start(update, context):
+    """
+    Обработчик команды /help.
+
+    Бот выводит список доступных команд.
+
+    Пример использования:
+    /help
+    """
+    context.bot_data['outbox'].send_message(update.effective_chat.id, "Вот список доступных команд:\n"
+                                                                      "/weather - получить информацию о погоде\n"
+                                                                      "/news - получить последние новости\n"
+                                                                      "/help - показать список команд\n"
+                                                                      "/start - перезапустить бот")
+
+
+async def send_random_news(update, context):
+    """
+    Обработчик команды /news.
+
+    Бот отправляет пользователю случайную новость. Можно указать категорию новостей.
+
+    Пример использования:
+    /news
+    /news technology
+    """
+    message = update.effective_message
+    outbox = context.bot_data['outbox']
+    category = context.args[0].lower() if context.args else None
+    if category is not None and category not in NEWS_CATEGORIES:
+        reply(outbox, message, "Неизвестная категория. Доступные категории: " + ", ".join(NEWS_CATEGORIES))
+        return
+
+    try:
+        news_data = await context.bot_data['news_pools'].random_article(settings.NEWS_DEFAULT_COUNTRY, category)
+        if news_data:
+            title = news_data["title"]
+            description = news_data["description"]
+            url = news_data["url"]
+            outbox.send_message(message.chat_id, f"{title}\n\n{description}\n\n{url}")
+        else:
+            reply(outbox, message, "Извините, не удалось получить новости. Пожалуйста, попробуйте позже.")
+    except Exception as e:
+        reply(outbox, message, "Произошла ошибка при получении новостей. Пожалуйста, попробуйте позже.")
+
+
+async def ask_for_city(update, context):
+    """
+    Обработчик команды /weather.
+
+    Бот запрашивает у пользователя название города для получения погоды.
+
+    Пример использования:
+    /weather
+    """
+    context.bot_data['outbox'].send_message(update.effective_chat.id, 'Чтобы узнать погоду, введите ключевые слова "погода" и "название города"')
+
+
+async def record_message(update, context):
+    """
+    Запись входящего текстового сообщения, включая команды.
+
+    Выполняется раньше остальных обработчиков. Команда и ее аргумент определяются один раз при записи,
+    сообщение сохраняется в базу данных через буфер отложенной записи; в режиме flush_before_reply
+    обработчик дожидается сохранения, поэтому ответ отправляется только после записи.
+    """
+    message = update.effective_message
+    text = message.text.strip().lower()
+    command, argument = parse_command(text)
+
+    durable = settings.MESSAGE_WRITE_MODE == FLUSH_BEFORE_REPLY
+    saved = context.bot_data['message_buffer'].add(
+        Message(user_id=message.from_user.id, chat_id=message.chat_id, text=text, command=command,
+                argument=argument), wait=durable)
+    if durable:
+        await asyncio.wrap_future(saved)
+
+
+async def handle_weather(update, context):
+    """
+    Обработчик погоды.
+
+    Получает от пользователя текстовое сообщение, анализирует его и отправляет погоду в указанном городе.
+
+    Пример использования:
+    погода Москва
+    """
+    message = update.effective_message
+    outbox = context.bot_data['outbox']
+    command, city = parse_command(message.text)
+
+    if command == "/weather":
+        if not city:
+            reply(outbox, message, "Вы не указали название города. Пожалуйста, введите название города после слова 'погода'.")
+            return
+
+        weather = context.bot_data['upstreams']['weather']
+        try:
+            temp = await context.bot_data['weather_cache'].get_or_load(city, lambda key: get_temperature(weather, key))
+        except httpx.HTTPError:
+            reply(outbox, message, "Произошла ошибка при получении погоды. Пожалуйста, попробуйте позже.")
+            return
+
+        if temp is None:
+            reply(outbox, message, "Неправильно указан город. Пожалуйста, проверьте правильность названия города.")
+            return
+
+        image = "weather/sunny" if temp >= 30.0 else "weather/warm" if 10.0 <= temp < 30.0 else "weather/cold"
+
+        outbox.send(message.chat_id, partial(context.bot_data['media'].send_photo, context.bot, message.chat_id, image,
+                                             caption=f'Сейчас погода: {temp}°C, \n/help - команды',
+                                             reply_to_message_id=message.message_id))
+
+
+def reply(outbox, message, text):
+    """
+    Ставит в очередь ответ на сообщение пользователя (с цитированием исходного сообщения).
+
+    Args:
+        outbox (Outbox): Очередь исходящих сообщений.
+        message (Message): Сообщение пользователя.
+        text (str): Текст ответа.
+    """
+    outbox.send_message(message.chat_id, text, reply_to_message_id=message.message_id)
+
+
+async def get_temperature(upstream, city):
+    """
+    Получение текущей температуры в городе из OpenWeatherMap.
+
+    Вызывается кэшем погоды только при промахе, поэтому результат (в том числе отсутствие города)
+    переиспользуется последующими запросами.
+
+    Args:
+        upstream (Upstream): Клиент OpenWeatherMap.
+        city (str): Нормализованное название города.
+
+    Returns:
+        float: Температура в градусах Цельсия или None, если город не найден.
+
+    Raises:
+        httpx.HTTPError: При сетевой ошибке, ошибке сервера OpenWeatherMap или разомкнутом выключателе.
+    """
+    res = await upstream.get(settings.OPENWEATHERMAP_URL, params={"q": city, "appid": settings.API, "units": "metric"})
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+    data = json.loads(res.text)
+
+    try:
+        return data["main"]["temp"]
+    except KeyError:
+        return None
+
+
+async def fetch_headlines(upstream, country, category=None):
+    """
+    Загрузка заголовков из newsapi.org для пула новостей.
+
+    Args:
+        upstream (Upstream): Клиент newsapi.
+        country (str): Код страны.
+        category (str, optional): Категория новостей.
+
+    Returns:
+        list: Список статей из ответа newsapi.org.
+
+    Raises:
+        httpx.HTTPError: При сетевой ошибке, ошибочном ответе newsapi.org или разомкнутом выключателе.
+    """
+    params = {"country": country, "apiKey": settings.NEWS_API}
+    if category:
+        params["category"] = category
+    response = await upstream.get(settings.NEWS_API_URL, params=params)
+    response.raise_for_status()
+    return response.json().get("articles") or []
@@ -0,0 +1,172 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.fields import SkipField, empty
+
+from . import rollups
+from .commands import parse_command
+from .models import Message
+from .serializers import MessageSerializer
+
+logger = logging.getLogger(__name__)
+
+INGEST_FIELDS = ('user_id', 'chat_id', 'text', 'command')
+
+
+def save_messages(messages, batch_size=None):
+    """
+    Сохраняет пачку сообщений одной транзакцией и учитывает их в агрегатах дашборда.
+
+    Args:
+        messages (list): Несохраненные объекты Message.
+        batch_size (int, optional): Размер одного INSERT, по умолчанию settings.MESSAGE_BULK_BATCH_SIZE.
+
+    Returns:
+        list: Сохраненные объекты Message.
+    """
+    with transaction.atomic():
+        messages = Message.objects.bulk_create(messages, batch_size=batch_size or settings.MESSAGE_BULK_BATCH_SIZE)
+        rollups.record(messages)
+    return messages
+
+
+def insert_messages(rows):
+    """
+    Сохраняет сообщения одной транзакцией напрямую через executemany, минуя создание объектов Message.
+
+    Используется для массовой загрузки, где bulk_create тратит большую часть времени на подготовку
+    значений ORM. Все сообщения пачки получают одну дату сохранения.
+
+    Args:
+        rows (list): Кортежи (user_id, chat_id, text, command, argument) проверенных сообщений.
+
+    Returns:
+        int: Количество сохраненных сообщений.
+    """
+    date = timezone.now()
+    adapted = connection.ops.adapt_datetimefield_value(date)
+    table = connection.ops.quote_name(Message._meta.db_table)
+    sql = f'INSERT INTO {table} (user_id, chat_id, text, command, argument, date) VALUES (%s, %s, %s, %s, %s, %s)'
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [row + (adapted,) for row in rows])
+        rollups.record_rows((chat_id, command, date) for _, chat_id, _, command, _ in rows)
+    return len(rows)
+
+
+def _clean_text(value, max_length=None):
+    """
+    Быстрая проверка строки по правилам CharField сериализатора.
+
+    Returns:
+        str: Очищенная строка или None, если значение нужно проверить полем сериализатора.
+    """
+    if type(value) is not str:
+        return None
+    value = value.strip()
+    if not value or '\x00' in value or (max_length is not None and len(value) > max_length):
+        return None
+    if not value.isascii():
+        try:
+            value.encode()
+        except UnicodeEncodeError:
+            return None
+    return value
+
+
+def validate_messages(items):
+    """
+    Проверяет пачку сообщений за один проход по тем же правилам, что и MessageSerializer.
+
+    Типичные корректные строки проверяются встроенными операциями без создания сериализатора;
+    значения, не прошедшие быструю проверку, передаются полям MessageSerializer, поэтому тексты
+    ошибок и приведение типов совпадают с созданием одиночного сообщения. Если команда не указана,
+    команда и аргумент определяются по тексту, как в MessageSerializer.validate.
+
+    Args:
+        items (list): Словари с полями сообщения; элементы ParseError означают некорректные строки NDJSON.
+
+    Returns:
+        tuple: Список пар (номер строки, (user_id, chat_id, text, command, argument)) и список ошибок
+               {"index": номер строки, "errors": {поле: [сообщения]}}.
+    """
+    serializer = MessageSerializer()
+    fields = serializer.fields
+    command_max_length = fields['command'].max_length
+    messages = []
+    errors = []
+    for index, item in enumerate(items):
+        if isinstance(item, ParseError):
+            errors.append({'index': index, 'errors': {'non_field_errors': [str(item.detail)]}})
+            continue
+        if not isinstance(item, dict):
+            message = serializer.error_messages['invalid'].format(datatype=type(item).__name__)
+            errors.append({'index': index, 'errors': {'non_field_errors': [message]}})
+            continue
+
+        user_id = item.get('user_id')
+        chat_id = item.get('chat_id')
+        text = _clean_text(item.get('text'))
+        command = item.get('command')
+        if command is not None:
+            command = _clean_text(command, command_max_length) if command != '' else ''
+        if (type(user_id) is int and type(chat_id) is int and text is not None
+                and (command is not None or item.get('command') is None)):
+            argument = None
+            if not command:
+                command, argument = parse_command(text)
+            messages.append((index, (user_id, chat_id, text, command, argument)))
+            continue
+
+        values = {}
+        row_errors = {}
+        for name in INGEST_FIELDS:
+            try:
+                values[name] = fields[name].run_validation(item.get(name, empty))
+            except SkipField:
+                pass
+            except ValidationError as e:
+                row_errors[name] = e.detail
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+        else:
+            command, argument = values.get('command'), None
+            if not command:
+                command, argument = parse_command(values['text'])
+            messages.append((index, (values['user_id'], values['chat_id'], values['text'], command, argument)))
+    return messages, errors
+
+
+def ingest_messages(items, batch_size=None):
+    """
+    Проверяет и сохраняет пачку сообщений, например при переносе истории из другого бота.
+
+    Корректные сообщения сохраняются через insert_messages транзакциями по batch_size строк; ошибки
+    в отдельных строках не отменяют сохранение остальных. Ошибка базы данных (например, блокировка) -
+    сбой сервера, а не данных: сохранение прекращается, и номера несохраненных корректных строк
+    возвращаются отдельно, чтобы клиент повторил их загрузку.
+
+    Args:
+        items (list): Словари с полями сообщения.
+        batch_size (int, optional): Количество строк в одной транзакции,
+                                    по умолчанию settings.MESSAGE_INGEST_BATCH_SIZE.
+
+    Returns:
+        tuple: Количество сохраненных сообщений, список ошибок проверки по строкам (упорядоченный по номеру
+               строки) и список номеров корректных строк, не сохраненных из-за ошибки базы данных.
+    """
+    batch_size = batch_size or settings.MESSAGE_INGEST_BATCH_SIZE
+    messages, errors = validate_messages(items)
+    created = 0
+    for i in range(0, len(messages), batch_size):
+        batch = messages[i:i + batch_size]
+        try:
+            insert_messages([row for _, row in batch])
+        except DatabaseError:
+            logger.exception('Не удалось сохранить %d сообщений', len(messages) - i)
+            return created, errors, [index for index, _ in messages[i:]]
+        created += len(batch)
+    return created, errors, []
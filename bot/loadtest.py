@@ -0,0 +1,405 @@
+import asyncio
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import httpx
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from . import runtime
+from .models import Broadcast
+from .stubs import CITIES, STUB_TOKEN, synthetic_updates
+
+# Перцентили задержки в отчете.
+PERCENTILES = (50, 95, 99)
+
+# Текст рассылок, создаваемых нагрузочным тестом; такие рассылки отменяются, чтобы бот их не выполнял.
+LOADTEST_BROADCAST_TEXT = 'loadtest'
+
+SEARCH_QUERIES = ('погода', 'погода москва', 'новости', 'привет')
+
+# Запросов для прогрева перед замером каждого сценария; они получают номера после замеряемых.
+WARMUP_REQUESTS = 5
+
+
+def latency_summary(latencies):
+    """
+    Сводка задержек: среднее, перцентили PERCENTILES и максимум.
+
+    Args:
+        latencies (list): Длительности в секундах.
+
+    Returns:
+        dict: {"count", "mean", "p50", "p95", "p99", "max"}; значения в миллисекундах.
+    """
+    if not latencies:
+        return {'count': 0}
+    ordered = sorted(latencies)
+    summary = {'count': len(ordered), 'mean': round(sum(ordered) / len(ordered) * 1000, 3)}
+    for percentile in PERCENTILES:
+        summary[f'p{percentile}'] = round(ordered[min(len(ordered) - 1, len(ordered) * percentile // 100)] * 1000, 3)
+    summary['max'] = round(ordered[-1] * 1000, 3)
+    return summary
+
+
+class LoadTestData:
+    """
+    Данные, на которые ссылаются запросы нагрузочного теста.
+
+    Attributes:
+        run_id (str): Идентификатор прогона, чтобы имена новых пользователей не повторялись между прогонами.
+        username (str): Имя администратора, от которого выполняются запросы.
+        password (str): Пароль администратора.
+        headers (dict): Заголовки запросов: токен доступа администратора и секретный токен webhook.
+        message_ids (list): id существующих сообщений.
+        chats (int): Количество чатов в сгенерированных сообщениях.
+        broadcast_ids (list): id рассылок, созданных для отмены.
+    """
+
+    def __init__(self, username, password, access_token, message_ids, chats, broadcast_ids, webhook_secret):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.username = username
+        self.password = password
+        self.headers = {'Authorization': f'Bearer {access_token}', 'X-Telegram-Bot-Api-Secret-Token': webhook_secret}
+        self.message_ids = message_ids
+        self.chats = chats
+        self.broadcast_ids = broadcast_ids
+
+    @property
+    def credentials(self):
+        return {'username': self.username, 'password': self.password}
+
+    def message_id(self, i):
+        return self.message_ids[i % len(self.message_ids)]
+
+    def chat_id(self, i):
+        return i * 7919 % self.chats + 1
+
+
+class Endpoint:
+    """
+    Сценарий нагрузки одного маршрута: метод и функция, строящая i-й запрос.
+
+    Attributes:
+        name (str): Имя сценария в отчете.
+        route (str): Имя маршрута в Bot_service/urls.py (для include - пространство имен).
+        method (str): HTTP-метод.
+        build (callable): Функция (LoadTestData, i) -> (путь с параметрами, тело JSON или None).
+    """
+
+    def __init__(self, name, route, method, build):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.build = build
+
+
+def _ingest(data, i):
+    messages = [{'user_id': data.chat_id(i), 'chat_id': data.chat_id(i), 'text': f'погода {CITIES[(i + j) % len(CITIES)]}'}
+                for j in range(10)]
+    return '/api/messages/', messages
+
+
+def _webhook_update(data, i):
+    update = synthetic_updates(1, chats=data.chats, start_id=10 ** 9 + i, seed=i)[0]
+    return '/api/telegram/webhook/', update
+
+
+ENDPOINTS = (
+    Endpoint('admin-login', 'admin', 'GET', lambda data, i: ('/admin/login/', None)),
+    Endpoint('token-obtain-pair', 'token-obtain-pair', 'POST', lambda data, i: ('/api/token/', data.credentials)),
+    Endpoint('message-list', 'message-list-create', 'GET', lambda data, i: ('/api/messages/', None)),
+    Endpoint('message-ingest', 'message-list-create', 'POST', _ingest),
+    Endpoint('message-history', 'message-history', 'GET',
+             lambda data, i: (f'/api/messages/history/?chat_id={data.chat_id(i)}', None)),
+    Endpoint('message-export', 'message-export', 'GET',
+             lambda data, i: (f'/api/messages/export/?output=ndjson&chat_id={data.chat_id(i)}', None)),
+    Endpoint('message-search', 'message-search', 'GET',
+             lambda data, i: (f'/api/messages/search/?q={SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}', None)),
+    Endpoint('message-detail', 'message-detail', 'GET',
+             lambda data, i: (f'/api/messages/{data.message_id(i)}/', None)),
+    Endpoint('message-update', 'message-detail', 'PATCH',
+             lambda data, i: (f'/api/messages/{data.message_id(i)}/', {'text': f'погода {CITIES[i % len(CITIES)]}'})),
+    Endpoint('dashboard', 'dashboard', 'GET', lambda data, i: ('/api/dashboard/', None)),
+    Endpoint('user-register', 'user-register', 'POST',
+             lambda data, i: ('/api/register/', {'username': f'loadtest-{data.run_id}-{i}', 'password': data.password})),
+    Endpoint('user-login', 'user-login', 'POST', lambda data, i: ('/api/login/', data.credentials)),
+    Endpoint('broadcast-list', 'broadcast-list-create', 'GET', lambda data, i: ('/api/broadcasts/', None)),
+    Endpoint('broadcast-create', 'broadcast-list-create', 'POST',
+             lambda data, i: ('/api/broadcasts/', {'text': LOADTEST_BROADCAST_TEXT})),
+    Endpoint('broadcast-detail', 'broadcast-detail', 'GET',
+             lambda data, i: (f'/api/broadcasts/{data.broadcast_ids[i % len(data.broadcast_ids)]}/', None)),
+    Endpoint('broadcast-cancel', 'broadcast-cancel', 'POST',
+             lambda data, i: (f'/api/broadcasts/{data.broadcast_ids[i % len(data.broadcast_ids)]}/cancel/', None)),
+    Endpoint('telegram-webhook', 'telegram-webhook', 'POST', _webhook_update),
+    Endpoint('metrics', 'metrics', 'GET', lambda data, i: ('/metrics', None)),
+    Endpoint('schema-swagger-ui', 'schema-swagger-ui', 'GET', lambda data, i: ('/swagger/?format=openapi', None)),
+    Endpoint('schema-redoc', 'schema-redoc', 'GET', lambda data, i: ('/redoc/', None)),
+)
+
+
+def uncovered_routes(endpoints=ENDPOINTS):
+    """
+    Возвращает маршруты Bot_service/urls.py, для которых нет сценария нагрузки.
+
+    Returns:
+        list: Имена маршрутов (для include - пространства имен).
+    """
+    covered = {endpoint.route for endpoint in endpoints}
+    routes = [pattern.name if isinstance(pattern, URLPattern) else pattern.namespace
+              for pattern in get_resolver().url_patterns]
+    return [route for route in routes if route not in covered]
+
+
+def cancel_loadtest_broadcasts():
+    """
+    Отменяет незавершенные рассылки, созданные нагрузочным тестом.
+
+    Returns:
+        int: Количество отмененных рассылок.
+    """
+    return Broadcast.objects.filter(text=LOADTEST_BROADCAST_TEXT,
+                                    status__in=[Broadcast.PENDING, Broadcast.RUNNING]).update(status=Broadcast.CANCELLED)
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestServer:
+    """
+    Веб-приложение на локальном многопоточном WSGI-сервере (как runserver) в фоновом потоке.
+
+    Каждый запрос обрабатывается в отдельном потоке со своим соединением с базой данных, поэтому
+    для SQLite база данных должна быть файлом.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = ThreadedWSGIServer((host, port), _QuietWSGIRequestHandler, allow_reuse_address=False)
+        self._server.set_app(WSGIHandler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='loadtest-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_endpoint(client, endpoint, data, requests, concurrency, warmup=WARMUP_REQUESTS):
+    """
+    Выполняет requests запросов сценария в concurrency потоков.
+
+    Первые warmup запросов выполняются до замера и в отчет не попадают.
+
+    Args:
+        client (httpx.Client): HTTP-клиент с base_url сервера.
+        endpoint (Endpoint): Сценарий.
+        data (LoadTestData): Данные для запросов.
+        requests (int): Количество запросов.
+        concurrency (int): Количество одновременных запросов.
+        warmup (int): Количество запросов для прогрева.
+
+    Returns:
+        dict: {"method", "route", "requests", "elapsed", "throughput", "latency", "statuses", "bytes"}.
+    """
+    latencies = []
+    statuses = Counter()
+    sizes = []
+    lock = threading.Lock()
+
+    def call(i, measure=True):
+        path, body = endpoint.build(data, i)
+        started = time.perf_counter()
+        try:
+            response = client.request(endpoint.method, path, json=body, headers=data.headers)
+            status, size = response.status_code, len(response.content)
+        except httpx.HTTPError as e:
+            status, size = type(e).__name__, 0
+        elapsed = time.perf_counter() - started
+        if measure:
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+                sizes.append(size)
+
+    for i in range(warmup):
+        call(requests + i, measure=False)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'method': endpoint.method,
+        'route': endpoint.route,
+        'requests': requests,
+        'elapsed': round(elapsed, 3),
+        'throughput': round(requests / elapsed, 1),
+        'latency': latency_summary(latencies),
+        'statuses': dict(sorted(statuses.items())),
+        'bytes': round(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+
+def run_api(data, endpoints, requests, concurrency):
+    """
+    Нагружает каждый сценарий по очереди через локальный WSGI-сервер.
+
+    Предупреждения django.request об ответах 4xx на время теста отключаются.
+
+    Returns:
+        dict: Результаты run_endpoint по именам сценариев.
+    """
+    logger = logging.getLogger('django.request')
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    results = {}
+    try:
+        with LoadTestServer() as server, httpx.Client(base_url=server.url, timeout=60) as client:
+            for endpoint in endpoints:
+                results[endpoint.name] = run_endpoint(client, endpoint, data, requests, concurrency)
+    finally:
+        logger.setLevel(level)
+    return results
+
+
+async def run_bot(stub, count, concurrency, timeout):
+    """
+    Прогоняет синтетические обновления через бота (runtime) против заглушки.
+
+    Задержка обновления - от его выдачи через getUpdates до завершения всех обработчиков (включая
+    запросы к внешним API и сохранение сообщения); ответы отправляются очередью исходящих сообщений,
+    ее опустошение входит в общее время.
+
+    Args:
+        stub (StubServer): Заглушка с обновлениями.
+        count (int): Количество обновлений в заглушке.
+        concurrency (int): Ограничение конкурентности обработки обновлений.
+        timeout (float): Наибольшее время ожидания обработки, в секундах.
+
+    Returns:
+        dict: {"updates", "processed", "elapsed", "throughput", "latency", "replies", "upstreams", "stub_errors"}.
+    """
+    done = asyncio.Event()
+    finished = {}
+
+    async def record_finished(update, context):
+        finished[update.update_id] = time.monotonic()
+        if len(finished) == count:
+            done.set()
+
+    application = runtime.build_application(STUB_TOKEN, base_url=stub.bot_api_url, concurrency=concurrency)
+    application.add_handler(TypeHandler(Update, record_finished), group=1)
+    started = time.perf_counter()
+    await runtime.start(application)
+    try:
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        await application.bot_data['outbox'].join()
+    finally:
+        elapsed = time.perf_counter() - started
+        upstreams = {upstream.name: upstream.stats() for upstream in application.bot_data['upstreams'].values()}
+        await runtime.stop(application)
+
+    latencies = [end - stub.delivered[update_id] for update_id, end in finished.items() if update_id in stub.delivered]
+    return {
+        'updates': count,
+        'processed': len(finished),
+        'elapsed': round(elapsed, 3),
+        'throughput': round(len(finished) / elapsed, 1),
+        'latency': latency_summary(latencies),
+        'replies': len(stub.sent),
+        'upstreams': {name: {key: stats[key] for key in ('requests', 'errors', 'circuit')}
+                      for name, stats in upstreams.items()},
+        'stub_errors': stub.failed,
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              check=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    """
+    Описание прогона для сравнения результатов между коммитами.
+
+    Returns:
+        dict: Коммит (и есть ли незакоммиченные изменения), время, версии Python и Django, база данных, CPU.
+    """
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare_results(old, new, threshold=10.0):
+    """
+    Сравнивает два отчета нагрузочного теста.
+
+    Args:
+        old (dict): Предыдущий отчет.
+        new (dict): Новый отчет.
+        threshold (float): Ухудшение в процентах, начиная с которого изменение считается регрессией.
+
+    Returns:
+        list: Кортежи (сценарий, метрика, старое значение, новое значение, изменение в %, регрессия ли)
+              для сценариев, которые есть в обоих отчетах.
+    """
+    scenarios = {}
+    for report, index in ((old, 0), (new, 1)):
+        if report.get('bot'):
+            scenarios.setdefault('bot', [None, None])[index] = report['bot']
+        for name, result in report.get('api', {}).items():
+            scenarios.setdefault(name, [None, None])[index] = result
+
+    rows = []
+    for name, (before, after) in scenarios.items():
+        if before is None or after is None:
+            continue
+        metrics = [('throughput', before['throughput'], after['throughput'], True)]
+        metrics += [(f'p{percentile}', before['latency'].get(f'p{percentile}'), after['latency'].get(f'p{percentile}'),
+                     False) for percentile in PERCENTILES]
+        for metric, was, now, higher_is_better in metrics:
+            if not was or now is None:
+                continue
+            change = (now - was) / was * 100
+            regression = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, metric, was, now, round(change, 1), regression))
+    return rows
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bot.archive import archive_cutoff, archive_messages
+from bot.models import MessageArchive
+
+
+class Command(BaseCommand):
+    """
+    Перенос старых сообщений из таблицы Message в архив.
+
+    Сообщения старше --days суток (по умолчанию MESSAGE_RETENTION_DAYS) записываются в сжатые файлы
+    NDJSON по суткам в MESSAGE_ARCHIVE_DIR и удаляются из таблицы небольшими пачками, не блокируя
+    сохранение новых сообщений ботом. Прерванный перенос продолжается при следующем запуске. История
+    и выгрузка сообщений читают архивные сутки из файлов; агрегаты дашборда не изменяются.
+
+    Пример использования:
+    python manage.py archive_messages
+    python manage.py archive_messages --days 30 --batch-size 500
+    python manage.py archive_messages --list
+    """
+    help = 'Переносит сообщения старше срока хранения в сжатые файлы архива.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MESSAGE_RETENTION_DAYS,
+                            help='Срок хранения сообщений в таблице, в сутках.')
+        parser.add_argument('--batch-size', type=int, default=settings.MESSAGE_ARCHIVE_DELETE_BATCH,
+                            help='Количество строк, удаляемых одной транзакцией.')
+        parser.add_argument('--pause', type=float, default=settings.MESSAGE_ARCHIVE_DELETE_PAUSE,
+                            help='Пауза между пачками удаления, в секундах.')
+        parser.add_argument('--list', action='store_true', help='Показать опись архива.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for entry in MessageArchive.objects.order_by('day'):
+                self.stdout.write(f'{entry.day:%Y-%m-%d} rows={entry.rows} ids={entry.first_id}-{entry.last_id} '
+                                  f'size={entry.size} {entry.path}')
+            return
+        if options['days'] < 1:
+            raise CommandError('--days должен быть не меньше 1.')
+
+        cutoff = archive_cutoff(options['days'])
+
+        def progress(entry, deleted):
+            self.stdout.write(f'{entry.day:%Y-%m-%d} archived={entry.rows} deleted={deleted} size={entry.size}')
+
+        started = time.perf_counter()
+        days, deleted = archive_messages(cutoff, options['batch_size'], options['pause'], progress)
+        self.stdout.write(f'Перенесено в архив {deleted} сообщений за {days} сут. (до {cutoff:%Y-%m-%d}) '
+                          f'за {time.perf_counter() - started:.1f}s')
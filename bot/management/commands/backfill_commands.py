@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from bot import rollups
+from bot.commands import parse_command
+from bot.models import Message
+
+
+class Command(BaseCommand):
+    """
+    Заполняет команду и аргумент у ранее сохраненных сообщений.
+
+    Сообщения обрабатываются по возрастанию id кусками по --chunk-size строк, каждый кусок - отдельной
+    короткой транзакцией, поэтому таблица не блокируется надолго и выполнение можно прервать и запустить
+    снова. Агрегаты дашборда переносятся между командами в той же транзакции.
+
+    По умолчанию обрабатываются только сообщения без аргумента, а уже заполненная команда сохраняется;
+    с --all команда и аргумент пересчитываются у всех сообщений.
+
+    Пример использования:
+    python manage.py backfill_commands --chunk-size 5000 --sleep 0.05
+    """
+    help = 'Определяет команду и аргумент по тексту у ранее сохраненных сообщений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Количество строк в одной транзакции.')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Пауза между транзакциями, с.')
+        parser.add_argument('--after-id', type=int, default=0, help='Начать с сообщений с id больше указанного.')
+        parser.add_argument('--all', action='store_true', help='Пересчитать команду у всех сообщений.')
+
+    def handle(self, *args, **options):
+        messages = Message.objects.all() if options['all'] else Message.objects.filter(argument__isnull=True)
+        table = connection.ops.quote_name(Message._meta.db_table)
+        sql = f'UPDATE {table} SET command = %s, argument = %s WHERE id = %s'
+
+        last_id = options['after_id']
+        scanned = updated = 0
+        started = time.perf_counter()
+        while True:
+            rows = list(
+                messages.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'text', 'command', 'argument', 'date')[:options['chunk_size']]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            changes = []
+            moved = []
+            for pk, text, command, argument, date in rows:
+                parsed_command, parsed_argument = parse_command(text)
+                new_command = parsed_command if options['all'] else command or parsed_command
+                new_argument = parsed_argument if parsed_command == new_command else None
+                if (new_command, new_argument) != (command, argument):
+                    changes.append((new_command, new_argument, pk))
+                    moved.append((date, command, new_command))
+            if changes:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.executemany(sql, changes)
+                    rollups.reclassify_rows(moved)
+                updated += len(changes)
+
+            self.stdout.write(f'last_id={last_id} scanned={scanned} updated={updated}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(f'Обработано {scanned} сообщений, обновлено {updated} '
+                          f'за {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from bot import rollups
+from bot.archive import archive_cutoff, archive_messages
+from bot.ingest import insert_messages
+from bot.models import Message, MessageArchive
+from bot.seed import seed_messages
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк переноса старых сообщений в архив под нагрузкой записи.
+
+    Таблица заполняется сообщениями за --days суток, и сообщения старше --keep-days суток переносятся
+    в архив, пока отдельный поток, как бот, сохраняет по одному сообщению каждые 5 мс. Сначала строки
+    удаляются одной транзакцией на сутки, затем пачками по --batch-size. Для каждого режима выводятся
+    время переноса и задержки сохранения сообщений (медиана, 99-й перцентиль, максимум). Используется
+    временная база данных SQLite в файле, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_archive --rows 300000 --batch-size 1000
+    """
+    help = 'Измеряет задержки сохранения новых сообщений во время переноса старых сообщений в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=300000, help='Сообщений в базе данных.')
+        parser.add_argument('--days', type=int, default=60, help='За сколько суток распределить сообщения.')
+        parser.add_argument('--keep-days', type=int, default=30, help='Срок хранения в таблице, в сутках.')
+        parser.add_argument('--batch-size', type=int, default=settings.MESSAGE_ARCHIVE_DELETE_BATCH)
+        parser.add_argument('--pause', type=float, default=settings.MESSAGE_ARCHIVE_DELETE_PAUSE)
+
+    def handle(self, *args, **options):
+        modes = (('per-day', options['rows'], 0.0), ('batched', options['batch_size'], options['pause']))
+        for name, batch_size, pause in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+                old_config = setup_databases(verbosity=0, interactive=False)
+                try:
+                    with override_settings(MESSAGE_ARCHIVE_DIR=os.path.join(directory, 'archive')):
+                        seed_messages(options['rows'], chats=10000, days=options['days'])
+                        rollups.rebuild()
+                        self.bench(name, batch_size, pause, options)
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+
+    def bench(self, name, batch_size, pause, options):
+        stop = threading.Event()
+        latencies = []
+
+        def write():
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    insert_messages([(1, 1, '/help', '/help', None)])
+                    latencies.append(time.perf_counter() - started)
+                    time.sleep(0.005)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        started = time.perf_counter()
+        try:
+            days, deleted = archive_messages(archive_cutoff(options['keep_days']), batch_size, pause)
+        finally:
+            elapsed = time.perf_counter() - started
+            stop.set()
+            writer.join()
+
+        latencies.sort()
+        size = sum(MessageArchive.objects.values_list('size', flat=True))
+        self.stdout.write(
+            f'{name:<8} batch={batch_size} days={days} archived={deleted} elapsed={elapsed:.2f}s '
+            f'archive_size={size / 1e6:.1f}MB left={Message.objects.count()} inserts={len(latencies)} '
+            f'insert_p50={latencies[len(latencies) // 2] * 1000:.1f}ms '
+            f'insert_p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms '
+            f'insert_max={latencies[-1] * 1000:.1f}ms')
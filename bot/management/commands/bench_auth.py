@@ -0,0 +1,105 @@
+import logging
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bot.authentication import CachedJWTAuthentication, get_token_cache
+from bot.seed import seed_messages
+from bot.views import UserLoginView
+
+AUTHENTICATION_MODES = (
+    ('jwt', JWTAuthentication),
+    ('cached', CachedJWTAuthentication),
+)
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк аутентификации запросов к API и ограничения попыток входа.
+
+    Запросы к истории сообщений и дашборду выполняются с одним токеном доступа сначала с аутентификацией
+    JWTAuthentication (проверка подписи и загрузка пользователя на каждый запрос), затем с
+    CachedJWTAuthentication. Затем на /api/login/ отправляются попытки входа с неверным паролем без
+    ограничения частоты и с ним. Используется тестовая база данных, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_auth --requests 2000 --login-attempts 200
+    """
+    help = 'Измеряет количество аутентифицированных запросов в секунду и стоимость потока попыток входа.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов для каждого режима.')
+        parser.add_argument('--login-attempts', type=int, default=200, help='Количество попыток входа.')
+        parser.add_argument('--rows', type=int, default=1000, help='Сообщений в базе данных.')
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed_messages(options['rows'], chats=100)
+            user = User.objects.create_user('bench', password='bench-password')
+            client = Client(HTTP_HOST='localhost',
+                            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            for path in ('/api/messages/history/?limit=10', '/api/dashboard/'):
+                for name, authentication in AUTHENTICATION_MODES:
+                    self.bench_requests(client, path, name, authentication, options['requests'])
+            for throttled in (False, True):
+                self.bench_login(throttled, options['login_attempts'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def bench_requests(self, client, path, name, authentication, count):
+        saved = APIView.authentication_classes
+        APIView.authentication_classes = [authentication]
+        get_token_cache().clear()
+        try:
+            client.get(path)
+            queries = []
+
+            def count_query(execute, sql, *args):
+                queries.append(sql)
+                return execute(sql, *args)
+
+            with connection.execute_wrapper(count_query):
+                client.get(path)
+            started = time.perf_counter()
+            for _ in range(count):
+                response = client.get(path)
+                assert response.status_code == 200, response.status_code
+            elapsed = time.perf_counter() - started
+        finally:
+            APIView.authentication_classes = saved
+        self.stdout.write(f'{path:<35} {name:<7} requests={count} elapsed={elapsed:.2f}s '
+                          f'rate={count / elapsed:.0f} req/s queries_per_request={len(queries)}')
+
+    def bench_login(self, throttled, attempts):
+        saved = UserLoginView.throttle_classes
+        if not throttled:
+            UserLoginView.throttle_classes = []
+        cache.clear()
+        client = Client(HTTP_HOST='localhost')
+        statuses = {}
+        # Каждый ответ 401 и 429 иначе выводится предупреждением django.request.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            started = time.perf_counter()
+            for _ in range(attempts):
+                response = client.post('/api/login/', {'username': 'bench', 'password': 'wrong'},
+                                       content_type='application/json')
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            elapsed = time.perf_counter() - started
+        finally:
+            UserLoginView.throttle_classes = saved
+            request_logger.setLevel(level)
+        self.stdout.write(f'/api/login/ throttle={"on" if throttled else "off":<3} attempts={attempts} '
+                          f'elapsed={elapsed:.2f}s cpu_per_attempt={elapsed / attempts * 1000:.1f}ms '
+                          f'statuses={dict(sorted(statuses.items()))}')
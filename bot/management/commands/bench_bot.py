@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from bot import runtime
+from bot.stubs import STUB_TOKEN, StubServer, synthetic_updates
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк пропускной способности бота против локальной заглушки Telegram.
+
+    Для каждого значения ограничения конкурентности бот обрабатывает одни и те же синтетические
+    обновления, а заглушка отвечает на запросы погоды и новостей с искусственной задержкой.
+    Обновление считается обработанным после отправки ответа; ограничения частоты отправки очереди
+    исходящих сообщений отключены (их соблюдение проверяет bench_outbox).
+    Сообщения сохраняются в тестовую базу данных, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_bot --updates 2000 --latency 0.2 --concurrency 1 16 64
+    """
+    help = 'Измеряет количество обработанных обновлений в секунду против локальной заглушки Telegram.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=1000, help='Количество обновлений.')
+        parser.add_argument('--latency', type=float, default=0.2, help='Задержка OpenWeatherMap и newsapi, с.')
+        parser.add_argument('--telegram-latency', type=float, default=0.01, help='Задержка методов Bot API, с.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 64])
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            for concurrency in options['concurrency']:
+                elapsed = self.run_once(options['updates'], concurrency, options['latency'],
+                                        options['telegram_latency'])
+                self.stdout.write(f'concurrency={concurrency:<4} updates={options["updates"]} '
+                                  f'elapsed={elapsed:.2f}s rate={options["updates"] / elapsed:.1f} updates/s')
+                for name, stats in self.upstream_stats.items():
+                    latency = stats['latency']
+                    average = latency['sum'] / latency['count'] if latency['count'] else 0.0
+                    self.stdout.write(f'    {name:<15} requests={stats["requests"]} errors={stats["errors"]} '
+                                      f'circuit={stats["circuit"]} avg_latency={average * 1000:.1f}ms')
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def run_once(self, count, concurrency, latency, telegram_latency):
+        updates = synthetic_updates(count)
+        with StubServer(updates, latency=latency, telegram_latency=telegram_latency) as stub:
+            with override_settings(OPENWEATHERMAP_URL=f'{stub.url}/data/2.5/weather',
+                                   NEWS_API_URL=f'{stub.url}/v2/top-headlines',
+                                   OUTBOX_GLOBAL_RATE=0, OUTBOX_CHAT_RATE=0, OUTBOX_GROUP_RATE=0):
+                return asyncio.run(self.process(stub, count, concurrency))
+
+    async def process(self, stub, count, concurrency):
+        done = asyncio.Event()
+        processed = 0
+
+        async def count_processed(update, context):
+            nonlocal processed
+            processed += 1
+            if processed == count:
+                done.set()
+
+        application = runtime.build_application(STUB_TOKEN, base_url=stub.bot_api_url, concurrency=concurrency)
+        application.add_handler(TypeHandler(Update, count_processed), group=1)
+        started = time.perf_counter()
+        await runtime.start(application)
+        try:
+            await done.wait()
+            await application.bot_data['outbox'].join()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.upstream_stats = {upstream.name: upstream.stats()
+                                   for upstream in application.bot_data['upstreams'].values()}
+            await runtime.stop(application)
+        return elapsed
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from bot import runtime
+from bot.models import BotState, Message
+from bot.polling import Poller
+from bot.stubs import STUB_TOKEN, StubServer, synthetic_updates
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк обработки накопившихся обновлений после перезапуска бота.
+
+    Заглушка Telegram отдает накопившиеся обновления. Первый запуск бота останавливается (как по SIGTERM)
+    после обработки --stop-after обновлений и сохраняет offset; второй запуск сначала обрабатывает обновления,
+    не обработанные первым (заглушка, как и Telegram, уже удалила их), затем продолжает с сохраненного offset,
+    обрабатывает остаток и отправляет все ответы. Для каждого запуска выводятся время и скорость
+    обработки и время остановки (в первом запуске в него входит отправка накопившихся ответов); в конце
+    проверяется, что каждое обновление сохранено в базе данных ровно один раз. С малым --shutdown-timeout
+    первый запуск прерывает обработку принятых обновлений, и второй обрабатывает их заново; сообщения,
+    записанные прерванными обработчиками, при этом сохраняются повторно (duplicated), но не теряются.
+    Ограничения частоты отправки очереди исходящих сообщений отключены. Бот работает с временной базой
+    данных SQLite в файле, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_catchup --updates 100000
+    """
+    help = 'Измеряет время обработки накопившихся обновлений с продолжением по сохраненному offset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=100000, help='Количество накопившихся обновлений.')
+        parser.add_argument('--chats', type=int, default=1000, help='Количество различных чатов.')
+        parser.add_argument('--stop-after', type=int, help='После скольких обновлений остановить первый запуск, '
+                                                            'по умолчанию половина.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка OpenWeatherMap и newsapi, с.')
+        parser.add_argument('--telegram-latency', type=float, default=0.0, help='Задержка методов Bot API, с.')
+        parser.add_argument('--shutdown-timeout', type=float, help='Ожидание обработки принятых обновлений '
+                                                                   'при остановке, с; по умолчанию BOT_SHUTDOWN_TIMEOUT.')
+
+    def handle(self, *args, **options):
+        updates = synthetic_updates(options['updates'], chats=options['chats'])
+        stop_after = options['stop_after'] or len(updates) // 2
+        with tempfile.TemporaryDirectory() as directory:
+            settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                self.run_all(updates, stop_after, options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    def run_all(self, updates, stop_after, options):
+        last_id = updates[-1]['update_id']
+        with StubServer(updates, latency=options['latency'], telegram_latency=options['telegram_latency']) as stub:
+            with override_settings(OPENWEATHERMAP_URL=f'{stub.url}/data/2.5/weather',
+                                   NEWS_API_URL=f'{stub.url}/v2/top-headlines',
+                                   OUTBOX_GLOBAL_RATE=0, OUTBOX_CHAT_RATE=0, OUTBOX_GROUP_RATE=0,
+                                   BOT_SHUTDOWN_TIMEOUT=options['shutdown_timeout'] or settings.BOT_SHUTDOWN_TIMEOUT):
+                for name, until in (('first', updates[stop_after - 1]['update_id']), ('resumed', last_id)):
+                    offset = BotState.objects.values_list('update_offset', flat=True).first()
+                    poller, elapsed, shutdown = asyncio.run(self.run_once(stub, until, until == last_id))
+                    self.stdout.write(
+                        f'{name:<8} start_offset={offset} processed={poller.received} replayed={poller.replayed} '
+                        f'elapsed={elapsed:.2f}s rate={poller.received / elapsed:.1f} updates/s shutdown={shutdown:.2f}s '
+                        f'saved_offset={BotState.objects.get().update_offset}')
+
+        saved = Message.objects.count()
+        if saved == len(updates):
+            result = 'ok'
+        elif saved > len(updates):
+            result = f'duplicated={saved - len(updates)}'
+        else:
+            result = f'MISMATCH: lost={len(updates) - saved}'
+        self.stdout.write(f'updates={len(updates)} messages={saved} {result}')
+
+    async def run_once(self, stub, until, drain):
+        application = runtime.build_application(STUB_TOKEN, base_url=stub.bot_api_url, polling=False)
+        poller = Poller.from_settings(application)
+        serving = asyncio.create_task(poller.serve())
+        started = time.perf_counter()
+        while poller.watermark.last is None or poller.watermark.last < until:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.01)
+        if drain:
+            await application.bot_data['outbox'].join()
+        elapsed = time.perf_counter() - started
+        poller.request_stop()
+        await serving
+        return poller, elapsed, time.perf_counter() - started - elapsed
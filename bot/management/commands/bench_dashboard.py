@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bot import dashboard, rollups
+from bot.commands import parse_command
+from bot.dashboard import DashboardPublisher, dashboard_data
+from bot.ingest import insert_messages
+from bot.routing import websocket_urlpatterns
+from bot.seed import SEED_TEXTS, seed_messages
+
+
+class Viewer(ApplicationCommunicator):
+    """
+    Клиент WebSocket дашборда, подключенный к ASGI-приложению напрямую, без сервера.
+    """
+
+    def __init__(self, application, token):
+        super().__init__(application, {'type': 'websocket', 'path': '/ws/dashboard/',
+                                       'query_string': f'token={token}'.encode(), 'headers': []})
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return (await self.receive_output(10))['type'] == 'websocket.accept'
+
+    async def receive_json(self, timeout):
+        message = await self.receive_output(timeout)
+        if message['type'] != 'websocket.send':
+            raise ConnectionError(message)
+        return json.loads(message['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait(1)
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк WebSocket дашборда с несколькими зрителями.
+
+    Пока --viewers зрителей следят за дашбордом --duration секунд, в базу данных каждые 0.1 с сохраняется
+    пачка сообщений. Сначала каждый зритель раз в --interval секунд запрашивает данные, как при опросе
+    GET /api/dashboard/; затем зрители подключаются к /ws/dashboard/ со слоем каналов в памяти процесса
+    и получают изменения от одного публикатора. Для каждого режима выводятся количество вычислений данных
+    дашборда и затраченное на них время, для WebSocket - также количество и средний размер полученных
+    сообщений. Используется временная база данных SQLite в файле, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_dashboard --viewers 200 --duration 10
+    """
+    help = 'Сравнивает стоимость опроса дашборда и рассылки изменений через WebSocket для многих зрителей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--viewers', type=int, default=200, help='Количество зрителей.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Длительность каждого режима, с.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Интервал обновления, с.')
+        parser.add_argument('--rows', type=int, default=100000, help='Сообщений в базе данных.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                seed_messages(options['rows'], chats=1000, days=1)
+                rollups.rebuild()
+                user = User.objects.create_user('bench', password='bench-password')
+                token = str(RefreshToken.for_user(user).access_token)
+                for mode in (self.bench_polling, self.bench_push):
+                    asyncio.run(mode(token, options))
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    async def write_messages(self, stop):
+        rnd = random.Random(0)
+        texts = [(text,) + parse_command(text) for text in SEED_TEXTS]
+        while not stop.is_set():
+            rows = [(rnd.randrange(1, 1001), rnd.randrange(1, 1001)) + rnd.choice(texts) for _ in range(50)]
+            await database_sync_to_async(insert_messages)(rows)
+            await asyncio.sleep(0.1)
+
+    async def bench_polling(self, token, options):
+        stop = asyncio.Event()
+        writer = asyncio.create_task(self.write_messages(stop))
+        compute = database_sync_to_async(dashboard_data)
+        computations = 0
+        busy = 0.0
+        started = time.perf_counter()
+        while time.perf_counter() - started < options['duration']:
+            round_started = time.perf_counter()
+            for _ in range(options['viewers']):
+                await compute()
+            computations += options['viewers']
+            busy += time.perf_counter() - round_started
+            await asyncio.sleep(max(0.0, options['interval'] - (time.perf_counter() - round_started)))
+        stop.set()
+        await writer
+        self.stdout.write(f'polling viewers={options["viewers"]} computations={computations} '
+                          f'compute_time={busy:.2f}s')
+
+    async def bench_push(self, token, options):
+        publisher = DashboardPublisher(interval=options['interval'])
+        dashboard._publisher = publisher
+        application = URLRouter(websocket_urlpatterns)
+        communicators = [Viewer(application, token) for _ in range(options['viewers'])]
+        received = [0] * len(communicators)
+        sizes = [0] * len(communicators)
+
+        async def watch(index, communicator):
+            while True:
+                message = await communicator.receive_json(timeout=options['duration'] + 10)
+                received[index] += 1
+                sizes[index] += len(json.dumps(message))
+
+        try:
+            for communicator in communicators:
+                assert await communicator.connect()
+            watchers = [asyncio.create_task(watch(i, c)) for i, c in enumerate(communicators)]
+            stop = asyncio.Event()
+            writer = asyncio.create_task(self.write_messages(stop))
+            await asyncio.sleep(options['duration'])
+            stop.set()
+            await writer
+            for watcher in watchers:
+                watcher.cancel()
+            await asyncio.gather(*watchers, return_exceptions=True)
+        finally:
+            for communicator in communicators:
+                await communicator.disconnect()
+            dashboard._publisher = None
+
+        messages = sum(received)
+        self.stdout.write(f'push    viewers={options["viewers"]} computations={publisher.computations} '
+                          f'deltas_published={publisher.published} messages_received={messages} '
+                          f'avg_message={sum(sizes) // max(messages, 1)}B')
@@ -0,0 +1,155 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection, connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from Bot_service.db import sqlite_pragmas
+from bot.ingest import insert_messages, save_messages
+from bot.models import Message
+from bot.seed import SEED_TEXTS, seed_messages
+
+# Режимы: настройки соединений SQLite, начало транзакций и время жизни соединения.
+MODES = {
+    'delete': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_TRANSACTION_MODE': '',
+               'CONN_MAX_AGE': 0},
+    'wal-deferred': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL', 'SQLITE_TRANSACTION_MODE': '',
+                     'CONN_MAX_AGE': 0},
+    'wal': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL', 'SQLITE_TRANSACTION_MODE': 'IMMEDIATE',
+            'CONN_MAX_AGE': 0},
+    'wal-persistent': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL',
+                       'SQLITE_TRANSACTION_MODE': 'IMMEDIATE', 'CONN_MAX_AGE': 60},
+}
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк конкурентного доступа к базе данных SQLite: писатели и читатели в разных потоках.
+
+    Писатели сохраняют пачки сообщений так же, как буфер записи бота (save_messages с агрегатами
+    дашборда), или, с --write-path insert, как массовая загрузка через API (insert_messages); читатели
+    запрашивают страницу истории случайного чата, как API, а сканирующие читатели читают всю таблицу
+    сообщений, как выгрузка истории. Каждая операция выполняется как отдельный
+    запрос Django: до и после нее вызывается close_old_connections, поэтому при CONN_MAX_AGE=0
+    соединение открывается заново для каждой операции. Для каждого режима создается отдельная
+    временная база данных в файле, так как режим журнала сохраняется в файле.
+
+    Режимы: delete - журнал по умолчанию (DELETE, synchronous=FULL) без постоянных соединений;
+    wal-deferred - WAL и synchronous=NORMAL с транзакциями BEGIN DEFERRED, как в Django по умолчанию;
+    wal - то же с BEGIN IMMEDIATE (настройки проекта); wal-persistent - то же с постоянными соединениями.
+
+    Пример использования:
+    python manage.py bench_db --writers 4 --readers 8 --seconds 10
+    """
+    help = 'Измеряет пропускную способность и ошибки блокировки SQLite при конкурентной записи и чтении.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Количество потоков записи.')
+        parser.add_argument('--readers', type=int, default=4, help='Количество потоков чтения.')
+        parser.add_argument('--scanners', type=int, default=1, help='Количество потоков чтения всей таблицы.')
+        parser.add_argument('--seconds', type=float, default=10, help='Длительность каждого режима, с.')
+        parser.add_argument('--batch', type=int, default=10, help='Сообщений в одной транзакции записи.')
+        parser.add_argument('--rows', type=int, default=100000, help='Сообщений в базе данных перед началом.')
+        parser.add_argument('--chats', type=int, default=1000)
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--write-path', choices=('save', 'insert'), default='save',
+                            help='Запись через save_messages (буфер бота) или insert_messages (массовая загрузка).')
+
+    def handle(self, *args, **options):
+        for mode in options['modes']:
+            config = MODES[mode]
+            with tempfile.TemporaryDirectory() as directory:
+                settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+                with override_settings(SQLITE_JOURNAL_MODE=config['SQLITE_JOURNAL_MODE'],
+                                       SQLITE_SYNCHRONOUS=config['SQLITE_SYNCHRONOUS'],
+                                       SQLITE_TRANSACTION_MODE=config['SQLITE_TRANSACTION_MODE']):
+                    old_config = setup_databases(verbosity=0, interactive=False)
+                    max_age = connections.settings['default']['CONN_MAX_AGE']
+                    connections.settings['default']['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+                    try:
+                        seed_messages(options['rows'], chats=options['chats'])
+                        pragmas = sqlite_pragmas(connection)
+                        results = self.run_threads(options)
+                    finally:
+                        connections.settings['default']['CONN_MAX_AGE'] = max_age
+                        teardown_databases(old_config, verbosity=0)
+            self.write_results(mode, pragmas, config, results, options)
+
+    def run_threads(self, options):
+        deadline = time.monotonic() + options['seconds']
+        operations = {'write': self.write, 'read': self.read, 'scan': self.scan}
+        results = {kind: [] for kind in operations}
+        threads = []
+        for kind, count in (('write', options['writers']), ('read', options['readers']),
+                            ('scan', options['scanners'])):
+            for i in range(count):
+                result = {'latencies': [], 'errors': 0}
+                results[kind].append(result)
+                target = operations[kind]
+                threads.append(threading.Thread(target=self.loop, args=(target, result, deadline, options, i)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def loop(self, operation, result, deadline, options, seed):
+        rnd = random.Random(seed)
+        try:
+            while time.monotonic() < deadline:
+                close_old_connections()
+                started = time.perf_counter()
+                try:
+                    operation(rnd, options)
+                except DatabaseError:
+                    result['errors'] += 1
+                else:
+                    result['latencies'].append(time.perf_counter() - started)
+                close_old_connections()
+        finally:
+            connection.close()
+
+    def write(self, rnd, options):
+        if options['write_path'] == 'insert':
+            insert_messages([
+                (rnd.randrange(1, options['chats'] + 1), rnd.randrange(1, options['chats'] + 1),
+                 rnd.choice(SEED_TEXTS), None, None)
+                for _ in range(options['batch'])
+            ])
+            return
+        save_messages([
+            Message(user_id=rnd.randrange(1, options['chats'] + 1), chat_id=rnd.randrange(1, options['chats'] + 1),
+                    text=rnd.choice(SEED_TEXTS))
+            for _ in range(options['batch'])
+        ])
+
+    def read(self, rnd, options):
+        list(Message.objects.filter(chat_id=rnd.randrange(1, options['chats'] + 1)).order_by('-date')[:20])
+
+    def scan(self, rnd, options):
+        for _ in Message.objects.values_list('id', 'chat_id', 'text').iterator(chunk_size=2000):
+            pass
+
+    def write_results(self, mode, pragmas, config, results, options):
+        self.stdout.write(f'{mode}: journal_mode={pragmas["journal_mode"]} synchronous={pragmas["synchronous"]} '
+                          f'busy_timeout={pragmas["busy_timeout"]}ms '
+                          f'begin={config["SQLITE_TRANSACTION_MODE"] or "DEFERRED"} '
+                          f'conn_max_age={config["CONN_MAX_AGE"]}')
+        for kind, unit in (('write', options['batch']), ('read', 1), ('scan', options['rows'])):
+            latencies = sorted(latency for result in results[kind] for latency in result['latencies'])
+            errors = sum(result['errors'] for result in results[kind])
+            if latencies:
+                p50 = f'{latencies[len(latencies) // 2] * 1000:.1f}ms'
+                p99 = f'{latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms'
+            else:
+                p50 = p99 = '-'
+            if not latencies and not errors:
+                continue
+            self.stdout.write(f'    {kind:<5} ops={len(latencies)} rate={len(latencies) / options["seconds"]:.1f} ops/s '
+                              f'rows={len(latencies) * unit / options["seconds"]:.0f}/s errors={errors} '
+                              f'p50={p50} p99={p99}')
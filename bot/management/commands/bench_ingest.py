@@ -0,0 +1,65 @@
+import json
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bot.models import Chat, Message, MessageRollup
+from bot.seed import SEED_TEXTS
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк массовой загрузки сообщений через POST /api/messages/.
+
+    Создает тестовую базу данных и администратора, отправляет одни и те же синтетические сообщения
+    JSON-массивом и потоком NDJSON и выводит количество сохраненных строк в секунду, включая разбор,
+    проверку, запись и обновление агрегатов дашборда.
+
+    Пример использования:
+    python manage.py bench_ingest --rows 100000 --batch-size 5000
+    """
+    help = 'Измеряет скорость массовой загрузки сообщений через API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Количество сообщений в запросе.')
+        parser.add_argument('--chats', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, help='Количество строк в одной транзакции.')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        rows = []
+        for _ in range(options['rows']):
+            rows.append({'user_id': rnd.randrange(1, options['chats'] + 1),
+                         'chat_id': rnd.randrange(1, options['chats'] + 1), 'text': rnd.choice(SEED_TEXTS)})
+        bodies = (
+            ('json', 'application/json', json.dumps(rows, ensure_ascii=False).encode()),
+            ('ndjson', 'application/x-ndjson',
+             '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows).encode()),
+        )
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = User.objects.create_superuser('bench', password='bench')
+            client = Client(HTTP_HOST='localhost',
+                            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            batch_size = options['batch_size'] or settings.MESSAGE_INGEST_BATCH_SIZE
+            for name, content_type, body in bodies:
+                Message.objects.all().delete()
+                MessageRollup.objects.all().delete()
+                Chat.objects.all().delete()
+                with override_settings(MESSAGE_INGEST_BATCH_SIZE=batch_size):
+                    started = time.perf_counter()
+                    response = client.post('/api/messages/', body, content_type=content_type)
+                    elapsed = time.perf_counter() - started
+                result = response.json()
+                self.stdout.write(f'{name:<7} status={response.status_code} created={result["created"]} '
+                                  f'errors={len(result["errors"])} elapsed={elapsed:.2f}s '
+                                  f'rate={result["created"] / elapsed:,.0f} rows/s')
+        finally:
+            teardown_databases(old_config, verbosity=0)
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bot.metrics import MetricsRegistry, render_metrics
+from bot.seed import seed_messages
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк затрат MetricsMiddleware.
+
+    Одни и те же запросы к API выполняются без MetricsMiddleware и с ним (поочередно, --rounds раз, берется
+    лучший результат); разница во времени на запрос - затраты на учет показателей и SQL-запросов. Затем
+    --threads потоков одновременно записывают показатели в общий MetricsRegistry, а также измеряется время
+    ответа /metrics. Используется тестовая база данных, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_metrics --requests 2000 --threads 8
+    """
+    help = 'Измеряет затраты на сбор показателей запросов к API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов для каждого режима.')
+        parser.add_argument('--threads', type=int, default=8, help='Потоков, записывающих показатели.')
+        parser.add_argument('--rounds', type=int, default=5, help='Повторений каждого режима.')
+        parser.add_argument('--rows', type=int, default=1000, help='Сообщений в базе данных.')
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed_messages(options['rows'], chats=100)
+            user = User.objects.create_user('bench', password='bench-password')
+            token = str(RefreshToken.for_user(user).access_token)
+            without = [name for name in settings.MIDDLEWARE if name != 'bot.metrics.MetricsMiddleware']
+            for path in ('/api/messages/1/', '/api/messages/history/?limit=10'):
+                timings = {'without': float('inf'), 'with': float('inf')}
+                for _ in range(options['rounds']):
+                    for name, middleware in (('without', without), ('with', settings.MIDDLEWARE)):
+                        # Client загружает цепочку middleware при первом запросе, поэтому для режима нужен новый.
+                        with override_settings(MIDDLEWARE=middleware):
+                            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+                            timings[name] = min(timings[name], self.bench_requests(client, path, options['requests']))
+                self.stdout.write(f'{path:<36} without={timings["without"] * 1e6:7.1f}us '
+                                  f'with={timings["with"] * 1e6:7.1f}us '
+                                  f'overhead={(timings["with"] - timings["without"]) * 1e6:6.1f}us/request')
+            self.bench_registry(options['threads'], options['requests'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def bench_requests(self, client, path, count):
+        for _ in range(min(count, 100)):
+            client.get(path)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(path)
+        return (time.perf_counter() - started) / count
+
+    def bench_registry(self, threads, count):
+        registry = MetricsRegistry()
+        routes = [f'route-{i}' for i in range(20)]
+
+        def observe():
+            for i in range(count):
+                registry.observe(routes[i % len(routes)], 'GET', 200, 0.01, 3, 0.001, 1000)
+
+        workers = [threading.Thread(target=observe) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        snapshot = registry.snapshot()
+        total = sum(sum(metrics.statuses.values()) for metrics in snapshot.values())
+        self.stdout.write(f'registry threads={threads} observed={total}/{threads * count} '
+                          f'{elapsed / (threads * count) * 1e6:.2f}us/observe')
+
+        started = time.perf_counter()
+        text = render_metrics()
+        self.stdout.write(f'/metrics render={(time.perf_counter() - started) * 1000:.1f}ms size={len(text)}B')
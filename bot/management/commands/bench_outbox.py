@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from django.core.management.base import BaseCommand
+from telegram import Bot
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
+
+from bot.outbox import BROADCAST, REPLY, Outbox
+from bot.stubs import STUB_TOKEN, StubServer
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк очереди исходящих сообщений против заглушки Telegram с ограничением частоты отправки.
+
+    Рассылка по --per-chat сообщений подряд в --chats чатов ставится в очередь сразу, а ответы
+    пользователям в другие чаты приходят равномерно с частотой --reply-rate в секунду. Режим inline отправляет все сообщения сразу
+    (как обработчики без очереди), режим outbox - через Outbox. Для каждого режима выводятся
+    пропускная способность, количество ответов 429, максимальное количество сообщений за секунду
+    и минимальный интервал между сообщениями в одном чате по данным заглушки, а также время
+    ожидания ответов и рассылки.
+
+    Пример использования:
+    python manage.py bench_outbox --chats 200 --per-chat 2 --replies 100 --reply-rate 5
+    """
+    help = 'Проверяет пропускную способность и соблюдение ограничений Telegram очередью исходящих сообщений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chats', type=int, default=200, help='Количество чатов в рассылке.')
+        parser.add_argument('--per-chat', type=int, default=2, help='Количество сообщений рассылки в одном чате.')
+        parser.add_argument('--replies', type=int, default=100, help='Количество ответов пользователям.')
+        parser.add_argument('--reply-rate', type=float, default=5.0, help='Частота ответов, в секунду.')
+        parser.add_argument('--telegram-latency', type=float, default=0.05, help='Задержка методов Bot API, с.')
+        parser.add_argument('--global-limit', type=int, default=30, help='Ограничение заглушки, сообщений в секунду.')
+        parser.add_argument('--chat-limit', type=float, default=1.0,
+                            help='Ограничение заглушки в одном чате, сообщений в секунду.')
+        parser.add_argument('--mode', choices=('inline', 'outbox'), nargs='+', default=['inline', 'outbox'])
+
+    def handle(self, *args, **options):
+        for mode in options['mode']:
+            with StubServer(telegram_latency=options['telegram_latency'], global_limit=options['global_limit'],
+                            chat_limit=options['chat_limit']) as stub:
+                result = asyncio.run(self.run_once(stub, mode, options))
+                self.report(stub, mode, result)
+
+    async def run_once(self, stub, mode, options):
+        bot = Bot(STUB_TOKEN, base_url=stub.bot_api_url, request=HTTPXRequest(connection_pool_size=64))
+        waits = {REPLY: [], BROADCAST: []}
+        errors = 0
+        semaphore = asyncio.Semaphore(64)
+
+        async def inline(chat_id, text):
+            async with semaphore:
+                await bot.send_message(chat_id, text)
+
+        async def timed(priority, send):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                await send
+            except RetryAfter:
+                errors += 1
+            else:
+                waits[priority].append(time.perf_counter() - started)
+
+        async with bot:
+            outbox = None
+            if mode == 'outbox':
+                outbox = Outbox(bot)
+                outbox.start()
+
+            def submit(chat_id, text, priority):
+                if outbox is None:
+                    return asyncio.ensure_future(timed(priority, inline(chat_id, text)))
+                return asyncio.ensure_future(timed(priority, outbox.send_message(chat_id, text, priority)))
+
+            started = time.perf_counter()
+            tasks = [submit(chat_id, f'Рассылка {n}', BROADCAST)
+                     for chat_id in range(1, options['chats'] + 1) for n in range(options['per_chat'])]
+            for i in range(options['replies']):
+                tasks.append(submit(1_000_000 + i, f'Ответ {i}', REPLY))
+                await asyncio.sleep(1 / options['reply_rate'])
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+            if outbox is not None:
+                await outbox.stop()
+        return {'elapsed': elapsed, 'waits': waits, 'errors': errors}
+
+    def report(self, stub, mode, result):
+        delivered = len(stub.sent)
+        times = [sent_at for _, _, sent_at in stub.sent]
+        window = deque()
+        peak = 0
+        for sent_at in times:
+            window.append(sent_at)
+            while window[0] <= sent_at - 1:
+                window.popleft()
+            peak = max(peak, len(window))
+        by_chat = defaultdict(list)
+        for _, params, sent_at in stub.sent:
+            by_chat[int(params['chat_id'])].append(sent_at)
+        intervals = [b - a for chat_times in by_chat.values() for a, b in zip(chat_times, chat_times[1:])]
+        min_interval = f'{min(intervals):.2f}s' if intervals else '-'
+
+        self.stdout.write(f'{mode:<7} delivered={delivered} lost={result["errors"]} http_429={stub.throttled} '
+                          f'elapsed={result["elapsed"]:.2f}s rate={delivered / result["elapsed"]:.1f} msg/s '
+                          f'peak={peak} msg/s min_chat_interval={min_interval}')
+        for priority, name in ((REPLY, 'reply'), (BROADCAST, 'broadcast')):
+            waits = sorted(result['waits'][priority])
+            if waits:
+                self.stdout.write(f'    {name:<10} p50={waits[len(waits) // 2] * 1000:.0f}ms '
+                                  f'p95={waits[int(len(waits) * 0.95)] * 1000:.0f}ms max={waits[-1] * 1000:.0f}ms')
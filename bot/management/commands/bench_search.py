@@ -0,0 +1,98 @@
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from bot.models import Message
+from bot.search import search_messages
+from bot.seed import seed_messages
+
+# Частые слова сообщений; в начале списка - самые частые.
+COMMON_WORDS = (
+    'привет', 'погода', 'какая', 'сегодня', 'завтра', 'новости', 'спасибо', 'помощь', 'Москва', 'будет',
+    'дождь', 'снег', 'Казань', 'технологии', 'спорт', 'курс', 'доллара', 'утром', 'вечером', 'Петербург',
+    'ветер', 'холодно', 'тепло', 'ёлка', 'зелёный', 'музыка', 'кино', 'выходные', 'работа', 'пробки',
+)
+SYLLABLES = ('ка', 'ло', 'ми', 'ра', 'ст', 'но', 'ве', 'ду', 'зо', 'пи', 'ле', 'ры', 'шу', 'та', 'ён', 'ги')
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк полнотекстового поиска по сообщениям в сравнении с фильтром text__icontains.
+
+    Таблица заполняется --rows сообщениями из слов с распределением Ципфа (частые слова и длинный хвост
+    редких слов). Для каждого запроса выводится медианное время получения первой страницы (20 сообщений)
+    через search_messages по релевантности (rank) и по дате (date) и через
+    Message.objects.filter(text__icontains=...) по убыванию id, а также количество найденных сообщений
+    на странице. С --rank-window сортировка по релевантности ранжирует только столько последних совпадений
+    (SEARCH_RANK_WINDOW). Используется временная база данных SQLite в файле, которая удаляется после завершения.
+
+    Пример использования:
+    python manage.py bench_search --rows 10000000
+    """
+    help = 'Сравнивает время полнотекстового поиска и text__icontains на большой таблице сообщений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Сообщений в базе данных.')
+        parser.add_argument('--vocabulary', type=int, default=50000,
+                            help='Количество различных слов (не больше 65536).')
+        parser.add_argument('--repeat', type=int, default=3, help='Повторений каждого запроса.')
+        parser.add_argument('--rank-window', type=int, nargs='+', default=[settings.SEARCH_RANK_WINDOW],
+                            help='Значения SEARCH_RANK_WINDOW (0 - ранжировать все совпадения).')
+
+    def handle(self, *args, **options):
+        # Редкие слова - различные сочетания четырех слогов, ни одно не входит в другое как подстрока.
+        rare = [''.join(syllables) for syllables in itertools.islice(
+            itertools.product(SYLLABLES, repeat=4), options['vocabulary'] - len(COMMON_WORDS))]
+        random.Random(1).shuffle(rare)
+        words = list(COMMON_WORDS) + rare
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+        def text_factory(rnd):
+            return ' '.join(rnd.choices(words, cum_weights=weights, k=rnd.randint(3, 12)))
+
+        queries = [('common', 'погода'), ('common-form', 'погоду'), ('two-words', 'погода Москва'),
+                   ('yo', 'елка'), ('medium', words[len(words) // 100]), ('rare', words[-1]),
+                   ('absent', 'отсутствующееслово')]
+        with tempfile.TemporaryDirectory() as directory:
+            settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            started = time.perf_counter()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                seed_messages(options['rows'], chats=100000, days=365, text_factory=text_factory)
+                size = os.path.getsize(settings.DATABASES['default']['TEST']['NAME'])
+                self.stdout.write(f'rows={options["rows"]} seed+index={time.perf_counter() - started:.1f}s '
+                                  f'database={size / 1e6:.0f}MB')
+                for window in options['rank_window']:
+                    self.stdout.write(f'rank_window={window}')
+                    with override_settings(SEARCH_RANK_WINDOW=window):
+                        for name, query in queries:
+                            self.bench_query(name, query, options['repeat'])
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    def bench_query(self, name, query, repeat):
+        timings = {'rank': [], 'date': [], 'icontains': []}
+        found = {}
+        for _ in range(repeat):
+            for order in ('rank', 'date'):
+                started = time.perf_counter()
+                found[order] = len(search_messages(query, Message.objects.all(), limit=20, order=order))
+                timings[order].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            rows = Message.objects.all()
+            for word in query.split():
+                rows = rows.filter(text__icontains=word)
+            found['icontains'] = len(list(rows.order_by('-id').values_list('id', flat=True)[:20]))
+            timings['icontains'].append(time.perf_counter() - started)
+
+        self.stdout.write(f'{name:<12} q={query!r:<22} ' + ' '.join(
+            f'{method}={statistics.median(timings[method]) * 1000:8.1f}ms found={found[method]:<3}'
+            for method in timings))
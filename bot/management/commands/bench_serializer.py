@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework.renderers import JSONRenderer
+
+from bot.models import Message
+from bot.seed import seed_messages
+from bot.serializers import MessageSerializer, message_values, serialize_messages
+
+
+class Command(BaseCommand):
+    """
+    Микробенчмарк сериализации сообщений: MessageSerializer против serialize_messages.
+
+    Создает тестовую базу данных, заполняет ее синтетическими сообщениями и для каждого способа
+    измеряет количество строк в секунду отдельно для сериализации и вместе с чтением из базы данных
+    и формированием JSON. Завершается с ошибкой, если JSON двух способов отличается хотя бы на байт.
+
+    Пример использования:
+    python manage.py bench_serializer --rows 100000
+    """
+    help = 'Сравнивает скорость MessageSerializer и быстрой сериализации сообщений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Количество сообщений.')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество повторов; выводится лучший.')
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed_messages(options['rows'])
+            rows = options['rows']
+            renderer = JSONRenderer()
+
+            def drf(instances):
+                return MessageSerializer(instances, many=True).data
+
+            def fast(values):
+                return serialize_messages(values)
+
+            expected = renderer.render(drf(list(Message.objects.order_by('id'))))
+            actual = renderer.render(fast(list(message_values(Message.objects.order_by('id')))))
+            if expected != actual:
+                raise CommandError('JSON быстрой сериализации отличается от MessageSerializer.')
+
+            for name, load, serialize in (
+                ('MessageSerializer', lambda: list(Message.objects.order_by('id')), drf),
+                ('serialize_messages', lambda: list(message_values(Message.objects.order_by('id'))), fast),
+            ):
+                serialize_only = end_to_end = float('inf')
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    loaded = load()
+                    loaded_at = time.perf_counter()
+                    data = serialize(loaded)
+                    serialized_at = time.perf_counter()
+                    renderer.render(data)
+                    serialize_only = min(serialize_only, serialized_at - loaded_at)
+                    end_to_end = min(end_to_end, time.perf_counter() - started)
+                self.stdout.write(f'{name:<20} serialize={rows / serialize_only:,.0f} rows/s '
+                                  f'db+serialize+json={rows / end_to_end:,.0f} rows/s')
+            self.stdout.write(f'JSON совпадает ({len(expected):,} байт)')
+        finally:
+            teardown_databases(old_config, verbosity=0)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+
+from bot.sharding import ShardedBot
+from bot.stubs import COMMAND_MIX, STUB_TOKEN, StubServer, synthetic_updates
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк многопроцессного режима бота против локальной заглушки Telegram.
+
+    Для каждого количества процессов-обработчиков бот принимает одни и те же синтетические обновления
+    (каждое требует ответа) и обрабатывает их, пока заглушка не получит все ответы. Процессы работают
+    с временной базой данных SQLite в файле, которая удаляется после завершения; ограничения частоты
+    отправки очереди исходящих сообщений отключены.
+
+    Пример использования:
+    python manage.py bench_shards --updates 5000 --workers 1 2 4 8
+    """
+    help = 'Измеряет пропускную способность бота в зависимости от количества процессов-обработчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=3000, help='Количество обновлений.')
+        parser.add_argument('--chats', type=int, default=1000, help='Количество различных чатов.')
+        parser.add_argument('--latency', type=float, default=0.05, help='Задержка OpenWeatherMap и newsapi, с.')
+        parser.add_argument('--telegram-latency', type=float, default=0.0, help='Задержка методов Bot API, с.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                for workers in options['workers']:
+                    elapsed, sharded = self.run_once(workers, options)
+                    self.stdout.write(f'workers={workers:<3} updates={options["updates"]} elapsed={elapsed:.2f}s '
+                                      f'rate={options["updates"] / elapsed:.1f} updates/s '
+                                      f'backpressure={sharded.backpressure} restarts={sharded.restarts}')
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    def run_once(self, workers, options):
+        mix = tuple((kind, weight) for kind, weight in COMMAND_MIX if kind != 'text')
+        updates = synthetic_updates(options['updates'], chats=options['chats'], mix=mix)
+        with StubServer(updates, latency=options['latency'], telegram_latency=options['telegram_latency']) as stub:
+            # Процессы-обработчики запускаются заново и читают настройки из переменных окружения.
+            environ = {
+                'DATABASE_NAME': settings.DATABASES['default']['NAME'],
+                'OPENWEATHERMAP_URL': f'{stub.url}/data/2.5/weather',
+                'NEWS_API_URL': f'{stub.url}/v2/top-headlines',
+                'OUTBOX_GLOBAL_RATE': '0',
+                'OUTBOX_CHAT_RATE': '0',
+                'OUTBOX_GROUP_RATE': '0',
+            }
+            saved = {key: os.environ.get(key) for key in environ}
+            os.environ.update(environ)
+            try:
+                sharded = ShardedBot(STUB_TOKEN, workers, base_url=stub.bot_api_url, poll_timeout=1)
+                sharded.start()
+                # Время запуска процессов не учитывается.
+                sharded.wait_ready()
+                started = time.perf_counter()
+                poller = threading.Thread(target=sharded.poll)
+                poller.start()
+                stub.wait_sent(len(updates))
+                elapsed = time.perf_counter() - started
+                sharded.request_stop()
+                poller.join()
+                sharded.stop()
+            finally:
+                for key, value in saved.items():
+                    if value is None:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+        return elapsed, sharded
@@ -0,0 +1,80 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from bot.broadcast import claim_broadcast, create_broadcast, run_broadcast
+from bot.models import Broadcast
+from bot.outbox import Outbox
+
+
+class Command(BaseCommand):
+    """
+    Рассылка сообщения по всем чатам, которые писали боту.
+
+    Без --queue рассылка создается и сразу выполняется этим процессом через очередь исходящих сообщений
+    с ограничениями settings.OUTBOX_*. Если бот запущен, лучше использовать --queue: рассылку выполнит
+    сам бот, и ответы пользователям будут отправляться раньше сообщений рассылки. Прерванную рассылку
+    можно продолжить с последнего сохраненного куска чатов с помощью --resume.
+
+    Пример использования:
+    python manage.py broadcast "Бот будет недоступен с 02:00 до 03:00"
+    python manage.py broadcast "Новая команда /news technology" --queue
+    python manage.py broadcast --resume 3
+    python manage.py broadcast --list
+    """
+    help = 'Отправляет сообщение во все чаты из реестра чатов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('text', nargs='?', help='Текст сообщения.')
+        parser.add_argument('--queue', action='store_true', help='Только создать рассылку для работающего бота.')
+        parser.add_argument('--resume', type=int, metavar='ID', help='Продолжить прерванную рассылку.')
+        parser.add_argument('--force', action='store_true',
+                            help='Продолжить рассылку, даже если ее прогресс сохранялся недавно.')
+        parser.add_argument('--list', action='store_true', help='Показать последние рассылки.')
+        parser.add_argument('--chunk-size', type=int, help='Количество чатов в куске.')
+        parser.add_argument('--token', default=settings.TELEGRAM_BOT_TOKEN, help='Токен Telegram-бота.')
+        parser.add_argument('--base-url', default=settings.TELEGRAM_BOT_API_URL, help='Базовый URL Bot API.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for broadcast in Broadcast.objects.order_by('-id')[:20]:
+                self.write_progress(broadcast)
+            return
+        # Токен проверяется до создания и захвата рассылки, иначе она осталась бы в состоянии "running".
+        if not options['token'] and not options['queue']:
+            raise CommandError('Не задан токен бота (TELEGRAM_BOT_TOKEN или --token).')
+
+        if options['resume'] is not None:
+            broadcast = claim_broadcast(options['resume'], stale_after=0 if options['force'] else None)
+            if broadcast is None:
+                raise CommandError(f'Рассылка {options["resume"]} не найдена, завершена или выполняется '
+                                   f'другим процессом (используйте --force).')
+        elif options['text']:
+            broadcast = create_broadcast(options['text'])
+            self.stdout.write(f'Создана рассылка {broadcast.pk} на {broadcast.total} чатов')
+            if options['queue']:
+                return
+            broadcast = claim_broadcast(broadcast.pk)
+        else:
+            raise CommandError('Укажите текст рассылки, --resume или --list.')
+
+        broadcast = asyncio.run(self.run(broadcast, options))
+        self.write_progress(broadcast)
+
+    async def run(self, broadcast, options):
+        kwargs = {'base_url': options['base_url']} if options['base_url'] else {}
+        bot = Bot(options['token'], request=HTTPXRequest(connection_pool_size=settings.OUTBOX_WORKERS), **kwargs)
+        async with bot:
+            outbox = Outbox.from_settings(bot)
+            outbox.start()
+            try:
+                return await run_broadcast(broadcast, outbox, options['chunk_size'], progress=self.write_progress)
+            finally:
+                await outbox.stop()
+
+    def write_progress(self, broadcast):
+        self.stdout.write(f'{broadcast.pk}: {broadcast.status} sent={broadcast.sent} blocked={broadcast.blocked} '
+                          f'failed={broadcast.failed} of {broadcast.total} last_chat_id={broadcast.last_chat_id}')
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from bot import query_plans
+from bot.seed import seed_messages
+
+
+class Command(BaseCommand):
+    """
+    Проверяет планы запросов представлений на заполненной тестовой базе.
+
+    Создает тестовую базу данных, заполняет таблицу Message синтетическими сообщениями, выполняет
+    EXPLAIN для каждого запроса из bot.query_plans и завершается с ошибкой, если какой-либо запрос
+    читает таблицу целиком. С --rows 0 проверяет текущую базу без заполнения.
+
+    Пример использования:
+    python manage.py explain_queries --rows 1000000
+    """
+    help = 'Выполняет EXPLAIN для запросов API и завершается с ошибкой при полном просмотре таблиц.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Количество сообщений в тестовой базе.')
+        parser.add_argument('--chats', type=int, default=10000)
+        parser.add_argument('--verbose-plans', action='store_true', help='Выводить планы целиком.')
+
+    def handle(self, *args, **options):
+        if not options['rows']:
+            return self.report(options)
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            started = time.perf_counter()
+            seed_messages(options['rows'], chats=options['chats'])
+            query_plans.analyze()
+            self.stdout.write(f'Заполнено {options["rows"]} сообщений за {time.perf_counter() - started:.1f}s')
+            self.report(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def report(self, options):
+        failed = []
+        for name, plan, scans, full_scan_ok in query_plans.check():
+            if not scans:
+                status = 'OK'
+            elif full_scan_ok:
+                status = 'FULL SCAN (допустимо)'
+            else:
+                status = 'FULL SCAN'
+                failed.append(name)
+            self.stdout.write(f'{status:<22} {name}')
+            for line in (plan.splitlines() if options['verbose_plans'] else scans):
+                self.stdout.write(f'{"":<22}   {line}')
+        if failed:
+            raise CommandError('Полный просмотр таблицы: ' + ', '.join(failed))
@@ -0,0 +1,65 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from bot import export
+from bot.filters import filter_messages
+from bot.models import Message
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка истории сообщений в файл в формате NDJSON или CSV.
+
+    Память не зависит от размера таблицы: строки читаются кусками по --chunk-size. В конце выводится
+    id последней выгруженной строки; чтобы продолжить прерванную выгрузку, передайте его в --after-id.
+
+    Пример использования:
+    python manage.py export_messages messages.ndjson.gz --gzip
+    python manage.py export_messages messages.csv --output csv --date-from 2023-08-01 --after-id 1500000
+    """
+    help = 'Выгружает сообщения в NDJSON или CSV (с необязательным сжатием gzip).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или "-" для stdout.')
+        parser.add_argument('--output', choices=export.FORMATS, default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--after-id', type=int)
+        parser.add_argument('--append', action='store_true', help='Дописать в существующий файл (для продолжения).')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        for name in ('chat-id', 'user-id', 'command', 'date-from', 'date-to'):
+            parser.add_argument(f'--{name}')
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for name in ('chat_id', 'user_id', 'command', 'date_from', 'date_to'):
+            if options[name] is not None:
+                params[name] = options[name]
+
+        last_id = None
+        count = 0
+
+        def tracked(rows):
+            nonlocal last_id, count
+            for row in rows:
+                last_id = row[0]
+                count += 1
+                yield row
+
+        rows = export.export_rows_with_archive(filter_messages(Message.objects.all(), params), params,
+                                               options['after_id'], options['chunk_size'])
+        stream = export.export_stream(tracked(rows), options['output'], options['gzip'])
+        started = time.perf_counter()
+        if options['path'] == '-':
+            out, close = sys.stdout.buffer, False
+        else:
+            out, close = open(options['path'], 'ab' if options['append'] else 'wb'), True
+        try:
+            for block in stream:
+                out.write(block)
+        finally:
+            if close:
+                out.close()
+        self.stderr.write(f'Выгружено {count} сообщений за {time.perf_counter() - started:.1f}s, last_id={last_id}')
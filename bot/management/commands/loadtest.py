@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bot import rollups, webhook
+from bot.loadtest import (ENDPOINTS, LOADTEST_BROADCAST_TEXT, WARMUP_REQUESTS, LoadTestData,
+                          cancel_loadtest_broadcasts, compare_results, environment, run_api, run_bot,
+                          uncovered_routes)
+from bot.models import Broadcast, Message
+from bot.seed import seed_messages
+from bot.stubs import STUB_TOKEN, StubServer, synthetic_updates
+from bot.throttling import LoginRateThrottle, LoginUsernameRateThrottle
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест бота и всех REST-эндпоинтов против локальных заглушек Telegram, OpenWeatherMap и newsapi.
+
+    Таблица Message заполняется --rows сообщениями, затем:
+    - бот (runtime) обрабатывает --updates синтетических обновлений из заглушки Telegram;
+    - каждый сценарий bot.loadtest.ENDPOINTS (все маршруты Bot_service/urls.py) получает --requests запросов
+      в --concurrency потоков через локальный многопоточный WSGI-сервер.
+    Для каждого сценария выводятся пропускная способность и задержки p50/p95/p99; отчет с коммитом и
+    параметрами прогона сохраняется в JSON (--output), а с --compare сравнивается с предыдущим отчетом.
+
+    По умолчанию используется временная база данных SQLite, которая удаляется после завершения. С --database
+    база данных сохраняется и при следующих запусках дополняется до --rows сообщений, поэтому большой набор
+    данных (1-50 млн сообщений) заполняется один раз; данные, созданные нагрузкой, в ней остаются.
+    Ограничения частоты входа на время теста отключаются (--throttle - оставить).
+
+    Пример использования:
+    python manage.py loadtest --rows 1000000 --database /var/tmp/loadtest.sqlite3 --compare loadtest-abc.json
+    """
+    help = 'Измеряет пропускную способность и задержки бота и REST API против локальных заглушек.'
+
+    def add_arguments(self, parser):
+        names = ['bot'] + [endpoint.name for endpoint in ENDPOINTS]
+        parser.add_argument('--rows', type=int, default=100000, help='Сообщений в базе данных.')
+        parser.add_argument('--chats', type=int, default=10000, help='Различных чатов в сообщениях.')
+        parser.add_argument('--database', help='Имя сохраняемой тестовой базы данных (для SQLite - путь к файлу).')
+        parser.add_argument('--scenarios', nargs='+', choices=names, default=names, metavar='NAME',
+                            help=f'Сценарии: {", ".join(names)}.')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов к каждому эндпоинту.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов к API.')
+        parser.add_argument('--updates', type=int, default=2000, help='Обновлений для бота.')
+        parser.add_argument('--bot-concurrency', type=int, default=64, help='Конкурентность обработки обновлений.')
+        parser.add_argument('--latency', type=float, default=0.05, help='Задержка OpenWeatherMap и newsapi, с.')
+        parser.add_argument('--telegram-latency', type=float, default=0.01, help='Задержка методов Bot API, с.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Доля запросов OpenWeatherMap и newsapi с ошибкой 503.')
+        parser.add_argument('--telegram-error-rate', type=float, default=0.0,
+                            help='Доля отправок сообщений с ошибкой 502.')
+        parser.add_argument('--timeout', type=float, default=300, help='Наибольшее время обработки обновлений, с.')
+        parser.add_argument('--throttle', action='store_true', help='Не отключать ограничения частоты входа.')
+        parser.add_argument('--output', help='Файл отчета JSON; по умолчанию loadtest-<коммит>.json.')
+        parser.add_argument('--compare', help='Предыдущий отчет JSON для сравнения.')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Ухудшение в процентах, которое считается регрессией.')
+
+    def handle(self, *args, **options):
+        for route in uncovered_routes():
+            self.stderr.write(f'Нет сценария нагрузки для маршрута {route}.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            keepdb = bool(options['database'])
+            if keepdb:
+                settings.DATABASES['default']['TEST']['NAME'] = options['database']
+            elif connection.vendor == 'sqlite':
+                # Запросы API выполняются в разных потоках, поэтому база данных в памяти не подходит.
+                settings.DATABASES['default']['TEST']['NAME'] = os.path.join(directory, 'loadtest.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb)
+            try:
+                cancel_loadtest_broadcasts()
+                rows = self.seed(options['rows'], options['chats'])
+                report = {'environment': environment(), 'rows': rows,
+                          'options': {key: options[key] for key in (
+                              'chats', 'requests', 'concurrency', 'updates', 'bot_concurrency', 'latency',
+                              'telegram_latency', 'error_rate', 'telegram_error_rate', 'throttle')}}
+                report.update(self.run(options))
+                cancel_loadtest_broadcasts()
+            finally:
+                teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+
+        output = options['output'] or f'loadtest-{(report["environment"]["commit"] or "unknown")[:12]}.json'
+        with open(output, 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчет сохранен в {output}.')
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                old = json.load(file)
+            self.stdout.write(f'Сравнение с {options["compare"]} (коммит {old["environment"]["commit"]}):')
+            regressions = 0
+            for name, metric, was, now, change, regression in compare_results(old, report, options['threshold']):
+                regressions += regression
+                self.stdout.write(f'    {name:<20} {metric:<10} {was:>10} -> {now:<10} {change:+.1f}%'
+                                  + ('  РЕГРЕССИЯ' if regression else ''))
+            self.stdout.write(f'Регрессий: {regressions}.')
+
+    def seed(self, rows, chats):
+        existing = Message.objects.count()
+        if existing < rows:
+            seed_messages(rows - existing, chats=chats, days=90)
+            rollups.rebuild()
+            existing = rows
+        self.stdout.write(f'rows={existing}')
+        return existing
+
+    def run(self, options):
+        scenarios = set(options['scenarios'])
+        updates = synthetic_updates(options['updates'], chats=options['chats']) if 'bot' in scenarios else []
+        results = {}
+        with StubServer(updates, latency=options['latency'], telegram_latency=options['telegram_latency'],
+                        error_rate=options['error_rate'], telegram_error_rate=options['telegram_error_rate']) as stub:
+            with override_settings(OPENWEATHERMAP_URL=f'{stub.url}/data/2.5/weather',
+                                   NEWS_API_URL=f'{stub.url}/v2/top-headlines',
+                                   TELEGRAM_BOT_TOKEN=STUB_TOKEN, TELEGRAM_BOT_API_URL=stub.bot_api_url,
+                                   TELEGRAM_WEBHOOK_SECRET=uuid.uuid4().hex,
+                                   ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, '127.0.0.1'],
+                                   OUTBOX_GLOBAL_RATE=0, OUTBOX_CHAT_RATE=0, OUTBOX_GROUP_RATE=0,
+                                   # Рассылки, созданные запросами к API, не выполняются во время теста.
+                                   BROADCAST_POLL_INTERVAL=3600):
+                if 'bot' in scenarios:
+                    results['bot'] = asyncio.run(run_bot(stub, len(updates), options['bot_concurrency'],
+                                                         options['timeout']))
+                    self.write_result('bot', results['bot'], f'processed={results["bot"]["processed"]}')
+
+                endpoints = [endpoint for endpoint in ENDPOINTS if endpoint.name in scenarios]
+                if endpoints:
+                    results['api'] = self.run_api(endpoints, options)
+                    for name, result in results['api'].items():
+                        self.write_result(name, result, f'statuses={result["statuses"]}')
+        return results
+
+    def run_api(self, endpoints, options):
+        data = self.prepare(options['requests'], options['chats'])
+        throttles = (LoginRateThrottle, LoginUsernameRateThrottle)
+        rates = [throttle.THROTTLE_RATES for throttle in throttles]
+        if not options['throttle']:
+            # Частоты ограничений читаются из настроек при импорте DRF, поэтому отключаются в самих классах.
+            for throttle in throttles:
+                throttle.THROTTLE_RATES = {**throttle.THROTTLE_RATES, throttle.scope: None}
+        try:
+            return run_api(data, endpoints, options['requests'], options['concurrency'])
+        finally:
+            for throttle, rate in zip(throttles, rates):
+                throttle.THROTTLE_RATES = rate
+            if webhook._dispatcher is not None:
+                webhook._dispatcher.stop()
+                webhook._dispatcher = None
+
+    def prepare(self, requests, chats):
+        password = uuid.uuid4().hex
+        user, _ = User.objects.get_or_create(username='loadtest-admin')
+        user.is_staff = user.is_superuser = True
+        user.set_password(password)
+        user.save()
+        message_ids = list(Message.objects.order_by('-id').values_list('id', flat=True)[:1000])
+        # Каждый запрос отмены (и прогрева) получает свою рассылку.
+        broadcasts = Broadcast.objects.bulk_create([Broadcast(text=LOADTEST_BROADCAST_TEXT)
+                                                    for _ in range(requests + WARMUP_REQUESTS)])
+        return LoadTestData(user.username, password, str(RefreshToken.for_user(user).access_token), message_ids,
+                            chats, [broadcast.pk for broadcast in broadcasts], settings.TELEGRAM_WEBHOOK_SECRET)
+
+    def write_result(self, name, result, extra):
+        latency = result['latency']
+        self.stdout.write(f'{name:<20} rate={result["throughput"]:>8.1f}/s '
+                          + ' '.join(f'{key}={latency.get(key, 0):.1f}ms' for key in ('p50', 'p95', 'p99'))
+                          + f' {extra}')
@@ -0,0 +1,47 @@
+import json
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Отправляет записанные обновления Telegram на эндпоинт webhook, как это делал бы сам Telegram.
+
+    Файл может содержать одно обновление, JSON-массив обновлений или NDJSON (по обновлению в строке).
+
+    Пример использования:
+    python manage.py post_updates updates.json --url http://127.0.0.1:8000/api/telegram/webhook/
+    """
+    help = 'Отправляет обновления из файла на локальный webhook бота.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с обновлениями (JSON или NDJSON).')
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/telegram/webhook/')
+        parser.add_argument('--secret', default=None, help='Секретный токен, по умолчанию TELEGRAM_WEBHOOK_SECRET.')
+
+    def handle(self, *args, **options):
+        updates = self.load(options['path'])
+        secret = options['secret'] or settings.TELEGRAM_WEBHOOK_SECRET or ''
+        started = time.perf_counter()
+        statuses = {}
+        with httpx.Client(headers={'X-Telegram-Bot-Api-Secret-Token': secret}) as client:
+            for update in updates:
+                response = client.post(options['url'], json=update)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Отправлено {len(updates)} обновлений за {elapsed:.2f}s, ответы: {statuses}')
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            content = f.read().strip()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            try:
+                return [json.loads(line) for line in content.splitlines() if line.strip()]
+            except ValueError as e:
+                raise CommandError(f'Не удалось разобрать {path}: {e}')
+        return data if isinstance(data, list) else [data]
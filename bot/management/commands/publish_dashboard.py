@@ -0,0 +1,32 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bot.dashboard import DashboardPublisher
+
+
+class Command(BaseCommand):
+    """
+    Рассылка изменений дашборда подписчикам WebSocket всех ASGI-процессов.
+
+    Используется с DASHBOARD_PUBLISHER=external и общим слоем каналов (CHANNEL_REDIS_URL): данные
+    дашборда вычисляются одним процессом раз в DASHBOARD_PUSH_INTERVAL секунд, и изменения отправляются
+    в группу подписчиков слоя каналов. Со слоем каналов в памяти процесса команда бесполезна.
+
+    Пример использования:
+    python manage.py publish_dashboard
+    """
+    help = 'Вычисляет данные дашборда и рассылает изменения подписчикам WebSocket.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.DASHBOARD_PUSH_INTERVAL,
+                            help='Интервал между вычислениями, в секундах.')
+
+    def handle(self, *args, **options):
+        publisher = DashboardPublisher(interval=options['interval'])
+        try:
+            asyncio.run(publisher.run())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Вычислений: {publisher.computations}, отправлено изменений: {publisher.published}')
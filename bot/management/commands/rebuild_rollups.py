@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from bot import rollups
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает агрегаты дашборда и реестр чатов по таблице Message.
+
+    Нужен после первого применения миграции 0004 (для уже накопленных сообщений) и может запускаться
+    периодически для уплотнения агрегатов за последние сутки.
+
+    Пример использования:
+    python manage.py rebuild_rollups
+    python manage.py rebuild_rollups --since 2023-08-01 --until 2023-08-31
+    """
+    help = 'Пересчитывает агрегаты MessageRollup и реестр чатов по таблице Message.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=self.parse_date, help='Начало периода, YYYY-MM-DD.')
+        parser.add_argument('--until', type=self.parse_date, help='Конец периода включительно, YYYY-MM-DD.')
+
+    @staticmethod
+    def parse_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild(options['since'], options['until'])
+        self.stdout.write(f'Пересчитано строк агрегатов: {created}')
@@ -0,0 +1,39 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from telegram import Bot
+
+
+class Command(BaseCommand):
+    """
+    Регистрирует (или удаляет) webhook бота в Telegram.
+
+    Пример использования:
+    python manage.py set_webhook https://example.com/api/telegram/webhook/
+    python manage.py set_webhook --delete
+    """
+    help = 'Регистрирует webhook бота с секретным токеном TELEGRAM_WEBHOOK_SECRET.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', help='Публичный адрес эндпоинта /api/telegram/webhook/.')
+        parser.add_argument('--delete', action='store_true', help='Удалить webhook и вернуться к polling.')
+        parser.add_argument('--max-connections', type=int, default=40)
+
+    def handle(self, *args, **options):
+        if not options['delete'] and not options['url']:
+            raise CommandError('Укажите URL webhook или --delete.')
+        if not options['delete'] and not settings.TELEGRAM_WEBHOOK_SECRET:
+            raise CommandError('Не задан TELEGRAM_WEBHOOK_SECRET.')
+        asyncio.run(self.apply(options))
+
+    async def apply(self, options):
+        bot = Bot(settings.TELEGRAM_BOT_TOKEN, base_url=settings.TELEGRAM_BOT_API_URL or 'https://api.telegram.org/bot')
+        async with bot:
+            if options['delete']:
+                await bot.delete_webhook()
+                self.stdout.write('Webhook удален.')
+            else:
+                await bot.set_webhook(options['url'], secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+                                      max_connections=options['max_connections'])
+                self.stdout.write(f'Webhook установлен: {options["url"]}')
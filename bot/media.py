@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from telegram.error import BadRequest
+
+from .models import MediaFile
+
+logger = logging.getLogger(__name__)
+
+WEATHER_IMAGES = {
+    'weather/sunny': 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRroEkG0Z1tSw9MlJo41mqB-MkoaW8aDjh5cw&usqp=CAU',
+    'weather/warm': 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcR8CyW7cQ6VNVjG0vrcfuClyzC1IwUgUtw8iF1rAtXBcaQjcrY5axboM1YDoA--KzTjCwI&usqp=CAU',
+    'weather/cold': 'https://e7.pngegg.com/pngimages/595/116/png-clipart-winter-smiley-emoji-christmas-emoticon-ice-drawing-cold-thumbnail.png',
+}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class MediaCache:
+    """
+    Кэш идентификаторов файлов Telegram (file_id) для изображений, которые бот отправляет многократно.
+
+    При первой отправке изображение загружается из локального каталога (если файл там есть) или
+    передается Telegram по URL; полученный file_id сохраняется в памяти и в модели MediaFile, и все
+    следующие отправки, в том числе после перезапуска бота, идут по file_id. Одновременные первые
+    отправки одного изображения дожидаются единственной загрузки. Если Telegram отклонил file_id,
+    изображение отправляется заново.
+
+    Кэш рассчитан на работу в одном цикле событий asyncio.
+
+    Attributes:
+        sources (dict): Словарь {имя изображения: URL}.
+        local_dir (Path, optional): Каталог с локальными копиями изображений вида <local_dir>/<имя>.jpg.
+        uploads (int): Количество отправок с загрузкой изображения.
+        reused (int): Количество отправок по сохраненному file_id.
+    """
+
+    def __init__(self, sources=WEATHER_IMAGES, local_dir=None):
+        self.sources = sources
+        self.local_dir = Path(local_dir) if local_dir else None
+        self.uploads = 0
+        self.reused = 0
+        self._bot_id = None
+        self._file_ids = {}
+        self._uploading = {}
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает кэш с каталогом изображений из настроек проекта.
+
+        Returns:
+            MediaCache: Кэш, настроенный через BOT_MEDIA_DIR в settings.
+        """
+        return cls(local_dir=settings.BOT_MEDIA_DIR)
+
+    def source(self, key):
+        """
+        Возвращает источник изображения для первой отправки.
+
+        Args:
+            key (str): Имя изображения.
+
+        Returns:
+            Path или str: Путь к локальному файлу, если он есть, иначе URL.
+        """
+        if self.local_dir is not None:
+            for extension in IMAGE_EXTENSIONS:
+                path = self.local_dir / f'{key}{extension}'
+                if path.is_file():
+                    return path
+        return self.sources[key]
+
+    async def send_photo(self, bot, chat_id, key, **kwargs):
+        """
+        Отправляет изображение одним вызовом sendPhoto, по возможности по сохраненному file_id.
+
+        Args:
+            bot (Bot): Бот, отправляющий изображение.
+            chat_id (int): Идентификатор чата.
+            key (str): Имя изображения.
+            **kwargs: Дополнительные параметры Bot.send_photo (caption, reply_to_message_id и т.д.).
+
+        Returns:
+            Message: Отправленное сообщение.
+        """
+        file_ids = await self._load(bot.id)
+        file_id = file_ids.get(key)
+        if file_id is None and key in self._uploading:
+            file_id = await asyncio.shield(self._uploading[key])
+        if file_id is not None:
+            try:
+                message = await bot.send_photo(chat_id, file_id, **kwargs)
+            except BadRequest as e:
+                logger.warning('Telegram отклонил file_id изображения %s: %s', key, e)
+                file_ids.pop(key, None)
+            else:
+                self.reused += 1
+                return message
+
+        flight = self._uploading.get(key)
+        if flight is None:
+            flight = self._uploading[key] = asyncio.get_running_loop().create_future()
+        try:
+            message = await bot.send_photo(chat_id, self.source(key), **kwargs)
+            self.uploads += 1
+            if message.photo:
+                file_ids[key] = message.photo[-1].file_id
+                try:
+                    await sync_to_async(MediaFile.objects.update_or_create)(
+                        bot_id=bot.id, key=key, defaults={'file_id': file_ids[key]})
+                except DatabaseError as e:
+                    # Изображение уже отправлено; file_id остается в памяти до следующего запуска.
+                    logger.warning('Не удалось сохранить file_id изображения %s: %s', key, e)
+        finally:
+            # Ожидающие отправки получают новый file_id или None, если загрузка не удалась.
+            if not flight.done():
+                flight.set_result(file_ids.get(key))
+            if self._uploading.get(key) is flight:
+                del self._uploading[key]
+        return message
+
+    async def _load(self, bot_id):
+        if self._bot_id != bot_id:
+            rows = await sync_to_async(list)(MediaFile.objects.filter(bot_id=bot_id).values_list('key', 'file_id'))
+            self._bot_id = bot_id
+            self._file_ids = dict(rows)
+        return self._file_ids
@@ -0,0 +1,383 @@
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import webhook
+from .upstream import LATENCY_BUCKETS, OPEN, Histogram
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Маршрут запросов, для которых не нашлось представления (ответ 404 от URL-резолвера).
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Количество потоков, после регистрации которого показатели завершившихся потоков объединяются.
+SWEEP_THREADS = 256
+
+
+class RouteMetrics:
+    """
+    Показатели запросов одного маршрута и HTTP-метода.
+
+    Attributes:
+        statuses (Counter): Количество ответов по HTTP-статусам.
+        latency (Histogram): Длительность обработки запроса, в секундах.
+        queries (Histogram): Количество SQL-запросов на один запрос.
+        db_time (Histogram): Суммарное время SQL-запросов на один запрос, в секундах.
+        size (Histogram): Размер тела ответа, в байтах.
+    """
+    __slots__ = ('statuses', 'latency', 'queries', 'db_time', 'size')
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+    def merge(self, other):
+        """
+        Добавляет показатели того же маршрута из другого потока.
+
+        Args:
+            other (RouteMetrics): Показатели другого потока.
+        """
+        self.statuses.update(dict(other.statuses))
+        self.latency.merge(other.latency)
+        self.queries.merge(other.queries)
+        self.db_time.merge(other.db_time)
+        self.size.merge(other.size)
+
+
+def _merge_into(target, source):
+    for key, metrics in list(source.items()):
+        merged = target.get(key)
+        if merged is None:
+            merged = target[key] = RouteMetrics()
+        merged.merge(metrics)
+
+
+class MetricsRegistry:
+    """
+    Показатели запросов к API, собираемые отдельно в каждом потоке.
+
+    Обработчик запроса изменяет только показатели своего потока, поэтому запись не требует блокировок.
+    Блокировка берется при первом запросе в потоке и при чтении (snapshot), которое складывает показатели
+    всех потоков; снимок может не учитывать запросы, завершающиеся в момент чтения. Показатели
+    завершившихся потоков (сервер может запускать поток на каждое соединение) объединяются в один набор.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._threads = {}
+        self._retired = {}
+        self._sweep_at = SWEEP_THREADS
+        self._lock = threading.Lock()
+
+    def thread_metrics(self):
+        """
+        Возвращает показатели текущего потока.
+
+        Returns:
+            dict: RouteMetrics по (маршрут, метод).
+        """
+        metrics = getattr(self._local, 'metrics', None)
+        if metrics is None:
+            metrics = self._local.metrics = {}
+            with self._lock:
+                self._threads[threading.current_thread()] = metrics
+                if len(self._threads) >= self._sweep_at:
+                    self._sweep()
+                    self._sweep_at = max(SWEEP_THREADS, 2 * len(self._threads))
+        return metrics
+
+    def observe(self, route, method, status, duration, queries, db_time, size=None):
+        """
+        Учитывает завершенный запрос.
+
+        Args:
+            route (str): Имя маршрута.
+            method (str): HTTP-метод.
+            status (int): HTTP-статус ответа.
+            duration (float): Длительность обработки, в секундах.
+            queries (int): Количество SQL-запросов.
+            db_time (float): Суммарное время SQL-запросов, в секундах.
+            size (int, optional): Размер тела ответа в байтах, если известен.
+        """
+        metrics = self.thread_metrics()
+        route_metrics = metrics.get((route, method))
+        if route_metrics is None:
+            route_metrics = metrics[route, method] = RouteMetrics()
+        route_metrics.statuses[status] += 1
+        route_metrics.latency.observe(duration)
+        route_metrics.queries.observe(queries)
+        route_metrics.db_time.observe(db_time)
+        if size is not None:
+            route_metrics.size.observe(size)
+
+    def snapshot(self):
+        """
+        Складывает показатели всех потоков.
+
+        Returns:
+            dict: RouteMetrics по (маршрут, метод).
+        """
+        merged = {}
+        with self._lock:
+            self._sweep()
+            _merge_into(merged, self._retired)
+            for metrics in self._threads.values():
+                _merge_into(merged, metrics)
+        return merged
+
+    def _sweep(self):
+        for thread in [thread for thread in self._threads if not thread.is_alive()]:
+            _merge_into(self._retired, self._threads.pop(thread))
+
+
+registry = MetricsRegistry()
+
+_connections = weakref.WeakSet()
+_connections_opened = Counter()
+_connections_lock = threading.Lock()
+
+
+def track_connection(sender, connection, **kwargs):
+    """
+    Учитывает новое соединение с базой данных (обработчик сигнала connection_created).
+
+    Args:
+        sender (type): Класс обертки соединения.
+        connection (BaseDatabaseWrapper): Обертка нового соединения.
+    """
+    with _connections_lock:
+        _connections_opened[connection.alias, connection.vendor] += 1
+        _connections.add(connection)
+
+
+def connection_stats():
+    """
+    Возвращает количество соединений с базой данных по псевдонимам.
+
+    Returns:
+        dict: {(псевдоним, vendor): {"opened": открыто с запуска процесса, "open": открыто сейчас}}.
+    """
+    with _connections_lock:
+        wrappers = list(_connections)
+        stats = {key: {'opened': opened, 'open': 0} for key, opened in _connections_opened.items()}
+    for wrapper in wrappers:
+        if wrapper.connection is not None:
+            stats[wrapper.alias, wrapper.vendor]['open'] += 1
+    return stats
+
+
+class QueryTracker:
+    """
+    Считает SQL-запросы и их время через execute_wrapper всех соединений текущего потока.
+
+    Attributes:
+        count (int): Количество SQL-запросов.
+        time (float): Суммарное время SQL-запросов, в секундах.
+        queries (list): Кортежи (длительность, SQL) первых max_queries запросов.
+        max_queries (int): Сколько запросов запоминать; 0 - только считать.
+    """
+
+    def __init__(self, max_queries=0):
+        self.count = 0
+        self.time = 0.0
+        self.queries = []
+        self.max_queries = max_queries
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.time += elapsed
+            if len(self.queries) < self.max_queries:
+                self.queries.append((elapsed, sql))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class MetricsMiddleware:
+    """
+    Записывает показатели каждого запроса к веб-приложению в registry и журнал медленных запросов.
+
+    Маршрут - имя представления из Bot_service/urls.py (например, message-detail), поэтому количество
+    рядов не зависит от параметров в URL. Для потоковых ответов (выгрузка истории) длительность, SQL-запросы
+    и размер учитываются до отправки последнего куска. Запросы дольше settings.SLOW_REQUEST_THRESHOLD секунд
+    записываются в журнал bot.metrics вместе с текстом SQL-запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        tracker = QueryTracker(settings.SLOW_REQUEST_MAX_QUERIES if threshold else 0)
+        started = time.perf_counter()
+        with tracker:
+            response = self.get_response(request)
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._stream(response.streaming_content, request, response, tracker,
+                                                      started)
+        else:
+            size = None if response.streaming else len(response.content)
+            self._finish(request, response, tracker, started, size)
+        return response
+
+    def _stream(self, content, request, response, tracker, started):
+        size = 0
+        try:
+            with tracker:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self._finish(request, response, tracker, started, size)
+
+    def _finish(self, request, response, tracker, started, size):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.view_name if match is not None else UNMATCHED_ROUTE
+        registry.observe(route, request.method, response.status_code, duration, tracker.count, tracker.time, size)
+
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold and duration >= threshold:
+            lines = [f'{elapsed * 1000:.1f} мс: {sql}' for elapsed, sql in tracker.queries]
+            if tracker.count > len(tracker.queries):
+                lines.append(f'... и еще {tracker.count - len(tracker.queries)} запросов')
+            logger.warning('Медленный запрос %s %s: статус %d, %.3f с; SQL: %d за %.3f с\n%s',
+                           request.method, request.get_full_path(), response.status_code, duration,
+                           tracker.count, tracker.time, '\n'.join(lines))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}' if labels else ''
+
+
+class _Exposition:
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f'{name}{_labels(labels)} {value}')
+
+    def histogram(self, name, histogram, **labels):
+        data = histogram.as_dict() if isinstance(histogram, Histogram) else histogram
+        for bound, count in data['buckets'].items():
+            self.sample(f'{name}_bucket', count, **labels, le=bound)
+        self.sample(f'{name}_sum', data['sum'], **labels)
+        self.sample(f'{name}_count', data['count'], **labels)
+
+
+def render_metrics():
+    """
+    Возвращает показатели процесса в текстовом формате Prometheus.
+
+    Включает показатели запросов к API, соединения с базой данных и, если в процессе работает бот
+    в режиме webhook, показатели его внешних API и очередей.
+
+    Returns:
+        str: Текст для ответа /metrics.
+    """
+    routes = sorted(registry.snapshot().items())
+    out = _Exposition()
+
+    out.family('http_requests_total', 'counter', 'Запросы к API по маршрутам, методам и статусам.')
+    for (route, method), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            out.sample('http_requests_total', count, route=route, method=method, status=status)
+    families = (
+        ('http_request_duration_seconds', 'latency', 'Длительность обработки запроса.'),
+        ('http_request_db_queries', 'queries', 'Количество SQL-запросов на один запрос.'),
+        ('http_request_db_duration_seconds', 'db_time', 'Время SQL-запросов на один запрос.'),
+        ('http_response_size_bytes', 'size', 'Размер тела ответа.'),
+    )
+    for name, attribute, help_text in families:
+        out.family(name, 'histogram', help_text)
+        for (route, method), metrics in routes:
+            out.histogram(name, getattr(metrics, attribute), route=route, method=method)
+
+    stats = sorted(connection_stats().items())
+    out.family('db_connections_opened_total', 'counter', 'Соединения с базой данных, открытые с запуска процесса.')
+    for (alias, vendor), values in stats:
+        out.sample('db_connections_opened_total', values['opened'], alias=alias, vendor=vendor)
+    out.family('db_connections_open', 'gauge', 'Открытые сейчас соединения с базой данных.')
+    for (alias, vendor), values in stats:
+        out.sample('db_connections_open', values['open'], alias=alias, vendor=vendor)
+
+    dispatcher = webhook._dispatcher
+    # Ресурсы бота создаются при запуске диспетчера (runtime.setup), до этого их еще нет.
+    if dispatcher is not None and 'outbox' in dispatcher.application.bot_data:
+        _render_bot(out, dispatcher.application.bot_data)
+    return '\n'.join(out.lines) + '\n'
+
+
+def _render_bot(out, bot_data):
+    upstreams = {upstream.name: upstream.stats() for upstream in bot_data['upstreams'].values()}
+    out.family('bot_upstream_requests_total', 'counter', 'Запросы бота к внешним API.')
+    for name, stats in upstreams.items():
+        out.sample('bot_upstream_requests_total', stats['requests'], upstream=name)
+    out.family('bot_upstream_errors_total', 'counter', 'Ошибки запросов к внешним API по видам.')
+    for name, stats in upstreams.items():
+        for kind, count in sorted(stats['errors'].items()):
+            out.sample('bot_upstream_errors_total', count, upstream=name, kind=kind)
+    out.family('bot_upstream_circuit_open', 'gauge', '1, если автоматический выключатель внешнего API разомкнут.')
+    for name, stats in upstreams.items():
+        out.sample('bot_upstream_circuit_open', int(stats['circuit'] == OPEN), upstream=name)
+    out.family('bot_upstream_duration_seconds', 'histogram', 'Длительность запросов к внешним API.')
+    for name, stats in upstreams.items():
+        out.histogram('bot_upstream_duration_seconds', stats['latency'], upstream=name)
+
+    outbox = bot_data['outbox'].stats()
+    for key, kind, help_text in (('depth', 'gauge', 'Сообщения в очереди исходящих.'),
+                                 ('sent', 'counter', 'Отправленные сообщения.'),
+                                 ('failed', 'counter', 'Сообщения, которые не удалось отправить.'),
+                                 ('throttled', 'counter', 'Ответы 429 от Telegram.')):
+        name = f'bot_outbox_{key}' if kind == 'gauge' else f'bot_outbox_{key}_total'
+        out.family(name, kind, help_text)
+        out.sample(name, outbox[key])
+    out.family('bot_outbox_wait_seconds', 'histogram', 'Ожидание сообщения в очереди исходящих.')
+    for priority, histogram in outbox['wait'].items():
+        out.histogram('bot_outbox_wait_seconds', histogram, priority=priority)
+
+    buffer = bot_data['message_buffer'].stats()
+    out.family('bot_message_buffer_depth', 'gauge', 'Сообщения, ожидающие сохранения в базу данных.')
+    out.sample('bot_message_buffer_depth', buffer['depth'])
+    out.family('bot_message_buffer_flushed_total', 'counter', 'Сообщения, сохраненные буфером.')
+    out.sample('bot_message_buffer_flushed_total', buffer['flushed'])
+    out.family('bot_message_buffer_dropped_total', 'counter',
+               'Сообщения, отброшенные буфером: не удалось сохранить или очередь была переполнена.')
+    out.sample('bot_message_buffer_dropped_total', buffer['dropped'])
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# Текст для индекса: "ё" заменяется на "е", так как токенизаторы не считают эти буквы одинаковыми.
+SQLITE_TEXT = "replace(replace({}.text, 'ё', 'е'), 'Ё', 'Е')"
+
+SQLITE_INSTALL = [
+    # Таблица без собственной копии текста (content=''): хранит только индекс, сообщения читаются из bot_message.
+    "CREATE VIRTUAL TABLE bot_message_search USING fts5(text, content='', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER bot_message_search_insert AFTER INSERT ON bot_message BEGIN
+        INSERT INTO bot_message_search (rowid, text) VALUES (new.id, {SQLITE_TEXT.format('new')});
+    END""",
+    f"""CREATE TRIGGER bot_message_search_delete AFTER DELETE ON bot_message BEGIN
+        INSERT INTO bot_message_search (bot_message_search, rowid, text)
+        VALUES ('delete', old.id, {SQLITE_TEXT.format('old')});
+    END""",
+    f"""CREATE TRIGGER bot_message_search_update AFTER UPDATE OF text ON bot_message BEGIN
+        INSERT INTO bot_message_search (bot_message_search, rowid, text)
+        VALUES ('delete', old.id, {SQLITE_TEXT.format('old')});
+        INSERT INTO bot_message_search (rowid, text) VALUES (new.id, {SQLITE_TEXT.format('new')});
+    END""",
+    f"INSERT INTO bot_message_search (rowid, text) SELECT id, {SQLITE_TEXT.format('bot_message')} FROM bot_message",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS bot_message_search_insert',
+    'DROP TRIGGER IF EXISTS bot_message_search_delete',
+    'DROP TRIGGER IF EXISTS bot_message_search_update',
+    'DROP TABLE IF EXISTS bot_message_search',
+]
+
+POSTGRESQL_INSTALL = [
+    "CREATE INDEX bot_message_search_idx ON bot_message "
+    "USING GIN (to_tsvector('russian', replace(replace(text, 'ё', 'е'), 'Ё', 'Е')))",
+]
+
+POSTGRESQL_UNINSTALL = [
+    'DROP INDEX IF EXISTS bot_message_search_idx',
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+    'postgresql': (POSTGRESQL_INSTALL, POSTGRESQL_UNINSTALL),
+}
+
+
+def run(index):
+    def execute(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for sql in statements[index]:
+            schema_editor.execute(sql)
+    return execute
+
+
+class Migration(migrations.Migration):
+    """
+    Полнотекстовый индекс по тексту сообщений: FTS5 в SQLite (обновляется триггерами при вставке,
+    изменении и удалении сообщений) или GIN-индекс по to_tsvector('russian', ...) в PostgreSQL.
+    """
+
+    dependencies = [
+        ('bot', '0010_messagearchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1), elidable=False),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.3 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0011_message_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bot_id', models.BigIntegerField()),
+                ('update_id', models.BigIntegerField()),
+                ('data', models.JSONField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pendingupdate',
+            constraint=models.UniqueConstraint(fields=('bot_id', 'update_id'), name='unique_pending_update'),
+        ),
+    ]
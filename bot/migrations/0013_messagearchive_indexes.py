@@ -0,0 +1,58 @@
+import gzip
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Фильтры истории и поля описи, как bot.archive.ARCHIVE_INDEXES на момент миграции.
+INDEXES = {'chat_id': 'chat_ids', 'user_id': 'user_ids', 'command': 'commands'}
+
+
+def index_archives(apps, schema_editor):
+    """
+    Заполняет различные значения фильтров для уже записанных файлов архива.
+
+    Отсутствующие файлы пропускаются: их поля остаются пустыми (None), и такие файлы читаются всегда.
+    """
+    MessageArchive = apps.get_model('bot', 'MessageArchive')
+    for entry in MessageArchive.objects.using(schema_editor.connection.alias).all():
+        path = Path(settings.MESSAGE_ARCHIVE_DIR) / entry.path
+        if not path.exists():
+            continue
+        values = {name: set() for name in INDEXES}
+        with gzip.open(path, 'rb') as lines:
+            for line in lines:
+                record = json.loads(line)
+                for name in values:
+                    if record[name] is not None:
+                        values[name].add(record[name])
+        for name, field in INDEXES.items():
+            setattr(entry, field, sorted(values[name]))
+        entry.save(update_fields=list(INDEXES.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0012_pendingupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagearchive',
+            name='chat_ids',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='messagearchive',
+            name='user_ids',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='messagearchive',
+            name='commands',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(index_archives, migrations.RunPython.noop),
+    ]
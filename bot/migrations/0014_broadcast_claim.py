@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0013_messagearchive_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='claim',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
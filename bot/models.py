@@ -9,6 +9,7 @@ class Message(models.Model):
         chat_id (int): Идентификатор чата, в котором было отправлено сообщение.
         text (str): Текст сообщения.
         command (str, optional): Команда, указанная в сообщении (если есть). Поле может быть пустым.
+        argument (str, optional): Аргумент команды, например город для /weather (если есть).
         date (datetime, auto_now_add=True): Дата и время создания записи (автоматически добавляется при сохранении).
 
     Methods:
@@ -19,8 +20,18 @@ class Message(models.Model):
     chat_id = models.IntegerField()
     text = models.TextField()
     command = models.CharField(max_length=255, null=True, blank=True)
+    argument = models.CharField(max_length=255, null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat_id', 'date'], name='message_chat_date_idx'),
+            models.Index(fields=['user_id', 'date'], name='message_user_date_idx'),
+            models.Index(fields=['command', 'date'], name='message_command_date_idx'),
+            models.Index(fields=['command', 'argument'], name='message_command_argument_idx'),
+            models.Index(fields=['date'], name='message_date_idx'),
+        ]
+
     def __str__(self):
         """
         Возвращает строковое представление объекта сообщения.
@@ -29,3 +40,247 @@ class Message(models.Model):
             str: Строковое представление объекта сообщения, содержащее идентификатор сообщения, пользователя и чата.
         """
         return f"Message {self.pk} from User {self.user_id} in Chat {self.chat_id}"
+
+
+class Chat(models.Model):
+    """
+    Модель реестра чатов, из которых боту приходили сообщения.
+
+    Заполняется при сохранении сообщений и позволяет считать активные диалоги без просмотра таблицы Message.
+
+    Attributes:
+        chat_id (int): Идентификатор чата в Telegram.
+        first_seen (datetime): Дата и время первого сообщения из чата.
+        last_seen (datetime): Дата и время последнего сообщения из чата.
+        blocked_at (datetime, optional): Когда рассылка узнала, что пользователь заблокировал бота;
+                                         сбрасывается, когда из чата приходит новое сообщение.
+    """
+
+    chat_id = models.BigIntegerField(unique=True)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+    blocked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Chat {self.chat_id}"
+
+
+class MessageRollup(models.Model):
+    """
+    Модель агрегированных счетчиков сообщений за минуту, час или сутки.
+
+    Счетчики обновляются инкрементально при сохранении сообщений, поэтому дашборд читает только
+    небольшое количество агрегатов вместо таблицы Message.
+
+    Attributes:
+        granularity (str): Размер интервала: "minute", "hour" или "day".
+        bucket (datetime): Начало интервала (UTC).
+        command (str): Команда сообщений; пустая строка для сообщений без команды.
+        count (int): Количество сообщений за интервал.
+    """
+
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(MINUTE, 'Minute'), (HOUR, 'Hour'), (DAY, 'Day')]
+
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    command = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket', 'command'], name='unique_message_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.command or '-'}: {self.count}"
+
+
+class MediaFile(models.Model):
+    """
+    Модель идентификаторов файлов, уже загруженных ботом в Telegram.
+
+    Telegram возвращает file_id при первой отправке файла; повторные отправки по file_id не требуют
+    загрузки файла или скачивания его Telegram по URL. file_id действителен только для того бота,
+    который отправил файл, поэтому запись привязана к идентификатору бота.
+
+    Attributes:
+        bot_id (int): Идентификатор бота в Telegram.
+        key (str): Имя файла в боте, например "weather/sunny".
+        file_id (str): Идентификатор файла в Telegram.
+        updated (datetime): Дата и время последнего обновления записи.
+    """
+
+    bot_id = models.BigIntegerField()
+    key = models.CharField(max_length=100)
+    file_id = models.CharField(max_length=255)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bot_id', 'key'], name='unique_media_file'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.bot_id})"
+
+
+class BotState(models.Model):
+    """
+    Модель состояния получения обновлений бота через getUpdates.
+
+    Attributes:
+        bot_id (int): Идентификатор бота в Telegram.
+        update_offset (int): Offset для следующего getUpdates: все обновления с меньшим update_id обработаны
+                             или сохранены в PendingUpdate.
+        updated (datetime): Дата и время последнего сохранения.
+    """
+
+    bot_id = models.BigIntegerField(unique=True)
+    update_offset = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Bot {self.bot_id} offset {self.update_offset}"
+
+
+class PendingUpdate(models.Model):
+    """
+    Модель обновления, полученного через getUpdates, но еще не обработанного.
+
+    Telegram удаляет обновление, как только следующий getUpdates передает больший offset, поэтому
+    обновления сохраняются до запроса следующей пачки и удаляются после обработки; при следующем
+    запуске бот сначала обрабатывает оставшиеся.
+
+    Attributes:
+        bot_id (int): Идентификатор бота в Telegram.
+        update_id (int): Идентификатор обновления.
+        data (dict): Обновление в формате JSON Bot API.
+    """
+
+    bot_id = models.BigIntegerField()
+    update_id = models.BigIntegerField()
+    data = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bot_id', 'update_id'], name='unique_pending_update'),
+        ]
+
+    def __str__(self):
+        return f"Bot {self.bot_id} update {self.update_id}"
+
+
+class Broadcast(models.Model):
+    """
+    Модель рассылки сообщения по всем чатам из реестра Chat.
+
+    Рассылка обходит чаты по возрастанию chat_id кусками и после каждого куска сохраняет last_chat_id,
+    поэтому прерванная рассылка продолжается с места остановки.
+
+    Attributes:
+        text (str): Текст сообщения.
+        status (str): Состояние: "pending", "running", "done" или "cancelled".
+        total (int): Количество незаблокированных чатов на момент создания рассылки.
+        sent (int): Количество доставленных сообщений.
+        blocked (int): Количество чатов, в которых пользователь заблокировал бота.
+        failed (int): Количество сообщений, которые не удалось отправить по другим причинам.
+        last_chat_id (int, optional): Последний обработанный chat_id или None, если рассылка не начата.
+        created (datetime): Дата и время создания рассылки.
+        started (datetime, optional): Дата и время начала отправки.
+        heartbeat (datetime, optional): Время последней отметки активности выполняющей рассылку задачи.
+        claim (UUID, optional): Метка захвата рассылки задачей; прогресс сохраняет только задача с этой меткой.
+        finished (datetime, optional): Дата и время завершения или отмены.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (CANCELLED, 'Cancelled')]
+
+    text = models.TextField()
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    blocked = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    last_chat_id = models.BigIntegerField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    claim = models.UUIDField(null=True, blank=True, editable=False)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Broadcast {self.pk} ({self.status})"
+
+
+class BroadcastDelivery(models.Model):
+    """
+    Модель результата отправки рассылки в один чат.
+
+    Attributes:
+        broadcast (Broadcast): Рассылка.
+        chat_id (int): Идентификатор чата в Telegram.
+        status (str): Результат: "sent", "blocked" или "failed".
+        error (str): Текст ошибки Telegram для "blocked" и "failed".
+        sent_at (datetime): Дата и время отправки.
+    """
+
+    SENT = 'sent'
+    BLOCKED = 'blocked'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(SENT, 'Sent'), (BLOCKED, 'Blocked'), (FAILED, 'Failed')]
+
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='deliveries')
+    chat_id = models.BigIntegerField()
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES)
+    error = models.CharField(max_length=255, blank=True, default='')
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['broadcast', 'chat_id'], name='unique_broadcast_delivery'),
+        ]
+
+    def __str__(self):
+        return f"Broadcast {self.broadcast_id} to Chat {self.chat_id}: {self.status}"
+
+
+class MessageArchive(models.Model):
+    """
+    Модель описи архива сообщений: один сжатый файл NDJSON на сутки (UTC).
+
+    Сообщения старше срока хранения переносятся из таблицы Message в файлы архива командой
+    archive_messages; запись описи создается после того, как файл полностью записан, и до удаления
+    сообщений из таблицы. Все сутки раньше последней записи описи читаются только из архива.
+
+    Attributes:
+        day (date): Сутки (UTC), сообщения которых содержит файл.
+        path (str): Имя файла относительно MESSAGE_ARCHIVE_DIR.
+        rows (int): Количество сообщений в файле.
+        first_id (int): Наименьший id сообщения в файле.
+        last_id (int): Наибольший id сообщения в файле.
+        size (int): Размер файла в байтах.
+        chat_ids (list): Различные chat_id сообщений файла (None - неизвестны, файл читается всегда).
+        user_ids (list): Различные user_id сообщений файла.
+        commands (list): Различные команды сообщений файла.
+        created (datetime): Дата и время создания файла.
+    """
+
+    day = models.DateField(unique=True)
+    path = models.CharField(max_length=255)
+    rows = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    size = models.PositiveBigIntegerField()
+    chat_ids = models.JSONField(null=True)
+    user_ids = models.JSONField(null=True)
+    commands = models.JSONField(null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archive {self.day:%Y-%m-%d}: {self.rows} messages"
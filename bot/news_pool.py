@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NEWS_CATEGORIES = ('business', 'entertainment', 'general', 'health', 'science', 'sports', 'technology')
+
+
+class NewsPool:
+    """
+    Пул заголовков newsapi.org для одной пары страна/категория.
+
+    Фоновая задача asyncio периодически загружает заголовки и целиком заменяет снимок (кортеж статей),
+    поэтому чтение случайной статьи не требует блокировок и сетевых запросов. Интервал обновления
+    слегка случайный, чтобы несколько процессов не обращались к источнику одновременно; при ошибках
+    интервал растет экспоненциально, а пользователям продолжает отдаваться последний удачный снимок.
+
+    Attributes:
+        country (str): Код страны для запроса top-headlines.
+        category (str, optional): Категория новостей или None для всех категорий.
+        fetch (callable): Корутинная функция fetch(country, category), возвращающая список статей.
+        interval (float): Базовый интервал обновления, в секундах.
+        jitter (float): Доля случайного отклонения интервала (0.1 означает ±10%).
+        max_backoff (float): Максимальная пауза между попытками после ошибок, в секундах.
+        updated_at (float, optional): Время последнего успешного обновления (time.time()).
+        errors (int): Количество ошибок подряд с момента последнего успешного обновления.
+    """
+
+    def __init__(self, fetch, country='us', category=None, interval=600, jitter=0.1, max_backoff=900):
+        self.fetch = fetch
+        self.country = country
+        self.category = category
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.updated_at = None
+        self.errors = 0
+        self._snapshot = ()
+        self._ready = asyncio.Event()
+        self._attempted = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def random_article(self):
+        """
+        Возвращает случайную статью из текущего снимка.
+
+        Returns:
+            dict: Статья с полями "title", "description", "url" или None, если снимок еще не загружен.
+        """
+        snapshot = self._snapshot
+        if not snapshot:
+            return None
+        return snapshot[random.randrange(len(snapshot))]
+
+    async def wait_ready(self, timeout=None):
+        """
+        Ожидает завершения первой попытки загрузки снимка.
+
+        Если первая попытка уже завершилась (в том числе ошибкой), возвращает результат сразу: при
+        недоступности источника ожидание не повторяется на каждом обращении.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания, в секундах.
+
+        Returns:
+            bool: True, если снимок загружен.
+        """
+        if not self._attempted.is_set():
+            try:
+                await asyncio.wait_for(self._attempted.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._ready.is_set()
+
+    async def refresh(self):
+        """
+        Загружает заголовки и атомарно заменяет снимок.
+
+        Пустой ответ источника не затирает предыдущий снимок.
+
+        Raises:
+            Exception: Любая ошибка функции загрузки пробрасывается вызывающему.
+        """
+        articles = await self.fetch(self.country, self.category)
+        articles = tuple(article for article in articles if article.get('title') and article.get('url'))
+        if articles:
+            self._snapshot = articles
+            self._ready.set()
+        self.updated_at = time.time()
+
+    def next_delay(self):
+        """
+        Вычисляет паузу до следующего обновления с учетом ошибок подряд.
+
+        Returns:
+            float: Пауза в секундах.
+        """
+        if self.errors:
+            delay = min(self.max_backoff, 5 * 2 ** (self.errors - 1))
+        else:
+            delay = self.interval
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self):
+        """
+        Запускает фоновую задачу обновления в текущем цикле событий, если она еще не запущена.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), name=f'news-pool-{self.country}-{self.category}')
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу обновления.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                self.errors += 1
+                logger.warning('Не удалось обновить новости (%s, %s), ошибок подряд: %d',
+                               self.country, self.category, self.errors, exc_info=True)
+            else:
+                self.errors = 0
+            self._attempted.set()
+            await asyncio.sleep(self.next_delay())
+
+
+class NewsPools:
+    """
+    Реестр пулов новостей, создаваемых по требованию.
+
+    Пул для пары страна/категория создается и начинает обновляться только при первом обращении к нему.
+
+    Attributes:
+        fetch (callable): Функция загрузки, передаваемая каждому пулу.
+        first_wait (float): Сколько секунд ждать первой загрузки нового пула при обращении к нему.
+    """
+
+    def __init__(self, fetch, first_wait=None, **pool_options):
+        self.fetch = fetch
+        self.first_wait = settings.NEWS_POOL_FIRST_WAIT if first_wait is None else first_wait
+        self.pool_options = {
+            'interval': settings.NEWS_POOL_INTERVAL,
+            'jitter': settings.NEWS_POOL_JITTER,
+            'max_backoff': settings.NEWS_POOL_MAX_BACKOFF,
+            **pool_options,
+        }
+        self._pools = {}
+
+    def get(self, country='us', category=None):
+        """
+        Возвращает пул для страны и категории, создавая и запуская его при необходимости.
+
+        Args:
+            country (str): Код страны.
+            category (str, optional): Категория новостей.
+
+        Returns:
+            NewsPool: Пул заголовков.
+        """
+        key = (country, category)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = NewsPool(self.fetch, country, category, **self.pool_options)
+            pool.start()
+        return pool
+
+    async def random_article(self, country='us', category=None):
+        """
+        Возвращает случайную статью из пула.
+
+        Сетевых запросов не выполняет; только для нового пула, первая загрузка которого еще не завершилась,
+        ожидает ее не дольше first_wait секунд. Если загрузка не удалась, следующие обращения не ждут.
+
+        Args:
+            country (str): Код страны.
+            category (str, optional): Категория новостей.
+
+        Returns:
+            dict: Статья или None, если заголовки еще не загружены.
+        """
+        pool = self.get(country, category)
+        article = pool.random_article()
+        if article is None and await pool.wait_ready(self.first_wait):
+            article = pool.random_article()
+        return article
+
+    async def stop(self):
+        """
+        Останавливает обновление всех пулов.
+        """
+        await asyncio.gather(*(pool.stop() for pool in self._pools.values()))
@@ -0,0 +1,389 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from functools import partial
+
+from django.conf import settings
+from telegram.error import Forbidden, RetryAfter
+
+from .upstream import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты отправки: чем меньше значение, тем раньше отправляется сообщение.
+REPLY = 0
+BROADCAST = 1
+
+PRIORITY_NAMES = {REPLY: 'reply', BROADCAST: 'broadcast'}
+
+WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class OutboxFull(Exception):
+    """
+    Очередь исходящих сообщений переполнена.
+    """
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму token bucket.
+
+    Attributes:
+        rate (float): Скорость пополнения, токенов в секунду; 0 - без ограничения.
+        capacity (float): Максимальное количество токенов (допустимая пачка).
+        tokens (float): Количество токенов на момент updated.
+        updated (float): Время последнего пересчета (time.monotonic()).
+    """
+
+    def __init__(self, rate, capacity=1.0, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def delay(self, now):
+        """
+        Возвращает время до появления токена.
+
+        Args:
+            now (float): Текущее время (time.monotonic()).
+
+        Returns:
+            float: Время ожидания в секундах; 0, если токен есть.
+        """
+        if not self.rate:
+            return 0.0
+        tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, now):
+        """
+        Забирает токен. Вызывающий код должен предварительно убедиться, что delay(now) равно 0.
+
+        Args:
+            now (float): Текущее время (time.monotonic()).
+        """
+        if not self.rate:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+
+    def full(self, now):
+        """
+        Проверяет, пополнился ли ограничитель до максимума (состояние можно не хранить).
+        """
+        return not self.rate or self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class _Job:
+    __slots__ = ('chat_id', 'call', 'priority', 'seq', 'future', 'created', 'attempts')
+
+    def __init__(self, chat_id, call, priority, seq, future):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.created = time.monotonic()
+        self.attempts = 0
+
+
+class _Chat:
+    __slots__ = ('jobs', 'bucket', 'busy', 'queued')
+
+    def __init__(self, bucket):
+        self.jobs = deque()
+        self.bucket = bucket
+        self.busy = False
+        self.queued = False
+
+
+class Outbox:
+    """
+    Очередь исходящих сообщений Telegram с ограничением частоты отправки.
+
+    Обработчики ставят отправку в очередь и сразу завершаются, а сообщения отправляет пул задач asyncio
+    с учетом ограничений Telegram: не больше global_rate сообщений в секунду всего и chat_rate
+    в одном чате (group_rate в группах). В каждом чате сообщения отправляются по одному в порядке
+    постановки в очередь; между чатами раньше отправляются ответы пользователям (REPLY), а рассылки
+    (BROADCAST) используют оставшуюся пропускную способность. Если Telegram все же ответил 429
+    (RetryAfter), отправка всех сообщений приостанавливается на указанное время, а сообщение
+    возвращается в начало очереди своего чата.
+
+    Очередь рассчитана на работу в одном цикле событий asyncio.
+
+    Attributes:
+        bot (Bot): Бот, через которого отправляются сообщения.
+        workers (int): Количество одновременных запросов к Bot API.
+        global_rate (float): Сообщений в секунду для всех чатов; 0 - без ограничения.
+        global_burst (float): Допустимая пачка сообщений сверх global_rate.
+        chat_rate (float): Сообщений в секунду в личном чате; 0 - без ограничения.
+        group_rate (float): Сообщений в секунду в группе (chat_id < 0); 0 - без ограничения.
+        max_queue (int): Максимальное количество сообщений в очереди.
+        max_retries (int): Сколько раз повторять сообщение после ответа 429.
+        sent (int): Количество отправленных сообщений.
+        failed (int): Количество сообщений, отправить которые не удалось.
+        throttled (int): Количество ответов 429.
+        wait (dict): Гистограммы времени от постановки в очередь до отправки по приоритетам.
+    """
+
+    def __init__(self, bot, workers=16, global_rate=25.0, global_burst=5.0, chat_rate=1.0, group_rate=20 / 60,
+                 max_queue=100000, max_retries=5):
+        self.bot = bot
+        self.workers = workers
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+        self.wait = {priority: Histogram(WAIT_BUCKETS) for priority in PRIORITY_NAMES}
+        self._bucket = TokenBucket(global_rate, global_burst)
+        self._paused_until = 0.0
+        self._chats = {}
+        self._ready = []
+        self._delayed = []
+        self._pending = 0
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._work = None
+        self._tasks = []
+        self._swept = time.monotonic()
+
+    @classmethod
+    def from_settings(cls, bot):
+        """
+        Создает очередь с параметрами из настроек проекта.
+
+        Args:
+            bot (Bot): Бот, через которого отправляются сообщения.
+
+        Returns:
+            Outbox: Очередь, настроенная через OUTBOX_* в settings.
+        """
+        return cls(
+            bot,
+            workers=settings.OUTBOX_WORKERS,
+            global_rate=settings.OUTBOX_GLOBAL_RATE,
+            global_burst=settings.OUTBOX_GLOBAL_BURST,
+            chat_rate=settings.OUTBOX_CHAT_RATE,
+            group_rate=settings.OUTBOX_GROUP_RATE,
+            max_queue=settings.OUTBOX_MAX_QUEUE,
+        )
+
+    @property
+    def depth(self):
+        """
+        Количество сообщений, ожидающих отправки или отправляемых в данный момент.
+        """
+        return self._pending
+
+    def send(self, chat_id, call, priority=REPLY):
+        """
+        Ставит отправку в очередь.
+
+        Args:
+            chat_id (int): Идентификатор чата, в который отправляется сообщение.
+            call (callable): Корутинная функция без аргументов, выполняющая запрос к Bot API.
+            priority (int): REPLY или BROADCAST.
+
+        Returns:
+            asyncio.Future: Завершается результатом call (или исключением, если отправить не удалось).
+
+        Raises:
+            OutboxFull: Если в очереди уже max_queue сообщений.
+        """
+        if self._pending >= self.max_queue:
+            raise OutboxFull(f'В очереди исходящих сообщений {self._pending} сообщений')
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(chat_id, call, priority, next(self._seq), future)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            chat = self._chats[chat_id] = _Chat(TokenBucket(rate))
+        chat.jobs.append(job)
+        self._pending += 1
+        self._idle.clear()
+        if not chat.busy and not chat.queued:
+            self._schedule(chat, time.monotonic())
+        return future
+
+    def send_message(self, chat_id, text, priority=REPLY, **kwargs):
+        """
+        Ставит в очередь Bot.send_message.
+
+        Args:
+            chat_id (int): Идентификатор чата.
+            text (str): Текст сообщения.
+            priority (int): REPLY или BROADCAST.
+            **kwargs: Дополнительные параметры Bot.send_message (reply_to_message_id и т.д.).
+
+        Returns:
+            asyncio.Future: Завершается отправленным сообщением.
+        """
+        return self.send(chat_id, partial(self.bot.send_message, chat_id, text, **kwargs), priority)
+
+    def start(self):
+        """
+        Запускает планировщик и пул задач отправки.
+        """
+        self._work = asyncio.Queue(self.workers)
+        self._tasks = [asyncio.create_task(self._dispatch(), name='outbox-dispatch')]
+        self._tasks += [asyncio.create_task(self._worker(), name=f'outbox-worker-{i}') for i in range(self.workers)]
+
+    async def join(self):
+        """
+        Дожидается, пока в очереди не останется сообщений.
+        """
+        await self._idle.wait()
+
+    async def stop(self, timeout=None):
+        """
+        Дожидается отправки сообщений из очереди и останавливает задачи.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания, в секундах; неотправленные
+                                       к этому времени сообщения отменяются.
+        """
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Очередь исходящих сообщений остановлена, не отправлено %d сообщений', self._pending)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for chat in self._chats.values():
+            for job in chat.jobs:
+                job.future.cancel()
+        self._chats.clear()
+
+    def stats(self):
+        """
+        Возвращает показатели работы очереди.
+
+        Returns:
+            dict: Длина очереди, количество отправленных, неудачных и отклоненных с 429 сообщений,
+                  количество чатов с ожидающими сообщениями и гистограммы ожидания по приоритетам.
+        """
+        return {
+            'depth': self._pending,
+            'sent': self.sent,
+            'failed': self.failed,
+            'throttled': self.throttled,
+            'chats': len(self._chats),
+            'wait': {PRIORITY_NAMES[priority]: histogram.as_dict() for priority, histogram in self.wait.items()},
+        }
+
+    def _schedule(self, chat, now):
+        # Чат с ожидающими сообщениями попадает в одну из двух куч: готовых к отправке (по приоритету
+        # и порядку первого сообщения) или ожидающих своего ограничителя (по времени готовности).
+        job = chat.jobs[0]
+        delay = chat.bucket.delay(now)
+        if delay > 0:
+            heapq.heappush(self._delayed, (now + delay, job.seq, job.chat_id))
+        else:
+            heapq.heappush(self._ready, (job.priority, job.seq, job.chat_id))
+        chat.queued = True
+        self._changed.set()
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._delayed)
+                job = self._chats[chat_id].jobs[0]
+                heapq.heappush(self._ready, (job.priority, job.seq, chat_id))
+            if now - self._swept > 60:
+                self._sweep(now)
+
+            if not self._ready:
+                self._changed.clear()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            delay = max(self._paused_until - now, self._bucket.delay(now))
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            chat = self._chats[chat_id]
+            job = chat.jobs.popleft()
+            chat.queued = False
+            if job.future.cancelled():
+                # Отправку отменил тот, кто ее ждал (например, остановленная рассылка).
+                self._done(chat_id, chat)
+                continue
+            chat.busy = True
+            chat.bucket.take(now)
+            self._bucket.take(now)
+            await self._work.put(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._work.get()
+            chat = self._chats[job.chat_id]
+            try:
+                result = await job.call()
+            except RetryAfter as e:
+                self.throttled += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                job.attempts += 1
+                if job.attempts <= self.max_retries:
+                    logger.warning('Telegram ограничил частоту отправки, пауза %s с', e.retry_after)
+                    chat.jobs.appendleft(job)
+                    self._pending += 1
+                else:
+                    self._fail(job, e)
+            except Exception as e:
+                self._fail(job, e)
+            else:
+                self.sent += 1
+                self.wait[job.priority].observe(time.monotonic() - job.created)
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                chat.busy = False
+                self._done(job.chat_id, chat)
+
+    def _done(self, chat_id, chat):
+        self._pending -= 1
+        now = time.monotonic()
+        if chat.jobs:
+            self._schedule(chat, now)
+        elif chat.bucket.full(now):
+            del self._chats[chat_id]
+        if not self._pending:
+            self._idle.set()
+
+    def _fail(self, job, error):
+        self.failed += 1
+        if isinstance(error, Forbidden):
+            logger.info('Бот заблокирован в чате %s: %s', job.chat_id, error)
+        else:
+            logger.error('Не удалось отправить сообщение в чат %s: %s', job.chat_id, error)
+        if not job.future.done():
+            job.future.set_exception(error)
+            # Ошибка уже записана в журнал; без этого asyncio сообщит о неполученном исключении.
+            job.future.exception()
+
+    def _sweep(self, now):
+        # Состояние чата без ожидающих сообщений нужно только пока его ограничитель не пополнился.
+        self._swept = now
+        for chat_id in [chat_id for chat_id, chat in self._chats.items()
+                        if not chat.jobs and not chat.busy and chat.bucket.full(now)]:
+            del self._chats[chat_id]
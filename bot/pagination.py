@@ -0,0 +1,271 @@
+import base64
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from . import archive, search
+
+
+def encode_cursor(date, pk):
+    """
+    Кодирует позицию (date, id) последней строки страницы в непрозрачный курсор.
+
+    Args:
+        date (datetime): Дата последнего сообщения страницы.
+        pk (int): Идентификатор последнего сообщения страницы.
+
+    Returns:
+        str: Курсор в base64 (URL-safe).
+    """
+    return base64.urlsafe_b64encode(f'{date.isoformat()}|{pk}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Декодирует курсор, созданный encode_cursor.
+
+    Args:
+        cursor (str): Курсор из параметра запроса.
+
+    Returns:
+        tuple: Пара (date, id).
+
+    Raises:
+        NotFound: Если курсор поврежден.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, pk = raw.rsplit('|', 1)
+        date = parse_datetime(date)
+        if date is None:
+            raise ValueError(raw)
+        return date, int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise NotFound('Invalid cursor')
+
+
+def after_cursor(queryset, cursor):
+    """
+    Упорядочивает сообщения по (date, id) и оставляет только идущие после курсора.
+
+    Условие записано как date >= d AND (date > d OR id > pk), чтобы база данных начинала чтение
+    индекса по дате сразу с позиции курсора: стоимость страницы не зависит от ее номера.
+
+    Args:
+        queryset (QuerySet): Набор сообщений.
+        cursor (tuple, optional): Позиция (date, id) или None для первой страницы.
+
+    Returns:
+        QuerySet: Упорядоченный набор сообщений.
+    """
+    queryset = queryset.order_by('date', 'id')
+    if cursor is not None:
+        date, pk = cursor
+        queryset = queryset.filter(Q(date__gte=date) & (Q(date__gt=date) | Q(id__gt=pk)))
+    return queryset
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод сообщений по курсору (keyset pagination), упорядоченный по (date, id).
+
+    В отличие от LIMIT/OFFSET, каждая страница читает из индекса только свои строки, а курсоры
+    остаются корректными при одновременной вставке новых сообщений.
+
+    Attributes:
+        cursor_query_param (str): Имя параметра запроса с курсором.
+        page_size_query_param (str): Имя параметра запроса с размером страницы.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Возвращает сообщения текущей страницы.
+
+        Args:
+            queryset (QuerySet): Отфильтрованный набор сообщений.
+            request (Request): Объект запроса.
+            view (APIView, optional): Представление.
+
+        Returns:
+            list: Сообщения страницы.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        cursor = self.decode_cursor(cursor) if cursor else None
+
+        rows = self.page_rows(queryset, cursor, self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(*self.position(rows[-1])) if self.has_next else None
+        return rows
+
+    encode_cursor = staticmethod(encode_cursor)
+    decode_cursor = staticmethod(decode_cursor)
+
+    def page_rows(self, queryset, cursor, limit):
+        """
+        Читает до limit сообщений после курсора в порядке (date, id).
+
+        Args:
+            queryset (QuerySet): Отфильтрованный набор сообщений.
+            cursor (tuple, optional): Позиция (date, id) или None для первой страницы.
+            limit (int): Количество сообщений.
+
+        Returns:
+            list: Сообщения.
+        """
+        return list(after_cursor(queryset, cursor)[:limit])
+
+    def get_page_size(self, request):
+        """
+        Размер страницы из параметра page_size, ограниченный settings.MESSAGE_PAGE_MAX_SIZE.
+        """
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.MESSAGE_PAGE_SIZE
+        return max(1, min(size, settings.MESSAGE_PAGE_MAX_SIZE))
+
+    @staticmethod
+    def position(row):
+        if isinstance(row, dict):
+            return row['date'], row['id']
+        return row.date, row.pk
+
+    def get_next_link(self):
+        """
+        Ссылка на следующую страницу или None, если страница последняя.
+        """
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        """
+        Формирует ответ со ссылкой на следующую страницу и сообщениями.
+
+        Args:
+            data (list): Сериализованные сообщения страницы.
+
+        Returns:
+            Response: JSON-ответ вида {"next": ссылка или null, "results": [...]}.
+        """
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Курсор следующей страницы.', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': 'Количество сообщений на странице.', 'schema': {'type': 'integer'}},
+        ]
+
+
+class ArchiveKeysetPagination(KeysetPagination):
+    """
+    Постраничный вывод по курсору, который для дат раньше границы архива читает сообщения из файлов архива.
+
+    Пока курсор не дошел до границы архива (archived_until), страница заполняется сообщениями из архива,
+    подходящими под фильтры запроса, а недостающие строки дочитываются из таблицы Message. Курсоры
+    совпадают с KeysetPagination.
+    """
+
+    def page_rows(self, queryset, cursor, limit):
+        boundary = archive.archived_until()
+        if boundary is None or (cursor is not None and cursor[0] >= boundary):
+            return super().page_rows(queryset, cursor, limit)
+        rows = list(islice(archive.archived_rows(self.request.query_params, cursor), limit))
+        if len(rows) < limit:
+            rows += super().page_rows(queryset.filter(date__gte=boundary), cursor, limit - len(rows))
+        return rows
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Постраничный вывод результатов полнотекстового поиска по курсору (score, id).
+
+    Результаты упорядочены по релевантности (order=rank) или по дате, сначала новые (order=date); курсор
+    хранит score и id последнего результата страницы. Релевантность зависит от статистики индекса, поэтому
+    сообщения, добавленные между запросами страниц, могут немного сдвинуть границы страниц. Поле truncated
+    ответа равно true, если order=rank ранжировал только последние SEARCH_RANK_WINDOW совпадений.
+
+    Attributes:
+        query_param (str): Имя параметра запроса с поисковым запросом.
+        order_query_param (str): Имя параметра запроса с порядком результатов.
+    """
+    query_param = 'q'
+    order_query_param = 'order'
+
+    def page_rows(self, queryset, cursor, limit):
+        params = self.request.query_params
+        order = params.get(self.order_query_param, 'rank')
+        self.truncated = order == 'rank' and search.rank_truncated(params.get(self.query_param, ''), queryset)
+        return search.search_messages(params.get(self.query_param, ''), queryset, cursor, limit, order)
+
+    def get_paginated_response(self, data):
+        """
+        Формирует ответ со ссылкой на следующую страницу, признаком неполного ранжирования и результатами.
+
+        Returns:
+            Response: JSON-ответ вида {"next": ссылка или null, "truncated": bool, "results": [...]}.
+        """
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('truncated', self.truncated),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties'] = {'next': response['properties']['next'], 'truncated': {'type': 'boolean'},
+                                  'results': schema}
+        return response
+
+    @staticmethod
+    def position(row):
+        return row['score'], row['id']
+
+    @staticmethod
+    def encode_cursor(score, pk):
+        """
+        Кодирует позицию (score, id) последнего результата страницы в непрозрачный курсор.
+        """
+        return base64.urlsafe_b64encode(f'{score!r}|{pk}'.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Декодирует курсор, созданный encode_cursor.
+
+        Raises:
+            NotFound: Если курсор поврежден.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            score, pk = raw.rsplit('|', 1)
+            return float(score), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
@@ -0,0 +1,44 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер потока NDJSON: по одному JSON-объекту на строку.
+
+    Пустые строки пропускаются. Некорректная строка не прерывает разбор: на ее месте в результате
+    оказывается объект ParseError, чтобы ошибка попала в отчет о строках, а остальные строки были обработаны.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Разбирает тело запроса построчно.
+
+        Args:
+            stream (stream): Поток тела запроса.
+            media_type (str, optional): Тип содержимого запроса.
+            parser_context (dict, optional): Контекст разбора.
+
+        Returns:
+            list: Разобранные объекты и ParseError для некорректных строк.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            lines = stream.read().decode(encoding).split('\n')
+        except UnicodeDecodeError as e:
+            raise ParseError(f'Некорректная кодировка NDJSON - {e}')
+
+        items = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ParseError(f'Строка {number}: некорректный JSON - {e}'))
+        return items
@@ -1,5 +1,24 @@
 from rest_framework import permissions
 
+
+class IsAdmin(permissions.BasePermission):
+    """
+    Разрешение, которое открывает доступ к представлению только администраторам (суперпользователям).
+    """
+    def has_permission(self, request, view):
+        """
+        Проверяет, является ли пользователь администратором.
+
+        Args:
+            request (HttpRequest): Запрос, выполняемый клиентом.
+            view (APIView): Представление (view) DRF, к которому применяется разрешение.
+
+        Returns:
+            bool: True, если пользователь - суперпользователь; False в противном случае.
+        """
+        return bool(request.user and request.user.is_superuser)
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     Пользовательское разрешение (permission) для проверки прав доступа к объектам.
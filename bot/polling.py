@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import signal
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from telegram import Update
+from telegram.error import TelegramError
+
+from . import runtime
+from .models import BotState, PendingUpdate
+
+logger = logging.getLogger(__name__)
+
+
+def load_offset(bot_id):
+    """
+    Возвращает сохраненный offset getUpdates бота.
+
+    Args:
+        bot_id (int): Идентификатор бота в Telegram.
+
+    Returns:
+        int: Offset для следующего getUpdates или None, если бот еще не сохранял его.
+    """
+    return BotState.objects.filter(bot_id=bot_id).values_list('update_offset', flat=True).first()
+
+
+def save_offset(bot_id, offset):
+    """
+    Сохраняет offset getUpdates бота.
+
+    Args:
+        bot_id (int): Идентификатор бота в Telegram.
+        offset (int): Offset для следующего getUpdates.
+    """
+    if not BotState.objects.filter(bot_id=bot_id).update(update_offset=offset):
+        BotState.objects.update_or_create(bot_id=bot_id, defaults={'update_offset': offset})
+
+
+def load_pending_updates(bot_id):
+    """
+    Возвращает сохраненные необработанные обновления бота.
+
+    Args:
+        bot_id (int): Идентификатор бота в Telegram.
+
+    Returns:
+        list: Обновления в формате JSON Bot API по возрастанию update_id.
+    """
+    pending = PendingUpdate.objects.filter(bot_id=bot_id).order_by('update_id')
+    return list(pending.values_list('data', flat=True))
+
+
+def save_pending_updates(bot_id, updates, offset=None):
+    """
+    Сохраняет полученные обновления до того, как следующий getUpdates подтвердит их получение.
+
+    Args:
+        bot_id (int): Идентификатор бота в Telegram.
+        updates (list): Обновления в формате JSON Bot API.
+        offset (int, optional): Offset следующего getUpdates, сохраняемый в той же транзакции.
+    """
+    with transaction.atomic():
+        PendingUpdate.objects.bulk_create(
+            [PendingUpdate(bot_id=bot_id, update_id=update['update_id'], data=update) for update in updates],
+            ignore_conflicts=True)
+        if offset is not None:
+            save_offset(bot_id, offset)
+
+
+def save_progress(bot_id, offset, processed=None, done=()):
+    """
+    Сохраняет offset getUpdates и удаляет обработанные обновления из PendingUpdate.
+
+    Args:
+        bot_id (int): Идентификатор бота в Telegram.
+        offset (int, optional): Offset следующего getUpdates: обновления с меньшим update_id обработаны
+                                или сохранены в PendingUpdate.
+        processed (int, optional): update_id, до которого включительно обработаны все обновления.
+        done (iterable): update_id обработанных обновлений после processed.
+    """
+    done = list(done)
+    with transaction.atomic():
+        if offset is not None:
+            save_offset(bot_id, offset)
+        if processed is not None:
+            PendingUpdate.objects.filter(bot_id=bot_id, update_id__lte=processed).delete()
+        if done:
+            PendingUpdate.objects.filter(bot_id=bot_id, update_id__in=done).delete()
+
+
+class UpdateWatermark:
+    """
+    Граница обработанных обновлений при конкурентной обработке.
+
+    Обновления начинают обрабатываться в порядке update_id, а завершаются в произвольном порядке.
+    Граница - наибольший update_id, до которого включительно обработаны все обновления.
+
+    Attributes:
+        last (int): Граница или None, если ни одно обновление еще не обработано.
+    """
+
+    def __init__(self):
+        self.last = None
+        self._pending = deque()
+        self._done = set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def begin(self, update_id):
+        """
+        Отмечает начало обработки обновления.
+
+        Args:
+            update_id (int): Идентификатор обновления; больше идентификаторов предыдущих обновлений.
+        """
+        self._pending.append(update_id)
+
+    def done(self, update_id):
+        """
+        Отмечает завершение обработки обновления и сдвигает границу.
+
+        Args:
+            update_id (int): Идентификатор обновления, переданный в begin.
+        """
+        self._done.add(update_id)
+        while self._pending and self._pending[0] in self._done:
+            self.last = self._pending.popleft()
+            self._done.discard(self.last)
+
+    @property
+    def ahead(self):
+        """
+        update_id обработанных обновлений после границы.
+        """
+        return frozenset(self._done)
+
+
+class Poller:
+    """
+    Получение обновлений через getUpdates с сохранением offset в базе данных.
+
+    Telegram удаляет обновления с update_id меньше offset следующего getUpdates, а обработка пачки
+    продолжается после запроса следующей. Поэтому каждая пачка сохраняется в PendingUpdate до запроса
+    следующей, а при запуске бот сначала обрабатывает обновления, оставшиеся там с предыдущего запуска
+    (не дообработанные при остановке или при сбое процесса), и продолжает getUpdates с offset после них.
+    Накопившиеся обновления принимаются пачками по limit без пауз между запросами;
+    одновременно обрабатывается не больше max_pending обновлений, и прием приостанавливается, пока
+    в очереди исходящих сообщений больше max_pending ответов; остальные обновления ждут в Telegram.
+    Раз в flush_interval секунд сохраняется offset (модель BotState) и по границе обработанных обновлений
+    (UpdateWatermark) удаляются обработанные обновления из PendingUpdate; при остановке удаляются и
+    обработанные после границы. После сбоя процесса обновления после границы могут обработаться повторно.
+
+    По SIGTERM или SIGINT прием обновлений прекращается, принятые обновления дообрабатываются
+    не дольше shutdown_timeout секунд, затем отправляются сообщения из очереди исходящих сообщений,
+    в базу данных дописываются накопленные сообщения и сохраняется итоговый offset.
+
+    Attributes:
+        application (Application): Приложение бота, созданное build_application(..., polling=False).
+        timeout (int): Таймаут long polling getUpdates, в секундах.
+        limit (int): Максимальное количество обновлений в одном ответе getUpdates.
+        flush_interval (float): Интервал сохранения offset, в секундах.
+        shutdown_timeout (float): Сколько секунд при остановке ждать обработки принятых обновлений.
+        max_pending (int): Максимальное количество принятых, но не обработанных обновлений.
+        received (int): Количество принятых обновлений.
+        offset (int): Offset следующего getUpdates.
+        watermark (UpdateWatermark): Граница обработанных обновлений.
+        replayed (int): Количество обновлений, обработанных из PendingUpdate после перезапуска.
+    """
+
+    def __init__(self, application, timeout=10, limit=100, flush_interval=1.0, shutdown_timeout=30.0,
+                 max_pending=None):
+        self.application = application
+        self.timeout = timeout
+        self.limit = limit
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.max_pending = max_pending or settings.BOT_CONCURRENCY * 2
+        self.received = 0
+        self.replayed = 0
+        self.offset = None
+        self.watermark = UpdateWatermark()
+        self._saved = None
+        self._tasks = set()
+        self._stop = None
+
+    @classmethod
+    def from_settings(cls, application):
+        """
+        Создает получение обновлений с параметрами из настроек проекта.
+
+        Args:
+            application (Application): Приложение бота.
+
+        Returns:
+            Poller: Получение обновлений, настроенное через BOT_POLL_* и BOT_SHUTDOWN_TIMEOUT в settings.
+        """
+        return cls(
+            application, timeout=settings.BOT_POLL_TIMEOUT, limit=settings.BOT_POLL_LIMIT,
+            flush_interval=settings.BOT_OFFSET_FLUSH_INTERVAL, shutdown_timeout=settings.BOT_SHUTDOWN_TIMEOUT,
+        )
+
+    def run(self):
+        """
+        Запускает бота в новом цикле событий до SIGTERM или SIGINT.
+        """
+        asyncio.run(self.serve(handle_signals=True))
+
+    def request_stop(self):
+        """
+        Просит бота остановиться: прекратить прием обновлений и дообработать принятые.
+        """
+        if self._stop is not None:
+            self._stop.set()
+
+    async def serve(self, handle_signals=False):
+        """
+        Запускает приложение и принимает обновления до вызова request_stop, затем останавливает приложение.
+
+        Args:
+            handle_signals (bool): Останавливаться по SIGTERM и SIGINT.
+        """
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        if handle_signals:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self.request_stop)
+
+        await runtime.start(self.application, polling=False)
+        bot_id = self.application.bot.id
+        self.offset = await sync_to_async(load_offset)(bot_id)
+        self._saved = (self.offset, None)
+        pending = await sync_to_async(load_pending_updates)(bot_id)
+        if pending:
+            logger.info('Обработка %d обновлений, не обработанных предыдущим запуском', len(pending))
+            if self.offset is None or self.offset <= pending[-1]['update_id']:
+                # Offset не успел сохраниться после последней пачки.
+                self.offset = pending[-1]['update_id'] + 1
+        if self.offset is not None:
+            logger.info('Получение обновлений с offset %s', self.offset)
+        flusher = asyncio.create_task(self._flush_offsets(bot_id))
+        try:
+            await self._poll(bot_id, pending)
+        finally:
+            await self._drain()
+            flusher.cancel()
+            await runtime.stop(self.application)
+            await self._save_offset(bot_id, final=True)
+            if handle_signals:
+                for signum in (signal.SIGTERM, signal.SIGINT):
+                    loop.remove_signal_handler(signum)
+
+    async def _poll(self, bot_id, pending):
+        slots = asyncio.Semaphore(self.max_pending)
+        outbox = self.application.bot_data['outbox']
+        stop = asyncio.create_task(self._stop.wait())
+        try:
+            for data in pending:
+                if not await self._begin(Update.de_json(data, self.application.bot), slots):
+                    return
+                self.replayed += 1
+            while not self._stop.is_set():
+                if outbox.depth > self.max_pending:
+                    # Обновление считается обработанным, когда ответ поставлен в очередь, поэтому
+                    # очередь не должна расти быстрее отправки: иначе при остановке ответы не успеют уйти.
+                    await asyncio.wait([stop], timeout=0.05)
+                    continue
+                request = asyncio.create_task(self.application.bot.get_updates(
+                    offset=self.offset, limit=self.limit, timeout=self.timeout))
+                await asyncio.wait([request, stop], return_when=asyncio.FIRST_COMPLETED)
+                if not request.done():
+                    # Обновления этого запроса не подтверждены и будут получены при следующем запуске.
+                    request.cancel()
+                    await asyncio.gather(request, return_exceptions=True)
+                    break
+                try:
+                    updates = request.result()
+                except TelegramError as e:
+                    logger.warning('Ошибка getUpdates: %s', e)
+                    await asyncio.wait([stop], timeout=1)
+                    continue
+                if pending:
+                    # Обновления, которые уже обработаны из PendingUpdate, если offset не успел сохраниться.
+                    updates = [update for update in updates if update.update_id > pending[-1]['update_id']]
+                if not updates:
+                    continue
+
+                try:
+                    await sync_to_async(save_pending_updates)(bot_id, [update.to_dict() for update in updates])
+                except Exception:
+                    # Offset не сдвигается, поэтому Telegram отдаст эту пачку повторно.
+                    logger.exception('Не удалось сохранить %d полученных обновлений', len(updates))
+                    await asyncio.wait([stop], timeout=1)
+                    continue
+                self.offset = updates[-1].update_id + 1
+                for update in updates:
+                    # Если бот остановлен, оставшиеся обновления пачки обработает следующий запуск.
+                    if not await self._begin(update, slots):
+                        break
+        finally:
+            stop.cancel()
+
+    async def _begin(self, update, slots):
+        await slots.acquire()
+        if self._stop.is_set():
+            slots.release()
+            return False
+        self.watermark.begin(update.update_id)
+        self.received += 1
+        task = asyncio.create_task(
+            self.application.update_processor.process_update(update, self.application.process_update(update)))
+        task.add_done_callback(lambda task, update_id=update.update_id: self._processed(task, update_id, slots))
+        self._tasks.add(task)
+        return True
+
+    def _processed(self, task, update_id, slots):
+        self._tasks.discard(task)
+        slots.release()
+        if not task.cancelled():
+            self.watermark.done(update_id)
+
+    async def _drain(self):
+        if not self._tasks:
+            return
+        logger.info('Обработка %d принятых обновлений перед остановкой', len(self._tasks))
+        done, pending = await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+        if pending:
+            logger.warning('%d обновлений не обработаны за %s с и будут обработаны при следующем запуске',
+                           len(pending), self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _flush_offsets(self, bot_id):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._save_offset(bot_id)
+            except Exception:
+                logger.exception('Не удалось сохранить offset')
+
+    async def _save_offset(self, bot_id, final=False):
+        done = self.watermark.ahead if final else ()
+        state = (self.offset, self.watermark.last)
+        if state != self._saved or done:
+            await sync_to_async(save_progress)(bot_id, *state, done)
+            self._saved = state
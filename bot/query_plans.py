@@ -0,0 +1,87 @@
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Chat, Message, MessageRollup
+from .pagination import after_cursor
+
+
+def checked_querysets():
+    """
+    Запросы к базе данных, выполняемые представлениями из bot/views.py, с параметрами, типичными для API.
+
+    Returns:
+        list: Кортежи (название, queryset, допустим ли полный просмотр таблицы).
+    """
+    now = timezone.now()
+    day_ago = now - timedelta(days=1)
+    cursor = (day_ago, 1)
+    page = slice(0, 101)
+    return [
+        ('message-list first page', after_cursor(Message.objects.all(), None)[page], False),
+        ('message-list next page', after_cursor(Message.objects.all(), cursor)[page], False),
+        ('message-detail', Message.objects.filter(pk=1), False),
+        ('messages by chat_id', after_cursor(Message.objects.filter(chat_id=1), cursor)[page], False),
+        ('messages by user_id', after_cursor(Message.objects.filter(user_id=1), cursor)[page], False),
+        ('messages by command', after_cursor(Message.objects.filter(command='/news'), cursor)[page], False),
+        ('messages by command and argument',
+         after_cursor(Message.objects.filter(command='/weather', argument='москва'), cursor)[page], False),
+        ('messages by date range',
+         after_cursor(Message.objects.filter(date__gte=day_ago, date__lt=now), None)[page], False),
+        ('messages by chat_id and date range',
+         after_cursor(Message.objects.filter(chat_id=1, date__gte=day_ago, date__lt=now), cursor)[page], False),
+        ('dashboard active chats', Chat.objects.filter(last_seen__gte=day_ago), False),
+        ('dashboard request counts',
+         MessageRollup.objects.filter(granularity=MessageRollup.HOUR, bucket__gte=day_ago)
+         .values('bucket').annotate(count=Sum('count')).order_by('bucket'), False),
+        ('dashboard popular commands',
+         MessageRollup.objects.filter(granularity=MessageRollup.DAY, bucket__gte=day_ago)
+         .values('command').annotate(count=Sum('count')).order_by('-count')[:5], False),
+    ]
+
+
+def full_scans(plan, tables):
+    """
+    Находит в плане запроса полные просмотры таблиц.
+
+    Понимает вывод EXPLAIN для SQLite ("SCAN table" без индекса) и PostgreSQL ("Seq Scan on table").
+
+    Args:
+        plan (str): Результат QuerySet.explain().
+        tables (iterable): Имена таблиц, полный просмотр которых считается ошибкой.
+
+    Returns:
+        list: Строки плана с полным просмотром таблиц.
+    """
+    names = '|'.join(re.escape(table) for table in tables)
+    pattern = re.compile(rf'\bSCAN (?:TABLE )?({names})\b(?! USING (?:COVERING )?INDEX)|Seq Scan on ({names})\b')
+    return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+
+
+def check(querysets=None):
+    """
+    Выполняет EXPLAIN для запросов и проверяет, что они используют индексы.
+
+    Args:
+        querysets (list, optional): Кортежи из checked_querysets(); по умолчанию все запросы.
+
+    Returns:
+        list: Кортежи (название, план, список строк с полным просмотром, допустим ли полный просмотр).
+    """
+    tables = [model._meta.db_table for model in (Message, Chat, MessageRollup)]
+    results = []
+    for name, queryset, full_scan_ok in querysets or checked_querysets():
+        plan = queryset.explain()
+        results.append((name, plan, full_scans(plan, tables), full_scan_ok))
+    return results
+
+
+def analyze():
+    """
+    Обновляет статистику планировщика после заполнения таблиц.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
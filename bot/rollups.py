@@ -0,0 +1,299 @@
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .archive import archived_until
+from .models import Chat, Message, MessageRollup
+
+TRUNCATE = {
+    MessageRollup.MINUTE: lambda date: date.replace(second=0, microsecond=0),
+    MessageRollup.HOUR: lambda date: date.replace(minute=0, second=0, microsecond=0),
+    MessageRollup.DAY: lambda date: date.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+TRUNCATE_SQL = {
+    MessageRollup.MINUTE: TruncMinute,
+    MessageRollup.HOUR: TruncHour,
+    MessageRollup.DAY: TruncDay,
+}
+
+# Функции минимума и максимума двух значений для INSERT ... ON CONFLICT в touch_chats.
+UPSERT_FUNCTIONS = {
+    'sqlite': ('MIN', 'MAX'),
+    'postgresql': ('LEAST', 'GREATEST'),
+}
+
+
+def record(messages):
+    """
+    Учитывает сохраненные сообщения в агрегатах и реестре чатов.
+
+    Должна вызываться в той же транзакции, в которой сохраняются сообщения.
+
+    Args:
+        messages (list): Сохраненные объекты Message (с заполненным полем date).
+    """
+    record_rows((message.chat_id, message.command, message.date) for message in messages)
+
+
+def record_rows(rows):
+    """
+    То же, что record, для сообщений, сохраненных без создания объектов Message.
+
+    Args:
+        rows (iterable): Кортежи (chat_id, command, date) сохраненных сообщений.
+    """
+    per_date = Counter()
+    chats = {}
+    for chat_id, command, date in rows:
+        per_date[(date, command or '')] += 1
+        seen = chats.get(chat_id)
+        if seen is None:
+            chats[chat_id] = (date, date)
+        elif date < seen[0]:
+            chats[chat_id] = (date, seen[1])
+        elif date > seen[1]:
+            chats[chat_id] = (seen[0], date)
+
+    counts = Counter()
+    for (date, command), count in per_date.items():
+        date = timezone.localtime(date, dt_timezone.utc)
+        for granularity, truncate in TRUNCATE.items():
+            counts[(granularity, truncate(date), command)] += count
+    add_counts(counts)
+    touch_chats(chats)
+
+
+def forget(messages):
+    """
+    Вычитает удаленные сообщения из агрегатов.
+
+    Должна вызываться в той же транзакции, в которой удаляются сообщения. Реестр чатов не изменяется.
+
+    Args:
+        messages (list): Удаленные объекты Message (с заполненным полем date).
+    """
+    counts = Counter()
+    for message in messages:
+        date = timezone.localtime(message.date, dt_timezone.utc)
+        for granularity, truncate in TRUNCATE.items():
+            counts[(granularity, truncate(date), message.command or '')] -= 1
+    add_counts(counts)
+
+
+def reclassify(message, old_command):
+    """
+    Переносит сообщение в агрегатах из одной команды в другую после изменения поля command.
+
+    Args:
+        message (Message): Сообщение с новым значением command.
+        old_command (str, optional): Значение command до изменения.
+    """
+    reclassify_rows([(message.date, old_command, message.command)])
+
+
+def reclassify_rows(rows):
+    """
+    Переносит сообщения в агрегатах между командами одним обновлением счетчиков.
+
+    Args:
+        rows (iterable): Кортежи (date, старая команда, новая команда).
+    """
+    counts = Counter()
+    for date, old_command, new_command in rows:
+        old_command = old_command or ''
+        new_command = new_command or ''
+        if old_command == new_command:
+            continue
+        date = timezone.localtime(date, dt_timezone.utc)
+        for granularity, truncate in TRUNCATE.items():
+            counts[(granularity, truncate(date), old_command)] -= 1
+            counts[(granularity, truncate(date), new_command)] += 1
+    add_counts(counts)
+
+
+def add_counts(counts):
+    """
+    Прибавляет значения к счетчикам агрегатов, создавая отсутствующие строки.
+
+    Строки, счетчик которых после вычитания стал нулевым (все сообщения интервала удалены или перенесены
+    в другую команду), удаляются, чтобы не попадать в дашборд.
+
+    Args:
+        counts (dict): Словарь {(granularity, bucket, command): прибавляемое значение}.
+    """
+    for (granularity, bucket, command), value in counts.items():
+        if not value:
+            continue
+        rollups = MessageRollup.objects.filter(granularity=granularity, bucket=bucket, command=command)
+        if rollups.update(count=F('count') + value):
+            if value < 0:
+                rollups.filter(count=0).delete()
+            continue
+        try:
+            with transaction.atomic():
+                MessageRollup.objects.create(granularity=granularity, bucket=bucket, command=command,
+                                             count=max(value, 0))
+        except IntegrityError:
+            # Строку только что создал другой процесс.
+            rollups.update(count=F('count') + value)
+
+
+def touch_chats(chats, chunk_size=1000):
+    """
+    Обновляет реестр чатов.
+
+    Сообщение новее отметки о блокировке бота снимает эту отметку: пользователь снова пишет боту.
+    В SQLite и PostgreSQL выполняется одним INSERT ... ON CONFLICT DO UPDATE на чат (через executemany),
+    в остальных базах данных - чтением существующих чатов и bulk_update.
+
+    Args:
+        chats (dict): Словарь {chat_id: (первое сообщение, последнее сообщение)}.
+        chunk_size (int): Количество чатов, обрабатываемых одним запросом.
+    """
+    if not chats:
+        return
+    if connection.vendor in UPSERT_FUNCTIONS:
+        least, greatest = UPSERT_FUNCTIONS[connection.vendor]
+        table = connection.ops.quote_name(Chat._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} (chat_id, first_seen, last_seen) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (chat_id) DO UPDATE SET '
+            f'first_seen = {least}({table}.first_seen, excluded.first_seen), '
+            f'last_seen = {greatest}({table}.last_seen, excluded.last_seen), '
+            f'blocked_at = CASE WHEN excluded.last_seen > {table}.blocked_at THEN NULL ELSE {table}.blocked_at END'
+        )
+        adapted = {}
+        for first, last in chats.values():
+            for date in (first, last):
+                if date not in adapted:
+                    adapted[date] = connection.ops.adapt_datetimefield_value(date)
+        rows = [(chat_id, adapted[first], adapted[last]) for chat_id, (first, last) in sorted(chats.items())]
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), chunk_size):
+                cursor.executemany(sql, rows[i:i + chunk_size])
+        return
+
+    chat_ids = list(chats)
+    for i in range(0, len(chat_ids), chunk_size):
+        chunk = chat_ids[i:i + chunk_size]
+        changed = []
+        existing = Chat.objects.filter(chat_id__in=chunk).only('chat_id', 'first_seen', 'last_seen', 'blocked_at')
+        for chat in existing:
+            first, last = chats[chat.chat_id]
+            if first < chat.first_seen or last > chat.last_seen:
+                chat.first_seen = min(first, chat.first_seen)
+                chat.last_seen = max(last, chat.last_seen)
+                if chat.blocked_at is not None and last > chat.blocked_at:
+                    chat.blocked_at = None
+                changed.append(chat)
+        Chat.objects.bulk_update(changed, ['first_seen', 'last_seen', 'blocked_at'])
+
+        known = {chat.chat_id for chat in existing}
+        Chat.objects.bulk_create(
+            [Chat(chat_id=chat_id, first_seen=chats[chat_id][0], last_seen=chats[chat_id][1])
+             for chat_id in chunk if chat_id not in known],
+            ignore_conflicts=True,
+        )
+
+
+def active_chats(window):
+    """
+    Количество чатов, писавших боту за последнее время.
+
+    Args:
+        window (timedelta): Размер скользящего окна.
+
+    Returns:
+        int: Количество различных активных чатов.
+    """
+    return Chat.objects.filter(last_seen__gte=timezone.now() - window).count()
+
+
+def request_counts(granularity, window):
+    """
+    Количество сообщений по интервалам за последнее время.
+
+    Args:
+        granularity (str): Размер интервала: MessageRollup.MINUTE, HOUR или DAY.
+        window (timedelta): Размер скользящего окна.
+
+    Returns:
+        list: Список словарей {"date": начало интервала, "count": количество сообщений} по возрастанию даты.
+    """
+    since = TRUNCATE[granularity](timezone.now() - window)
+    rows = (
+        MessageRollup.objects.filter(granularity=granularity, bucket__gte=since)
+        .values('bucket').annotate(count=Sum('count')).filter(count__gt=0).order_by('bucket')
+    )
+    return [{'date': row['bucket'], 'count': row['count']} for row in rows]
+
+
+def popular_commands(window, limit=5):
+    """
+    Наиболее частые команды за последнее время по суточным агрегатам.
+
+    Args:
+        window (timedelta): Размер скользящего окна (округляется до суток).
+        limit (int): Количество команд.
+
+    Returns:
+        list: Список словарей {"command": команда или None, "count": количество сообщений}.
+    """
+    since = TRUNCATE[MessageRollup.DAY](timezone.now() - window)
+    rows = (
+        MessageRollup.objects.filter(granularity=MessageRollup.DAY, bucket__gte=since)
+        .values('command').annotate(count=Sum('count')).filter(count__gt=0).order_by('-count')[:limit]
+    )
+    return [{'command': row['command'] or None, 'count': row['count']} for row in rows]
+
+
+def rebuild(since=None, until=None):
+    """
+    Пересчитывает агрегаты и реестр чатов по таблице Message за период.
+
+    Используется для первоначального заполнения и периодического уплотнения, если агрегаты разошлись
+    с данными. Период расширяется до целых суток, чтобы все интервалы пересчитывались целиком. Сутки,
+    перенесенные в архив (archive_messages), не пересчитываются: их агрегаты сохраняются как есть.
+
+    Args:
+        since (datetime, optional): Начало периода; по умолчанию с первого сообщения.
+        until (datetime, optional): Конец периода; по умолчанию до последнего сообщения.
+
+    Returns:
+        int: Количество пересчитанных строк агрегатов.
+    """
+    messages = Message.objects.all()
+    rollups = MessageRollup.objects.all()
+    boundary = archived_until()
+    if boundary is not None and (since is None or since < boundary):
+        since = boundary
+    if since is not None:
+        since = TRUNCATE[MessageRollup.DAY](timezone.localtime(since, dt_timezone.utc))
+        messages = messages.filter(date__gte=since)
+        rollups = rollups.filter(bucket__gte=since)
+    if until is not None:
+        until = TRUNCATE[MessageRollup.DAY](timezone.localtime(until, dt_timezone.utc)) + timedelta(days=1)
+        messages = messages.filter(date__lt=until)
+        rollups = rollups.filter(bucket__lt=until)
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        for granularity, trunc in TRUNCATE_SQL.items():
+            rows = (
+                messages.annotate(bucket=trunc('date', tzinfo=dt_timezone.utc), cmd=Coalesce('command', Value('')))
+                .values('bucket', 'cmd').annotate(count=Count('id')).order_by()
+            )
+            batch = [MessageRollup(granularity=granularity, bucket=row['bucket'], command=row['cmd'],
+                                   count=row['count']) for row in rows.iterator()]
+            MessageRollup.objects.bulk_create(batch, batch_size=1000)
+            created += len(batch)
+
+        chats = messages.values('chat_id').annotate(first=Min('date'), last=Max('date')).order_by()
+        touch_chats({row['chat_id']: (row['first'], row['last']) for row in chats.iterator()})
+    return created
@@ -0,0 +1,195 @@
+import asyncio
+from functools import partial
+
+import httpx
+from django.conf import settings
+from telegram import Update
+from telegram.ext import ApplicationBuilder, BaseUpdateProcessor, CommandHandler, MessageHandler, filters
+
+from . import handlers
+from .broadcast import BroadcastRunner
+from .media import MediaCache
+from .news_pool import NewsPools
+from .outbox import Outbox
+from .upstream import Upstream
+from .weather_cache import WeatherCache
+from .writebehind import MessageBuffer
+
+
+def build_application(token, base_url=None, concurrency=None, polling=True):
+    """
+    Создает приложение python-telegram-bot со всеми обработчиками бота.
+
+    Обновления обрабатываются конкурентно: одновременно выполняется не более concurrency обработчиков,
+    поэтому медленный ответ OpenWeatherMap или newsapi в одном чате не задерживает остальные.
+    Обновления одного чата обрабатываются по очереди в порядке поступления (ChatOrderedUpdateProcessor).
+
+    Args:
+        token (str): Токен Telegram-бота.
+        base_url (str, optional): Базовый URL Bot API (например, адрес локальной заглушки).
+        concurrency (int, optional): Максимальное число одновременно обрабатываемых обновлений,
+                                     по умолчанию settings.BOT_CONCURRENCY.
+        polling (bool): Создавать ли Updater для получения обновлений через getUpdates. В режиме
+                        webhook обновления кладутся в application.update_queue извне.
+
+    Returns:
+        Application: Настроенное, но не запущенное приложение.
+    """
+    concurrency = concurrency or settings.BOT_CONCURRENCY
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(ChatOrderedUpdateProcessor(concurrency))
+        .connection_pool_size(concurrency)
+        .post_init(setup)
+        .post_shutdown(teardown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if not polling:
+        builder = builder.updater(None)
+    application = builder.build()
+
+    application.add_handler(MessageHandler(filters.TEXT, handlers.record_message), group=-1)
+    application.add_handler(CommandHandler('start', handlers.main))
+    application.add_handler(CommandHandler('help', handlers.handle_start))
+    application.add_handler(CommandHandler('news', handlers.send_random_news))
+    application.add_handler(CommandHandler('weather', handlers.ask_for_city))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_weather))
+    return application
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обработка обновлений python-telegram-bot, конкурентная между чатами и последовательная внутри чата.
+
+    Обновление чата начинает обрабатываться только после завершения предыдущего обновления того же чата,
+    поэтому ответы на несколько сообщений пользователя отправляются в порядке сообщений. Ожидающее
+    обновление занимает место в ограничении max_concurrent_updates.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._tails = {}
+
+    async def do_process_update(self, update, coroutine):
+        """
+        Обрабатывает обновление после завершения предыдущего обновления того же чата.
+
+        Args:
+            update (object): Обновление.
+            coroutine (Awaitable): Корутина обработки обновления.
+        """
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await coroutine
+            return
+
+        previous = self._tails.get(chat.id)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[chat.id] = done
+        try:
+            if previous is not None:
+                # Отмена ожидающего обновления не должна отменять future предыдущего обновления.
+                await asyncio.shield(previous)
+            await coroutine
+        finally:
+            done.set_result(None)
+            if self._tails.get(chat.id) is done:
+                del self._tails[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+async def setup(application):
+    """
+    Создает общие ресурсы бота: пул HTTP-соединений и клиенты внешних API поверх него, кэш погоды,
+    кэш file_id изображений, пулы новостей, буфер записи сообщений, очередь исходящих сообщений
+    и, если settings.BROADCAST_RUNNER, задачу выполнения рассылок.
+
+    Вызывается python-telegram-bot после инициализации приложения (post_init).
+
+    Args:
+        application (Application): Приложение бота.
+    """
+    http = httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.BOT_HTTP_TIMEOUT, connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+                              read=settings.UPSTREAM_READ_TIMEOUT),
+        limits=httpx.Limits(max_connections=settings.BOT_HTTP_POOL_SIZE,
+                            max_keepalive_connections=settings.BOT_HTTP_POOL_SIZE),
+    )
+    upstreams = {
+        'weather': Upstream.from_settings('openweathermap', http),
+        'news': Upstream.from_settings('newsapi', http),
+    }
+    news_pools = NewsPools(partial(handlers.fetch_headlines, upstreams['news']))
+    news_pools.get(settings.NEWS_DEFAULT_COUNTRY)
+    message_buffer = MessageBuffer.from_settings()
+    message_buffer.start()
+    outbox = Outbox.from_settings(application.bot)
+    outbox.start()
+    if settings.BROADCAST_RUNNER:
+        broadcasts = BroadcastRunner.from_settings(outbox)
+        broadcasts.start()
+        application.bot_data['broadcasts'] = broadcasts
+
+    application.bot_data['http'] = http
+    application.bot_data['upstreams'] = upstreams
+    application.bot_data['weather_cache'] = WeatherCache.from_settings()
+    application.bot_data['media'] = MediaCache.from_settings()
+    application.bot_data['news_pools'] = news_pools
+    application.bot_data['message_buffer'] = message_buffer
+    application.bot_data['outbox'] = outbox
+
+
+async def teardown(application):
+    """
+    Освобождает ресурсы, созданные в setup (post_shutdown): останавливает рассылки (их продолжит
+    следующий запуск), отправляет сообщения из очереди (не дольше OUTBOX_DRAIN_TIMEOUT секунд)
+    и дописывает в БД накопленные сообщения.
+
+    Args:
+        application (Application): Приложение бота.
+    """
+    if 'broadcasts' in application.bot_data:
+        await application.bot_data['broadcasts'].stop()
+    await application.bot_data['outbox'].stop(settings.OUTBOX_DRAIN_TIMEOUT)
+    await asyncio.to_thread(application.bot_data['message_buffer'].stop)
+    await application.bot_data['news_pools'].stop()
+    await application.bot_data['http'].aclose()
+
+
+async def start(application, polling=True):
+    """
+    Запускает приложение внутри уже работающего цикла событий.
+
+    В отличие от Application.run_polling, не управляет циклом событий и сигналами, поэтому
+    подходит для встраивания бота в другие программы (бенчмарки, ASGI-приложение).
+
+    Args:
+        application (Application): Приложение бота.
+        polling (bool): Запускать ли получение обновлений через getUpdates.
+    """
+    await application.initialize()
+    await setup(application)
+    await application.start()
+    if polling and application.updater:
+        await application.updater.start_polling(poll_interval=0, timeout=1)
+
+
+async def stop(application):
+    """
+    Останавливает приложение, запущенное функцией start.
+
+    Args:
+        application (Application): Приложение бота.
+    """
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    await application.stop()
+    await teardown(application)
+    await application.shutdown()
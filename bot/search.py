@@ -0,0 +1,256 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from .serializers import MESSAGE_FIELDS
+
+# Наибольшее количество слов поискового запроса.
+MAX_TERMS = 8
+
+SEARCH_ORDERS = ('rank', 'date')
+
+# Окончания русских слов, отбрасываемые перед поиском по префиксу: "погоде" и "погоды" ищутся как "погод*".
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ешь', 'ете', 'ишь', 'ите', 'ует', 'уют',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев',
+    'ую', 'юю', 'ть', 'ет', 'ит', 'ут', 'ют', 'ят', 'ат', 'ия', 'ья', 'ию', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+TERM_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def normalize_text(text):
+    """
+    Приводит текст к виду, в котором он хранится в индексе: нижний регистр, "ё" заменена на "е".
+
+    Args:
+        text (str): Текст.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    return text.lower().replace('ё', 'е')
+
+
+def stem(term):
+    """
+    Отбрасывает окончание русского слова, оставляя основу для поиска по префиксу.
+
+    Это упрощенная замена стеммера: основа не короче MIN_STEM_LENGTH букв, слова латиницей не меняются.
+
+    Args:
+        term (str): Слово в нижнем регистре.
+
+    Returns:
+        str: Основа слова.
+    """
+    if not CYRILLIC_RE.search(term):
+        return term
+    for ending in RUSSIAN_ENDINGS:
+        if term.endswith(ending) and len(term) - len(ending) >= MIN_STEM_LENGTH:
+            return term[:-len(ending)]
+    return term
+
+
+def search_terms(query):
+    """
+    Разбивает поисковый запрос на основы слов.
+
+    Args:
+        query (str): Запрос пользователя.
+
+    Returns:
+        list: Не более MAX_TERMS различных основ в порядке появления в запросе.
+    """
+    terms = []
+    for word in TERM_RE.findall(normalize_text(query)):
+        term = stem(word)
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+class SearchBackend:
+    """
+    Базовый класс полнотекстового поиска по тексту сообщений.
+
+    Поиск выполняется по сообщениям, отфильтрованным filter_messages; каждое слово запроса должно
+    встречаться в сообщении (как префикс слова). Результаты упорядочены по score и id: при сортировке
+    по релевантности score - отрицательная релевантность, при сортировке по дате - минус id, поэтому
+    страницы в обоих случаях получаются по курсору (score, id).
+
+    Attributes:
+        id_column (str): Выражение id сообщения, по которому индекс отдает совпадения в порядке убывания.
+    """
+    id_column = 'm.id'
+
+    def match_sql(self, terms):
+        """
+        Возвращает SQL-фрагменты поиска для конкретной базы данных.
+
+        Args:
+            terms (list): Основы слов из search_terms.
+
+        Returns:
+            tuple: (FROM и WHERE с местом {messages} для подзапроса сообщений, выражение релевантности
+                    (меньше - релевантнее), параметры до подзапроса, параметры после подзапроса).
+        """
+        raise NotImplementedError
+
+    def search(self, terms, queryset, cursor=None, limit=20, order='rank', window=None):
+        """
+        Выполняет поиск.
+
+        Args:
+            terms (list): Основы слов из search_terms.
+            queryset (QuerySet): Отфильтрованный набор сообщений.
+            cursor (tuple, optional): Позиция (score, id) последнего результата предыдущей страницы.
+            limit (int): Количество результатов.
+            order (str): "rank" - по релевантности, "date" - сначала новые.
+            window (int, optional): Для сортировки по релевантности ранжировать только столько последних
+                                    совпадений; без ограничения ранжируются все совпадения, и время запроса
+                                    растет с их числом.
+
+        Returns:
+            list: Словари с полями MESSAGE_FIELDS и score.
+        """
+        messages_sql, messages_params = queryset.values(*MESSAGE_FIELDS).order_by().query.sql_with_params()
+        source, rank, before, after = self.match_sql(terms)
+        source = source.format(messages=messages_sql)
+        columns = ', '.join(f'm.{connection.ops.quote_name(field)}' for field in MESSAGE_FIELDS)
+        params = [*before, *messages_params, *after]
+
+        if order == 'date':
+            sql = f'SELECT {columns}, -{self.id_column} AS score FROM {source}'
+            if cursor is not None:
+                sql += f' AND {self.id_column} < %s'
+                params.append(cursor[1])
+            sql += f' ORDER BY {self.id_column} DESC LIMIT %s'
+        else:
+            sql = f'SELECT {columns}, {rank} AS score FROM {source}'
+            if window:
+                sql += f' ORDER BY {self.id_column} DESC LIMIT %s'
+                params.append(window)
+            sql = f'SELECT * FROM ({sql}) r'
+            if cursor is not None:
+                sql += ' WHERE r.score > %s OR (r.score = %s AND r.id > %s)'
+                params += [cursor[0], cursor[0], cursor[1]]
+            sql += ' ORDER BY r.score, r.id LIMIT %s'
+        params.append(limit)
+        # raw() преобразует значения полей (дату) так же, как обычные запросы ORM.
+        messages = queryset.model.objects.raw(sql, params)
+        return [dict({field: getattr(message, field) for field in MESSAGE_FIELDS}, score=message.score)
+                for message in messages]
+
+    def has_more(self, terms, queryset, count):
+        """
+        Проверяет, что совпадений больше count, не считая их все.
+
+        Args:
+            terms (list): Основы слов из search_terms.
+            queryset (QuerySet): Отфильтрованный набор сообщений.
+            count (int): Количество совпадений.
+
+        Returns:
+            bool: True, если совпадений больше count.
+        """
+        messages_sql, messages_params = queryset.values('id').order_by().query.sql_with_params()
+        source, _, before, after = self.match_sql(terms)
+        sql = f'SELECT 1 FROM {source.format(messages=messages_sql)} LIMIT 1 OFFSET %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*before, *messages_params, *after, count])
+            return cursor.fetchone() is not None
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Поиск по виртуальной таблице FTS5 bot_message_search (токенизатор unicode61), ранжирование по bm25.
+    """
+    id_column = 'bot_message_search.rowid'
+
+    def match_sql(self, terms):
+        query = ' '.join(f'"{term}"*' for term in terms)
+        source = ('bot_message_search JOIN ({messages}) m ON m.id = bot_message_search.rowid '
+                  'WHERE bot_message_search MATCH %s')
+        return source, 'bm25(bot_message_search)', [], [query]
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """
+    Поиск по GIN-индексу to_tsvector('russian', ...) со стеммингом Snowball, ранжирование по ts_rank.
+    """
+
+    document = "to_tsvector('russian', replace(replace(m.text, 'ё', 'е'), 'Ё', 'Е'))"
+
+    def match_sql(self, terms):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        source = f"to_tsquery('russian', %s) q, ({{messages}}) m WHERE {self.document} @@ q"
+        return source, f'-ts_rank({self.document}, q)', [query], []
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    Возвращает реализацию поиска для текущей базы данных.
+
+    Returns:
+        SearchBackend: Реализация поиска.
+
+    Raises:
+        ImproperlyConfigured: Если база данных не поддерживает полнотекстовый поиск.
+    """
+    backend = SEARCH_BACKENDS.get(connection.vendor)
+    if backend is None:
+        raise ImproperlyConfigured(f'Полнотекстовый поиск не поддерживается для {connection.vendor}.')
+    return backend()
+
+
+def search_messages(query, queryset, cursor=None, limit=20, order='rank'):
+    """
+    Ищет сообщения по словам запроса с учетом фильтров набора сообщений.
+
+    При сортировке по релевантности ранжируются все совпадения или, если задан settings.SEARCH_RANK_WINDOW,
+    только столько последних совпадений (см. rank_truncated).
+
+    Args:
+        query (str): Запрос пользователя.
+        queryset (QuerySet): Отфильтрованный набор сообщений (filter_messages).
+        cursor (tuple, optional): Позиция (score, id) последнего результата предыдущей страницы.
+        limit (int): Количество результатов.
+        order (str): "rank" - по релевантности, "date" - сначала новые.
+
+    Returns:
+        list: Словари с полями MESSAGE_FIELDS и score; пустой список, если в запросе нет слов.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return get_search_backend().search(terms, queryset, cursor, limit, order, settings.SEARCH_RANK_WINDOW)
+
+
+def rank_truncated(query, queryset):
+    """
+    Проверяет, что сортировка по релевантности ранжировала не все совпадения из-за SEARCH_RANK_WINDOW.
+
+    Args:
+        query (str): Запрос пользователя.
+        queryset (QuerySet): Отфильтрованный набор сообщений (filter_messages).
+
+    Returns:
+        bool: True, если совпадений больше settings.SEARCH_RANK_WINDOW и более старые не ранжировались.
+    """
+    terms = search_terms(query)
+    if not terms or not settings.SEARCH_RANK_WINDOW:
+        return False
+    return get_search_backend().has_more(terms, queryset, settings.SEARCH_RANK_WINDOW)
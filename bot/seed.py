@@ -0,0 +1,66 @@
+import random
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .commands import parse_command
+from .models import Message
+
+SEED_TEXTS = (
+    '/start',
+    '/help',
+    '/news',
+    '/news technology',
+    '/weather',
+    'погода москва',
+    'погода казань',
+    'привет',
+    'спасибо',
+)
+
+
+def seed_messages(count, chats=10000, users=None, days=30, batch_size=10000, seed=0, text_factory=None):
+    """
+    Быстро заполняет таблицу Message синтетическими сообщениями для бенчмарков.
+
+    Строки вставляются напрямую через executemany пачками по batch_size, минуя ORM и агрегаты дашборда;
+    даты равномерно распределены по последним days суткам и возрастают вместе с id.
+
+    Args:
+        count (int): Количество сообщений.
+        chats (int): Количество различных чатов.
+        users (int, optional): Количество различных пользователей, по умолчанию равно chats.
+        days (int): За сколько последних суток распределить даты сообщений.
+        batch_size (int): Количество строк в одной транзакции.
+        seed (int): Начальное значение генератора случайных чисел.
+        text_factory (callable, optional): Функция, возвращающая текст сообщения по генератору случайных
+                                           чисел; по умолчанию текст выбирается из SEED_TEXTS.
+
+    Returns:
+        int: Количество вставленных строк.
+    """
+    rnd = random.Random(seed)
+    users = users or chats
+    table = connection.ops.quote_name(Message._meta.db_table)
+    sql = f'INSERT INTO {table} (user_id, chat_id, text, command, argument, date) VALUES (%s, %s, %s, %s, %s, %s)'
+    start = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    adapt = connection.ops.adapt_datetimefield_value
+    texts = [(text,) + parse_command(text) for text in SEED_TEXTS]
+
+    inserted = 0
+    while inserted < count:
+        rows = []
+        for i in range(inserted, min(inserted + batch_size, count)):
+            if text_factory is None:
+                text, command, argument = rnd.choice(texts)
+            else:
+                text = text_factory(rnd)
+                command, argument = parse_command(text)
+            rows.append((rnd.randrange(1, users + 1), rnd.randrange(1, chats + 1), text, command, argument,
+                         adapt(start + step * i)))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        inserted += len(rows)
+    return inserted
@@ -1,11 +1,78 @@
 from rest_framework import serializers
-from .models import Message
+from .commands import parse_command
+from .models import Broadcast, Message
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def format_datetime(value):
+    """
+    Форматирует дату так же, как serializers.DateTimeField с настройками по умолчанию.
+
+    Args:
+        value (datetime): Дата со временем.
+
+    Returns:
+        str: Дата в формате ISO 8601 в текущем часовом поясе ("Z" вместо "+00:00") или None.
+    """
+    if not value:
+        return None
+    if settings.USE_TZ:
+        current = timezone.get_current_timezone()
+        value = value.astimezone(current) if timezone.is_aware(value) else timezone.make_aware(value, current)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+MESSAGE_FIELDS = ('id', 'user_id', 'chat_id', 'text', 'command', 'argument', 'date')
+
+
+def message_values(queryset):
+    """
+    Выбирает из набора сообщений только поля, выводимые в API, в виде словарей.
+
+    Args:
+        queryset (QuerySet): Набор сообщений.
+
+    Returns:
+        QuerySet: Набор словарей с полями MESSAGE_FIELDS в порядке MessageSerializer.
+    """
+    return queryset.values(*MESSAGE_FIELDS)
+
+
+def serialize_messages(rows):
+    """
+    Быстрая сериализация сообщений для чтения, без создания объектов Message и полей DRF.
+
+    Результат совпадает с MessageSerializer(..., many=True).data: тот же порядок полей и тот же формат даты.
+
+    Args:
+        rows (list): Словари из message_values.
+
+    Returns:
+        list: Сериализованные сообщения.
+    """
+    if not settings.USE_TZ:
+        for row in rows:
+            row['date'] = format_datetime(row['date'])
+        return rows
+
+    current = timezone.get_current_timezone()
+    for row in rows:
+        value = row['date'].astimezone(current).isoformat()
+        row['date'] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return rows
+
 
 class MessageSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Message.
 
+    Если команда не указана явно, команда и ее аргумент определяются по тексту сообщения.
+
     Attributes:
         Meta (class): Внутренний класс, содержащий метаданные сериализатора.
     """
@@ -13,6 +80,44 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = '__all__'
+        extra_kwargs = {'argument': {'read_only': True}}
+
+    def validate(self, attrs):
+        """
+        Заполняет команду и аргумент по тексту сообщения, если команда не указана.
+
+        Явно указанная команда сбрасывает аргумент, чтобы при изменении сообщения не остался аргумент
+        прежней команды.
+
+        Args:
+            attrs (dict): Проверенные значения полей.
+
+        Returns:
+            dict: Значения полей с командой и аргументом.
+        """
+        if attrs.get('command'):
+            attrs['argument'] = None
+        elif 'text' in attrs:
+            attrs['command'], attrs['argument'] = parse_command(attrs['text'])
+        return attrs
+
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для модели Broadcast.
+
+    При создании рассылки указывается только текст; состояние и счетчики доступны только для чтения.
+
+    Attributes:
+        Meta (class): Внутренний класс, содержащий метаданные сериализатора.
+    """
+
+    class Meta:
+        model = Broadcast
+        fields = ('id', 'text', 'status', 'total', 'sent', 'blocked', 'failed', 'last_chat_id', 'created',
+                  'started', 'finished')
+        read_only_fields = ('status', 'total', 'sent', 'blocked', 'failed', 'last_chat_id', 'created',
+                            'started', 'finished')
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -0,0 +1,427 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.telegram.org/bot'
+
+HEARTBEAT_INTERVAL = 1.0
+
+
+def update_chat_id(data):
+    """
+    Определяет чат обновления Telegram без разбора обновления в объекты python-telegram-bot.
+
+    Args:
+        data (dict): Обновление в формате JSON Bot API.
+
+    Returns:
+        int: Идентификатор чата (для обновлений без чата - идентификатор пользователя) или 0.
+    """
+    for value in data.values():
+        if isinstance(value, dict):
+            chat = value.get('chat') or (value.get('message') or {}).get('chat')
+            if chat:
+                return chat['id']
+            user = value.get('from') or value.get('user')
+            if user:
+                return user['id']
+    return 0
+
+
+def shard_for(chat_id, shards):
+    """
+    Возвращает номер процесса, обрабатывающего обновления чата.
+
+    Args:
+        chat_id (int): Идентификатор чата.
+        shards (int): Количество процессов.
+
+    Returns:
+        int: Номер процесса от 0 до shards - 1; один и тот же для всех обновлений чата.
+    """
+    return chat_id % shards
+
+
+class ShardedBot:
+    """
+    Многопроцессный режим бота: процесс приема обновлений и N процессов-обработчиков.
+
+    Процесс приема получает обновления через getUpdates и раскладывает их по процессам-обработчикам
+    по chat_id (shard_for), поэтому все обновления одного чата обрабатывает один процесс в порядке
+    поступления. Очереди процессов ограничены: если очередь процесса заполнена, прием новых обновлений
+    приостанавливается, а Telegram хранит их до следующего getUpdates. Процессы-обработчики раз
+    в секунду обновляют отметку активности; процесс, который завершился или не обновлял отметку
+    health_timeout секунд, перезапускается.
+
+    Как и в Poller, каждая пачка getUpdates сохраняется в PendingUpdate вместе с offset следующего
+    getUpdates до раскладки по очередям, то есть до того, как Telegram удалит ее. Процессы-обработчики
+    раз в flush_interval секунд удаляют из PendingUpdate обработанные обновления. При запуске
+    раскладываются обновления, оставшиеся в PendingUpdate с предыдущего запуска; перезапущенный
+    процесс-обработчик получает из PendingUpdate необработанные обновления своих чатов, в том числе
+    те, что упавший процесс успел взять из очереди. Обновления, обработанные незадолго до сбоя,
+    могут обработаться повторно.
+
+    Ограничение частоты отправки OUTBOX_GLOBAL_RATE делится между процессами поровну; рассылки
+    выполняет только первый процесс-обработчик.
+
+    Attributes:
+        token (str): Токен Telegram-бота.
+        workers (int): Количество процессов-обработчиков.
+        base_url (str): Базовый URL Bot API.
+        queue_size (int): Максимальное количество пачек обновлений в очереди процесса.
+        health_timeout (float): Через сколько секунд без отметки активности процесс перезапускается.
+        poll_timeout (int): Таймаут long polling getUpdates, в секундах.
+        flush_interval (float): Интервал удаления обработанных обновлений из PendingUpdate, в секундах.
+        bot_id (int): Идентификатор бота в Telegram.
+        offset (int): Offset следующего getUpdates.
+        dispatched (int): Количество принятых обновлений.
+        replayed (int): Количество обновлений, заново разложенных из PendingUpdate.
+        backpressure (int): Сколько раз прием ждал освобождения места в очереди процесса.
+        restarts (int): Количество перезапусков процессов-обработчиков.
+    """
+
+    def __init__(self, token, workers, base_url=None, queue_size=100, health_timeout=30.0, poll_timeout=10,
+                 flush_interval=1.0):
+        self.token = token
+        self.workers = workers
+        self.base_url = base_url or DEFAULT_BASE_URL
+        self.queue_size = queue_size
+        self.health_timeout = health_timeout
+        self.poll_timeout = poll_timeout
+        self.flush_interval = flush_interval
+        self.bot_id = int(token.split(':')[0])
+        self.offset = None
+        self.dispatched = 0
+        self.replayed = 0
+        self.backpressure = 0
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._queues = [self._context.Queue(queue_size) for _ in range(workers)]
+        self._heartbeats = self._context.Array('d', workers)
+        self._ready = self._context.Array('b', workers)
+        self._processes = [None] * workers
+        self._generations = [0] * workers
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_settings(cls, token, workers=None, base_url=None):
+        """
+        Создает многопроцессный бот с параметрами из настроек проекта.
+
+        Args:
+            token (str): Токен Telegram-бота.
+            workers (int, optional): Количество процессов, по умолчанию settings.BOT_WORKERS.
+            base_url (str, optional): Базовый URL Bot API.
+
+        Returns:
+            ShardedBot: Бот, настроенный через BOT_WORKER_*, BOT_POLL_TIMEOUT и BOT_OFFSET_FLUSH_INTERVAL в settings.
+        """
+        return cls(
+            token, workers or settings.BOT_WORKERS, base_url=base_url,
+            queue_size=settings.BOT_WORKER_QUEUE_SIZE,
+            health_timeout=settings.BOT_WORKER_HEALTH_TIMEOUT,
+            poll_timeout=settings.BOT_POLL_TIMEOUT,
+            flush_interval=settings.BOT_OFFSET_FLUSH_INTERVAL,
+        )
+
+    def start(self):
+        """
+        Запускает процессы-обработчики.
+        """
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def wait_ready(self, timeout=None):
+        """
+        Ожидает, пока все процессы-обработчики запустят приложение бота.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания, в секундах.
+
+        Returns:
+            bool: True, если все процессы готовы.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(self._ready):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def run(self):
+        """
+        Запускает процессы-обработчики, раскладывает обновления, не обработанные предыдущим запуском,
+        и принимает новые обновления до SIGINT или SIGTERM.
+        """
+        from .polling import load_offset, load_pending_updates, save_offset
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stop.set())
+        self.offset = load_offset(self.bot_id)
+        pending = load_pending_updates(self.bot_id)
+        self.start()
+        try:
+            if pending:
+                logger.info('Обработка %d обновлений, не обработанных предыдущим запуском', len(pending))
+                if self.offset is None or self.offset <= pending[-1]['update_id']:
+                    self.offset = pending[-1]['update_id'] + 1
+                self.dispatch(pending)
+                self.replayed += len(pending)
+            self.poll()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            if self.offset is not None:
+                save_offset(self.bot_id, self.offset)
+
+    def request_stop(self):
+        """
+        Просит цикл приема обновлений завершиться после текущего getUpdates.
+        """
+        self._stop.set()
+
+    def poll(self):
+        """
+        Принимает обновления через getUpdates и распределяет их по процессам, пока не вызван request_stop.
+
+        Пачка сохраняется в PendingUpdate до раскладки; если сохранить ее не удалось, offset не сдвигается,
+        и Telegram отдаст эту пачку повторно.
+        """
+        from .polling import save_pending_updates
+
+        url = f'{self.base_url}{self.token}/getUpdates'
+        with httpx.Client(timeout=self.poll_timeout + 10) as client:
+            while not self._stop.is_set():
+                try:
+                    response = client.post(url, json={'offset': self.offset, 'timeout': self.poll_timeout, 'limit': 100})
+                    response.raise_for_status()
+                    updates = response.json()['result']
+                except (httpx.HTTPError, ValueError, KeyError) as e:
+                    logger.warning('Ошибка getUpdates: %s', e)
+                    time.sleep(1)
+                    continue
+                if not updates:
+                    self.check_workers()
+                    continue
+                offset = updates[-1]['update_id'] + 1
+                try:
+                    save_pending_updates(self.bot_id, updates, offset)
+                except Exception:
+                    logger.exception('Не удалось сохранить %d полученных обновлений', len(updates))
+                    time.sleep(1)
+                    continue
+                self.offset = offset
+                self.dispatch(updates)
+
+    def dispatch(self, updates):
+        """
+        Раскладывает пачку обновлений по очередям процессов-обработчиков.
+
+        Перед раскладкой перезапускает упавшие процессы; если очередь процесса заполнена, ждет освобождения
+        места, проверяя состояние процессов. Пачка процесса, перезапущенного во время ожидания, не кладется
+        в очередь: новый процесс уже получил ее из PendingUpdate.
+
+        Args:
+            updates (list): Обновления в формате JSON Bot API.
+        """
+        self.check_workers()
+        generations = list(self._generations)
+        batches = defaultdict(list)
+        for data in updates:
+            batches[shard_for(update_chat_id(data), self.workers)].append(data)
+        for index, batch in batches.items():
+            while self._generations[index] == generations[index]:
+                try:
+                    self._queues[index].put(batch, timeout=1)
+                    break
+                except queue.Full:
+                    self.backpressure += 1
+                    self.check_workers()
+        self.dispatched += len(updates)
+
+    def check_workers(self):
+        """
+        Перезапускает процессы-обработчики, которые завершились или перестали обновлять отметку активности.
+        """
+        now = time.time()
+        for index, process in enumerate(self._processes):
+            if process.is_alive() and now - self._heartbeats[index] <= self.health_timeout:
+                continue
+            if process.is_alive():
+                logger.error('Процесс %s не отвечает %.0f с, перезапуск', process.name, now - self._heartbeats[index])
+                process.kill()
+            else:
+                logger.error('Процесс %s завершился с кодом %s, перезапуск', process.name, process.exitcode)
+            process.join()
+            self.restarts += 1
+            self._generations[index] += 1
+            self._replace_queue(index)
+            self._spawn(index)
+
+    def stop(self, timeout=30):
+        """
+        Останавливает процессы-обработчики после обработки уже принятых обновлений.
+
+        Args:
+            timeout (float): Максимальное время ожидания каждого процесса, в секундах.
+        """
+        for updates in self._queues:
+            updates.put(None)
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.error('Процесс %s не остановился за %s с', process.name, timeout)
+                process.terminate()
+                process.join()
+
+    def _replace_queue(self, index):
+        # Процесс, завершенный во время updates.get(), мог оставить очередь заблокированной для чтения,
+        # поэтому новый процесс получает новую очередь. Пачки старой очереди и обновления, которые упавший
+        # процесс не успел обработать, сохранены в PendingUpdate и передаются новому процессу оттуда.
+        from .polling import load_pending_updates
+
+        old = self._queues[index]
+        old.close()
+        old.cancel_join_thread()
+        self._queues[index] = self._context.Queue(self.queue_size)
+        try:
+            updates = [data for data in load_pending_updates(self.bot_id)
+                       if shard_for(update_chat_id(data), self.workers) == index]
+        except Exception:
+            logger.exception('Не удалось прочитать необработанные обновления процесса %d, они будут обработаны '
+                             'при следующем запуске', index)
+            return
+        # Не больше queue_size пачек, чтобы put не ждал запуска нового процесса.
+        size = max(1, -(-len(updates) // self.queue_size))
+        for i in range(0, len(updates), size):
+            self._queues[index].put(updates[i:i + size])
+        if updates:
+            self.replayed += len(updates)
+            logger.info('Новому процессу %d передано %d необработанных обновлений', index, len(updates))
+
+    def _spawn(self, index):
+        # Отсчет времени до проверки активности начинается с запуска процесса.
+        self._heartbeats[index] = time.time()
+        self._ready[index] = 0
+        process = self._context.Process(
+            target=run_worker, name=f'bot-worker-{index}',
+            args=(index, self.workers, self.token, self.base_url, self._queues[index], self._heartbeats, self._ready,
+                  self.flush_interval),
+        )
+        process.start()
+        self._processes[index] = process
+
+
+def run_worker(index, workers, token, base_url, updates, heartbeats, ready, flush_interval):
+    """
+    Точка входа процесса-обработчика.
+
+    Args:
+        index (int): Номер процесса.
+        workers (int): Количество процессов.
+        token (str): Токен Telegram-бота.
+        base_url (str): Базовый URL Bot API.
+        updates (multiprocessing.Queue): Очередь пачек обновлений этого процесса.
+        heartbeats (multiprocessing.Array): Отметки активности процессов (time.time()).
+        ready (multiprocessing.Array): Признаки готовности процессов.
+        flush_interval (float): Интервал удаления обработанных обновлений из PendingUpdate, в секундах.
+    """
+    # Ctrl+C получают все процессы группы; обработчики останавливает процесс приема через очередь.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Bot_service.settings')
+
+    import django
+    django.setup()
+
+    # Ограничение Telegram на частоту отправки общее для бота, поэтому каждый процесс получает свою долю.
+    settings.OUTBOX_GLOBAL_RATE /= workers
+    settings.OUTBOX_GLOBAL_BURST = max(1.0, settings.OUTBOX_GLOBAL_BURST / workers)
+    # Рассылки выполняет один процесс, чтобы процессы не захватывали рассылку друг у друга.
+    settings.BROADCAST_RUNNER = settings.BROADCAST_RUNNER and index == 0
+    asyncio.run(_serve(index, token, base_url, updates, heartbeats, ready, flush_interval))
+
+
+async def _serve(index, token, base_url, updates, heartbeats, ready, flush_interval):
+    from telegram import Update
+
+    from . import runtime
+
+    application = runtime.build_application(token, base_url=base_url, polling=False)
+    await runtime.start(application, polling=False)
+    bot_id = int(token.split(':')[0])
+    processed = []
+    beat = asyncio.create_task(_heartbeat(index, heartbeats))
+    acknowledge = asyncio.create_task(_acknowledge(bot_id, processed, flush_interval))
+    ready[index] = 1
+    # Пока обрабатывается max_pending обновлений, новые пачки остаются в очереди процесса.
+    slots = asyncio.Semaphore(settings.BOT_CONCURRENCY * 2)
+    tasks = set()
+
+    async def process(update):
+        try:
+            await application.update_processor.process_update(update, application.process_update(update))
+        finally:
+            slots.release()
+
+    def finished(task, update_id):
+        tasks.discard(task)
+        if not task.cancelled():
+            processed.append(update_id)
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, updates.get)
+            if batch is None:
+                break
+            for data in batch:
+                await slots.acquire()
+                task = asyncio.create_task(process(Update.de_json(data, application.bot)))
+                tasks.add(task)
+                task.add_done_callback(lambda task, update_id=data['update_id']: finished(task, update_id))
+        await asyncio.gather(*tasks)
+    finally:
+        beat.cancel()
+        acknowledge.cancel()
+        await runtime.stop(application)
+        await _flush_processed(bot_id, processed)
+
+
+async def _acknowledge(bot_id, processed, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await _flush_processed(bot_id, processed)
+
+
+async def _flush_processed(bot_id, processed):
+    from .polling import save_progress
+
+    if not processed:
+        return
+    done = list(processed)
+    processed.clear()
+    try:
+        await sync_to_async(save_progress)(bot_id, None, None, done)
+    except Exception:
+        logger.exception('Не удалось удалить %d обработанных обновлений из PendingUpdate', len(done))
+        processed.extend(done)
+
+
+async def _heartbeat(index, heartbeats):
+    while True:
+        heartbeats[index] = time.time()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
@@ -0,0 +1,371 @@
+import bisect
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import itemgetter
+from urllib.parse import parse_qs, urlparse
+
+STUB_TOKEN = '123456:STUB'
+
+CITIES = ('москва', 'казань', 'сочи', 'новосибирск', 'екатеринбург', 'самара', 'омск', 'уфа',
+          'пермь', 'воронеж', 'бишкек', 'алматы', 'минск', 'ташкент', 'лондон', 'париж')
+
+COMMAND_MIX = (
+    ('/start', 5),
+    ('/help', 5),
+    ('/news', 15),
+    ('/weather', 5),
+    ('погода', 50),
+    ('text', 20),
+)
+
+
+def synthetic_updates(count, chats=1000, mix=COMMAND_MIX, start_id=1, seed=0):
+    """
+    Генерирует обновления Telegram с заданным соотношением команд.
+
+    Args:
+        count (int): Количество обновлений.
+        chats (int): Количество различных чатов (и пользователей).
+        mix (tuple): Пары (вид сообщения, вес). Вид - команда, "погода" или "text".
+        start_id (int): update_id первого обновления.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Returns:
+        list: Список обновлений в формате JSON Bot API (словари).
+    """
+    rnd = random.Random(seed)
+    kinds = [kind for kind, _ in mix]
+    weights = [weight for _, weight in mix]
+    updates = []
+    for i in range(count):
+        chat_id = rnd.randrange(1, chats + 1)
+        kind = rnd.choices(kinds, weights)[0]
+        if kind == 'погода':
+            text = f'погода {rnd.choice(CITIES)}'
+        elif kind == 'text':
+            text = rnd.choice(('привет', 'спасибо', 'что ты умеешь?'))
+        else:
+            text = kind
+        message = {
+            'message_id': i + 1,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': f'User{chat_id}'},
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        updates.append({'update_id': start_id + i, 'message': message})
+    return updates
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиенты закрывают долгие запросы getUpdates при остановке бота - это не ошибка.
+        pass
+
+
+class StubServer:
+    """
+    Локальная заглушка Telegram Bot API, OpenWeatherMap и newsapi.org для бенчмарков.
+
+    Отдает заранее подготовленные обновления через getUpdates, принимает отправку сообщений и
+    фотографий и отвечает на запросы погоды и новостей с искусственной задержкой. Может имитировать
+    ограничение частоты отправки Telegram: сообщения сверх global_limit в секунду или чаще chat_limit
+    в одном чате отклоняются ответом 429 с retry_after. Сообщения в чаты из blocked_chats отклоняются
+    ответом 403, как если бы пользователь заблокировал бота. Доля error_rate запросов погоды и новостей
+    и доля telegram_error_rate отправок сообщений завершаются ошибкой сервера (503 и 502).
+
+    Attributes:
+        updates (list): Обновления, отдаваемые через getUpdates, по возрастанию update_id.
+        latency (float): Задержка ответов OpenWeatherMap и newsapi, в секундах.
+        telegram_latency (float): Задержка ответов методов Bot API (кроме getUpdates), в секундах.
+        global_limit (int): Сообщений в секунду для всех чатов; 0 - без ограничения.
+        chat_limit (float): Сообщений в секунду в одном чате; 0 - без ограничения.
+        blocked_chats (set): Чаты, в которых бот заблокирован.
+        error_rate (float): Доля запросов OpenWeatherMap и newsapi, на которые отвечается ошибка 503.
+        telegram_error_rate (float): Доля отправок сообщений, на которые отвечается ошибка 502.
+        sent (list): Отправленные ботом сообщения: кортежи (метод, параметры, time.monotonic()).
+        throttled (int): Количество сообщений, отклоненных ответом 429.
+        failed (int): Количество ответов с имитированной ошибкой сервера.
+        delivered (dict): Время первой выдачи обновления через getUpdates (time.monotonic()) по update_id.
+    """
+
+    # Допустимое отклонение интервала между сообщениями в одном чате (задержки сети), в секундах.
+    CHAT_LIMIT_SLACK = 0.05
+
+    def __init__(self, updates=(), latency=0.0, telegram_latency=0.0, global_limit=0, chat_limit=0.0,
+                 blocked_chats=(), error_rate=0.0, telegram_error_rate=0.0, seed=0, host='127.0.0.1', port=0):
+        self.updates = list(updates)
+        self.latency = latency
+        self.telegram_latency = telegram_latency
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.blocked_chats = set(blocked_chats)
+        self.error_rate = error_rate
+        self.telegram_error_rate = telegram_error_rate
+        self.sent = []
+        self.throttled = 0
+        self.failed = 0
+        self.delivered = {}
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._last_sent = {}
+        self._lock = threading.Condition()
+        self._server = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Базовый адрес заглушки, например http://127.0.0.1:8081.
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def bot_api_url(self):
+        """
+        Базовый URL Bot API для ApplicationBuilder.base_url.
+        """
+        return f'{self.url}/bot'
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке.
+
+        Returns:
+            StubServer: Эта же заглушка.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Останавливает сервер.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def record(self, method, params):
+        """
+        Запоминает отправленное ботом сообщение, если оно не превышает ограничений частоты отправки.
+
+        Returns:
+            int: 0, если сообщение принято, иначе количество секунд для retry_after.
+        """
+        now = time.monotonic()
+        chat_id = int(params['chat_id'])
+        with self._lock:
+            recent = self._recent
+            while recent and recent[0] <= now - 1:
+                recent.popleft()
+            last = self._last_sent.get(chat_id)
+            if ((self.global_limit and len(recent) >= self.global_limit)
+                    or (self.chat_limit and last is not None and now - last < 1 / self.chat_limit - self.CHAT_LIMIT_SLACK)):
+                self.throttled += 1
+                return 1
+            recent.append(now)
+            self._last_sent[chat_id] = now
+            self.sent.append((method, params, now))
+            self._lock.notify_all()
+        return 0
+
+    def wait_sent(self, count, timeout=None):
+        """
+        Ожидает, пока бот отправит не меньше count сообщений.
+
+        Returns:
+            bool: True, если сообщения отправлены до истечения timeout.
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: len(self.sent) >= count, timeout)
+
+    def fail(self, rate):
+        """
+        Решает, ответить ли на запрос имитированной ошибкой сервера.
+
+        Args:
+            rate (float): Доля запросов с ошибкой.
+
+        Returns:
+            bool: True, если нужно ответить ошибкой.
+        """
+        if not rate:
+            return False
+        with self._lock:
+            if self._random.random() >= rate:
+                return False
+            self.failed += 1
+        return True
+
+    def pending_updates(self, offset, limit, timeout):
+        """
+        Возвращает обновления начиная с offset, при их отсутствии ожидая не дольше секунды.
+
+        Как и Bot API, удаляет обновления с update_id меньше offset: их получение подтверждено.
+        """
+        deadline = time.monotonic() + min(timeout, 1.0)
+        with self._lock:
+            if offset:
+                del self.updates[:bisect.bisect_left(self.updates, offset, key=itemgetter('update_id'))]
+            while True:
+                batch = self.updates[:limit]
+                remaining = deadline - time.monotonic()
+                if batch or remaining <= 0:
+                    now = time.monotonic()
+                    for update in batch:
+                        self.delivered.setdefault(update['update_id'], now)
+                    return batch
+                self._lock.wait(remaining)
+
+    def add_updates(self, updates):
+        """
+        Добавляет обновления в очередь getUpdates; update_id должны быть больше уже добавленных.
+        """
+        with self._lock:
+            self.updates.extend(updates)
+            self._lock.notify_all()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch()
+
+            def do_POST(self):
+                self._dispatch()
+
+            def _params(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if body:
+                    content_type = self.headers.get('Content-Type', '')
+                    if content_type.startswith('application/json'):
+                        params.update(json.loads(body))
+                    elif content_type.startswith('multipart/form-data'):
+                        message = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+                        for part in message.get_payload():
+                            name = part.get_param('name', header='content-disposition')
+                            filename = part.get_filename()
+                            value = part.get_payload(decode=True)
+                            if filename:
+                                params[name] = f'upload:{filename}:{len(value)}'
+                                continue
+                            try:
+                                params[name] = json.loads(value)
+                            except ValueError:
+                                params[name] = value.decode()
+                    else:
+                        for key, values in parse_qs(body.decode()).items():
+                            try:
+                                params[key] = json.loads(values[0])
+                            except ValueError:
+                                params[key] = values[0]
+                return url.path, params
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _dispatch(self):
+                path, params = self._params()
+                match = re.fullmatch(r'/bot[^/]+/(\w+)', path)
+                if match:
+                    status, payload = stub.telegram(match.group(1), params)
+                elif path.endswith('/weather'):
+                    status, payload = stub.weather(params)
+                elif path.endswith('/top-headlines'):
+                    status, payload = stub.news(params)
+                else:
+                    status, payload = 404, {'error': 'not found'}
+                self._reply(status, payload)
+
+        return Handler
+
+    def telegram(self, method, params):
+        """
+        Отвечает на вызов метода Bot API.
+
+        Returns:
+            tuple: HTTP-статус и тело ответа.
+        """
+        if method == 'getUpdates':
+            updates = self.pending_updates(int(params.get('offset') or 0), int(params.get('limit') or 100),
+                                           float(params.get('timeout') or 0))
+            return 200, {'ok': True, 'result': updates}
+        if self.telegram_latency:
+            time.sleep(self.telegram_latency)
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot'}}
+        if method in ('sendMessage', 'sendPhoto'):
+            if int(params['chat_id']) in self.blocked_chats:
+                return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+            if self.fail(self.telegram_error_rate):
+                return 502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}
+            retry_after = self.record(method, params)
+            if retry_after:
+                return 429, {'ok': False, 'error_code': 429, 'description': f'Too Many Requests: retry after {retry_after}',
+                             'parameters': {'retry_after': retry_after}}
+            result = {
+                'message_id': len(self.sent),
+                'date': int(time.time()),
+                'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            }
+            if method == 'sendPhoto':
+                result['photo'] = [{'file_id': f'stub-{params["photo"]}', 'file_unique_id': 'stub',
+                                    'width': 100, 'height': 100}]
+            else:
+                result['text'] = params.get('text', '')
+            return 200, {'ok': True, 'result': result}
+        return 200, {'ok': True, 'result': True}
+
+    def weather(self, params):
+        """
+        Отвечает как OpenWeatherMap: известные города из CITIES, для остальных 404.
+        """
+        time.sleep(self.latency)
+        if self.fail(self.error_rate):
+            return 503, {'cod': '503', 'message': 'service unavailable'}
+        city = params.get('q', '')
+        if city not in CITIES:
+            return 404, {'cod': '404', 'message': 'city not found'}
+        return 200, {'main': {'temp': (sum(map(ord, city)) % 50) - 15.0}, 'name': city}
+
+    def news(self, params):
+        """
+        Отвечает как newsapi.org top-headlines.
+        """
+        time.sleep(self.latency)
+        if self.fail(self.error_rate):
+            return 503, {'status': 'error', 'code': 'serviceUnavailable', 'message': 'service unavailable'}
+        articles = [{'title': f'Headline {i}', 'description': f'Description {i}', 'url': f'https://example.com/{i}'}
+                    for i in range(20)]
+        return 200, {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
@@ -0,0 +1,52 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты попыток входа с одного IP-адреса (частота "login" в DEFAULT_THROTTLE_RATES).
+
+    Каждая попытка входа проверяет пароль медленной функцией хеширования, поэтому без ограничения
+    поток запросов с неверными паролями занимает весь процессор сервера.
+    """
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        """
+        Возвращает ключ счетчика попыток для IP-адреса клиента.
+
+        Args:
+            request (Request): Запрос.
+            view (APIView): Представление.
+
+        Returns:
+            str: Ключ в кэше Django.
+        """
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты попыток входа под одним именем пользователя с одного IP-адреса (частота "login_username").
+
+    Ограничивает подбор пароля к одной учетной записи строже, чем LoginRateThrottle. Счетчик ведется для пары
+    имя пользователя и IP-адрес: общий для всех адресов счетчик позволял бы любому, отправляя несколько
+    запросов в минуту, не давать владельцу учетной записи войти.
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        """
+        Возвращает ключ счетчика попыток для имени пользователя из тела запроса и IP-адреса клиента.
+
+        Args:
+            request (Request): Запрос.
+            view (APIView): Представление.
+
+        Returns:
+            str: Ключ в кэше Django или None, если имя пользователя не передано.
+        """
+        username = request.data.get('username')
+        if not username or not isinstance(username, str):
+            return None
+        ident = f'{self.get_ident(request)}:{username.casefold()}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,273 @@
+import asyncio
+import bisect
+import logging
+import random
+import time
+from collections import Counter
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """
+    Запрос не выполнялся, потому что автоматический выключатель внешнего API разомкнут.
+    """
+
+
+class Histogram:
+    """
+    Гистограмма значений с фиксированными границами интервалов (как histogram в Prometheus).
+
+    Attributes:
+        buckets (tuple): Верхние границы интервалов по возрастанию; последний интервал - бесконечность.
+        counts (list): Количество значений в каждом интервале (не накопительно).
+        count (int): Общее количество значений.
+        sum (float): Сумма значений.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Учитывает значение.
+
+        Args:
+            value (float): Значение, например длительность запроса в секундах.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        """
+        Добавляет значения другой гистограммы с теми же границами интервалов.
+
+        Args:
+            other (Histogram): Гистограмма, например того же показателя из другого потока.
+        """
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def as_dict(self):
+        """
+        Возвращает гистограмму с накопительными счетчиками интервалов.
+
+        Returns:
+            dict: Словарь {"buckets": {граница: количество значений <= границы}, "count", "sum"}.
+        """
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = total
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель: после серии неудачных запросов перестает обращаться к внешнему API.
+
+    После failure_threshold неудач подряд выключатель размыкается, и запросы сразу завершаются ошибкой.
+    Через reset_timeout секунд пропускается один пробный запрос: при успехе выключатель замыкается,
+    при неудаче снова размыкается.
+
+    Attributes:
+        failure_threshold (int): Количество неудач подряд, после которого выключатель размыкается.
+        reset_timeout (float): Время до пробного запроса, в секундах.
+        state (str): Состояние: "closed", "open" или "half_open".
+        failures (int): Количество неудач подряд.
+        opened (int): Сколько раз выключатель размыкался.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+
+    def allow(self):
+        """
+        Проверяет, можно ли выполнить запрос.
+
+        Returns:
+            bool: True, если выключатель замкнут или пришло время пробного запроса.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        """
+        Учитывает успешный запрос.
+        """
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        """
+        Учитывает неудачный запрос.
+        """
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+
+class Upstream:
+    """
+    Клиент внешнего API (OpenWeatherMap, newsapi) поверх общего пула соединений httpx.
+
+    Выполняет GET-запросы с таймаутами, ограниченным числом повторов с экспоненциальной задержкой
+    при сетевых ошибках и ответах 5xx/429 и автоматическим выключателем, который при недоступности API
+    сразу возвращает CircuitOpenError, чтобы вызывающий код использовал кэшированные данные.
+    Собирает гистограмму длительности запросов и счетчики ошибок по видам.
+
+    Клиент рассчитан на работу в одном цикле событий asyncio.
+
+    Attributes:
+        name (str): Имя внешнего API в статистике.
+        http (httpx.AsyncClient): Общий HTTP-клиент.
+        retries (int): Количество повторов после первой неудачной попытки.
+        backoff (float): Задержка перед первым повтором, в секундах; удваивается с каждым повтором.
+        breaker (CircuitBreaker): Автоматический выключатель.
+        latency (Histogram): Длительность попыток запросов, в секундах.
+        requests (int): Количество вызовов get.
+        errors (Counter): Количество ошибок по видам: timeout, connect, network, status_5xx, status_429,
+                          circuit_open, failed (вызовы, завершившиеся ошибкой после всех повторов).
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, name, http, retries=2, backoff=0.2, breaker=None):
+        self.name = name
+        self.http = http
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = Histogram()
+        self.requests = 0
+        self.errors = Counter()
+
+    @classmethod
+    def from_settings(cls, name, http):
+        """
+        Создает клиент с параметрами из настроек проекта.
+
+        Args:
+            name (str): Имя внешнего API.
+            http (httpx.AsyncClient): Общий HTTP-клиент.
+
+        Returns:
+            Upstream: Клиент, настроенный через UPSTREAM_* в settings.
+        """
+        return cls(
+            name, http,
+            retries=settings.UPSTREAM_RETRIES,
+            backoff=settings.UPSTREAM_RETRY_BACKOFF,
+            breaker=CircuitBreaker(settings.UPSTREAM_BREAKER_THRESHOLD, settings.UPSTREAM_BREAKER_RESET),
+        )
+
+    async def get(self, url, params=None):
+        """
+        Выполняет GET-запрос.
+
+        Ответы 4xx (кроме 429) считаются успешными для выключателя: API доступен, а разбирать ответ
+        должен вызывающий код.
+
+        Args:
+            url (str): Адрес запроса.
+            params (dict, optional): Параметры запроса.
+
+        Returns:
+            httpx.Response: Ответ API.
+
+        Raises:
+            CircuitOpenError: Если выключатель разомкнут.
+            httpx.HTTPError: Если запрос не удался после всех повторов.
+        """
+        self.requests += 1
+        if not self.breaker.allow():
+            self.errors['circuit_open'] += 1
+            raise CircuitOpenError(f'{self.name}: circuit open')
+
+        try:
+            return await self._get(url, params)
+        except asyncio.CancelledError:
+            # Отмененный пробный запрос не должен оставить выключатель в состоянии half_open навсегда.
+            if self.breaker.state == HALF_OPEN:
+                self.breaker.record_failure()
+            raise
+
+    async def _get(self, url, params):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.http.get(url, params=params)
+            except httpx.TransportError as e:
+                self.latency.observe(time.perf_counter() - started)
+                self.errors[self._error_kind(e)] += 1
+                error = e
+            else:
+                self.latency.observe(time.perf_counter() - started)
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                self.errors['status_429' if response.status_code == 429 else 'status_5xx'] += 1
+                error = httpx.HTTPStatusError(f'{self.name}: HTTP {response.status_code}',
+                                              request=response.request, response=response)
+
+            if attempt >= self.retries or self.breaker.state == HALF_OPEN:
+                break
+            attempt += 1
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+        self.errors['failed'] += 1
+        self.breaker.record_failure()
+        logger.warning('%s: запрос не удался после %d попыток: %s', self.name, attempt + 1, error)
+        raise error
+
+    def stats(self):
+        """
+        Возвращает показатели работы клиента.
+
+        Returns:
+            dict: Количество запросов, ошибки по видам, состояние выключателя и гистограмма длительности.
+        """
+        return {
+            'requests': self.requests,
+            'errors': dict(self.errors),
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+            'latency': self.latency.as_dict(),
+        }
+
+    @staticmethod
+    def _error_kind(error):
+        if isinstance(error, httpx.TimeoutException):
+            return 'timeout'
+        if isinstance(error, httpx.ConnectError):
+            return 'connect'
+        return 'network'
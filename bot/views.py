@@ -1,21 +1,45 @@
+import hmac
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import generics
-from .models import Message
-from .serializers import MessageSerializer
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from . import export, rollups
+from .broadcast import cancel_broadcast, create_broadcast
+from .commands import parse_command
+from .dashboard import dashboard_data
+from .filters import filter_messages
+from .ingest import ingest_messages
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+from .models import Broadcast, Message
+from .pagination import ArchiveKeysetPagination, KeysetPagination, SearchPagination
+from .parsers import NDJSONParser
+from .search import SEARCH_ORDERS, search_terms
+from .serializers import BroadcastSerializer, MessageSerializer, message_values, serialize_messages
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from .permissions import IsAdminOrReadOnly
+from .permissions import IsAdmin, IsAdminOrReadOnly
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count
 from rest_framework.permissions import AllowAny
 from .serializers import UserSerializer
+from .throttling import LoginRateThrottle, LoginUsernameRateThrottle
+from .webhook import get_dispatcher
 
 
 class MessageListCreateView(generics.ListCreateAPIView):
     """
     API-представление для просмотра списка сообщений и создания новых сообщений.
 
+    Список выводится постранично по курсору и фильтруется параметрами chat_id, user_id, command,
+    date_from и date_to. POST с JSON-массивом или потоком NDJSON (application/x-ndjson) создает
+    сообщения массово.
+
     Attributes:
         queryset (QuerySet): Набор объектов модели Message, полученных из базы данных.
         serializer_class (Serializer): Класс сериализатора для преобразования объектов Message в JSON и обратно.
@@ -23,10 +47,74 @@ class MessageListCreateView(generics.ListCreateAPIView):
                                    В данном случае используется пользовательское разрешение IsAdminOrReadOnly,
                                    которое позволяет администраторам выполнять любые действия, а остальным
                                    пользователям разрешены только запросы на чтение (GET, HEAD, OPTIONS).
+        pagination_class (BasePagination): Постраничный вывод по курсору, упорядоченный по (date, id).
+        parser_classes (list): Парсеры тела запроса; к стандартным добавлен NDJSONParser для массовой загрузки.
     """
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    parser_classes = [JSONParser, NDJSONParser, FormParser, MultiPartParser]
+
+    def get_queryset(self):
+        """
+        Возвращает сообщения, отфильтрованные по параметрам запроса.
+
+        Returns:
+            QuerySet: Отфильтрованный набор сообщений.
+        """
+        return filter_messages(super().get_queryset(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Обработчик GET-запроса для получения страницы сообщений.
+
+        Сообщения читаются из базы данных словарями и сериализуются функцией serialize_messages,
+        минуя создание объектов Message и полей сериализатора; JSON совпадает с MessageSerializer.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            Response: JSON-ответ со страницей сообщений и ссылкой на следующую страницу.
+        """
+        page = self.paginate_queryset(message_values(self.get_queryset()))
+        return self.get_paginated_response(serialize_messages(page))
+
+    def create(self, request, *args, **kwargs):
+        """
+        Обработчик POST-запроса для создания одного сообщения или массовой загрузки.
+
+        Если тело запроса - массив (JSON-массив или NDJSON), сообщения проверяются и сохраняются пачками
+        через ingest_messages; ошибки в отдельных строках не прерывают загрузку остальных.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            Response: Созданное сообщение или JSON-ответ вида {"created": количество, "errors": [...]},
+                      где каждая ошибка содержит номер строки (index) и ошибки ее полей (errors).
+                      Если сохранение прервала ошибка базы данных, ответ 503 дополнительно содержит
+                      номера несохраненных корректных строк (unsaved), которые нужно загрузить повторно.
+        """
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        created, errors, unsaved = ingest_messages(request.data)
+        if unsaved:
+            return Response({'detail': 'Database is unavailable, retry the unsaved rows', 'created': created,
+                             'errors': errors, 'unsaved': unsaved}, status=503)
+        return Response({'created': created, 'errors': errors}, status=400 if errors and not created else 201)
+
+    def perform_create(self, serializer):
+        """
+        Сохраняет новое сообщение и учитывает его в агрегатах дашборда.
+
+        Args:
+            serializer (MessageSerializer): Проверенный сериализатор с данными сообщения.
+        """
+        with transaction.atomic():
+            message = serializer.save()
+            rollups.record([message])
 
 
 class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -45,6 +133,43 @@ class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Обработчик GET-запроса для получения сообщения по идентификатору.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            Response: JSON-ответ с сообщением, сериализованным функцией serialize_messages.
+        """
+        message = get_object_or_404(message_values(self.get_queryset()), pk=kwargs['pk'])
+        self.check_object_permissions(request, message)
+        return Response(serialize_messages([message])[0])
+
+    def perform_update(self, serializer):
+        """
+        Сохраняет изменения сообщения и переносит его в агрегатах, если изменилась команда.
+
+        Args:
+            serializer (MessageSerializer): Проверенный сериализатор с изменениями сообщения.
+        """
+        old_command = serializer.instance.command
+        with transaction.atomic():
+            message = serializer.save()
+            rollups.reclassify(message, old_command)
+
+    def perform_destroy(self, instance):
+        """
+        Удаляет сообщение и вычитает его из агрегатов дашборда.
+
+        Args:
+            instance (Message): Удаляемое сообщение.
+        """
+        with transaction.atomic():
+            instance.delete()
+            rollups.forget([instance])
+
 
 class TokenObtainPairView(APIView):
     """
@@ -54,8 +179,12 @@ class TokenObtainPairView(APIView):
         permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
                                    В данном случае используется разрешение AllowAny, которое позволяет всем
                                    пользователям (аутентифицированным и неаутентифицированным) выполнять запросы к представлению.
+        throttle_classes (list): Ограничения частоты попыток с одного IP-адреса и под одним именем пользователя
+                                 с одного IP-адреса (DEFAULT_THROTTLE_RATES "login" и "login_username"),
+                                 ответ 429 при превышении.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
 
     def post(self, request, format=None):
         """
@@ -83,6 +212,9 @@ class MessageHistoryView(APIView):
     """
     API-представление для просмотра истории всех сообщений.
 
+    История выводится постранично по курсору и фильтруется теми же параметрами, что и список сообщений.
+    Сообщения, перенесенные командой archive_messages в архив, читаются из файлов архива.
+
     Attributes:
         permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
                                    В данном случае используется разрешение IsAuthenticated, которое позволяет
@@ -98,11 +230,127 @@ class MessageHistoryView(APIView):
             request (Request): Объект запроса.
 
         Returns:
-            Response: JSON-ответ со списком всех сообщений из базы данных, сериализованных с помощью MessageSerializer.
+            Response: JSON-ответ со страницей сообщений, сериализованных с помощью serialize_messages,
+                      и ссылкой на следующую страницу.
         """
-        messages = Message.objects.all()
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        paginator = ArchiveKeysetPagination()
+        messages = filter_messages(Message.objects.all(), request.query_params)
+        page = paginator.paginate_queryset(message_values(messages), request, view=self)
+        return paginator.get_paginated_response(serialize_messages(page))
+
+
+class MessageSearchView(APIView):
+    """
+    API-представление для полнотекстового поиска по тексту сообщений.
+
+    Параметр q содержит слова для поиска: каждое слово должно встречаться в сообщении, окончания русских
+    слов и различие "е"/"ё" и регистра не учитываются. Результаты упорядочены по релевантности (order=rank)
+    или сначала новые (order=date), выводятся постранично по курсору и фильтруются теми же параметрами,
+    что и история сообщений. Поиск выполняется только по таблице Message (без сообщений, перенесенных
+    в архив).
+
+    Attributes:
+        permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
+                                   В данном случае используется разрешение IsAuthenticated, которое позволяет
+                                   выполнять запросы к представлению только аутентифицированным пользователям.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Обработчик GET-запроса для поиска сообщений.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            Response: JSON-ответ со страницей найденных сообщений (с релевантностью в поле rank при order=rank)
+                      и ссылкой на следующую страницу или ошибка 400, если запрос не содержит слов.
+        """
+        if not search_terms(request.query_params.get('q', '')):
+            return Response({'q': 'Укажите слова для поиска.'}, status=400)
+        if request.query_params.get('order', 'rank') not in SEARCH_ORDERS:
+            return Response({'order': f'Допустимые значения: {", ".join(SEARCH_ORDERS)}.'}, status=400)
+        paginator = SearchPagination()
+        messages = filter_messages(Message.objects.all(), request.query_params)
+        page = paginator.paginate_queryset(messages, request, view=self)
+        ranked = request.query_params.get('order', 'rank') == 'rank'
+        for row in page:
+            score = row.pop('score')
+            if ranked:
+                row['rank'] = round(-score, 6)
+        return paginator.get_paginated_response(serialize_messages(page))
+
+
+class MessageExportView(APIView):
+    """
+    API-представление для потоковой выгрузки истории сообщений в NDJSON или CSV.
+
+    Сообщения читаются из базы данных кусками и отдаются клиенту по мере чтения, поэтому расход памяти
+    не зависит от размера таблицы. Строки упорядочены по id; прерванную выгрузку можно продолжить,
+    передав after_id последней полученной строки. Сообщения, перенесенные в архив, читаются из файлов архива.
+
+    Attributes:
+        permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
+                                   В данном случае используется разрешение IsAuthenticated, которое позволяет
+                                   выполнять запросы к представлению только аутентифицированным пользователям.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Обработчик GET-запроса для выгрузки сообщений.
+
+        Параметры запроса: output ("ndjson" или "csv"), gzip ("1" для сжатия), after_id, а также фильтры
+        chat_id, user_id, command, date_from и date_to.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            StreamingHttpResponse: Поток с выгрузкой сообщений.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.FORMATS:
+            return Response({'output': f'Допустимые значения: {", ".join(export.FORMATS)}.'}, status=400)
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        try:
+            after_id = int(request.query_params['after_id']) if request.query_params.get('after_id') else None
+        except ValueError:
+            return Response({'after_id': 'Ожидается целое число.'}, status=400)
+
+        messages = filter_messages(Message.objects.all(), request.query_params)
+        rows = export.export_rows_with_archive(messages, request.query_params, after_id)
+        stream = export.export_stream(rows, output, compress)
+        if isinstance(request._request, ASGIRequest):
+            stream = iterate_in_thread(stream)
+
+        filename = f'messages.{output}' + ('.gz' if compress else '')
+        response = StreamingHttpResponse(
+            stream, content_type='application/gzip' if compress else export.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+async def iterate_in_thread(iterator):
+    """
+    Оборачивает синхронный итератор в асинхронный, выполняя каждый шаг в потоке для синхронного кода.
+
+    Под ASGI Django иначе считывает синхронный итератор StreamingHttpResponse целиком в память.
+
+    Args:
+        iterator (iterator): Синхронный итератор блоков.
+
+    Returns:
+        AsyncIterator: Те же блоки.
+    """
+    done = object()
+    step = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await step(iterator, done)
+        if chunk is done:
+            break
+        yield chunk
 
 
 class MessageUpdateView(APIView):
@@ -120,6 +368,9 @@ class MessageUpdateView(APIView):
         """
         Обработчик PUT-запроса для обновления отдельного сообщения.
 
+        Если команда не указана явно, команда и аргумент заново определяются по тексту сообщения;
+        явно указанная команда сбрасывает аргумент.
+
         Args:
             request (Request): Объект запроса.
             pk (int): Первичный ключ (id) сообщения, которое нужно обновить.
@@ -128,10 +379,19 @@ class MessageUpdateView(APIView):
             Response: JSON-ответ с обновленными данными сообщения из базы данных, сериализованными с помощью MessageSerializer.
         """
         message = Message.objects.get(pk=pk)
+        old_command = message.command
 
         message.text = request.data.get('text', message.text)
-        message.command = request.data.get('command', message.command)
-        message.save()
+        command = request.data.get('command')
+        if command:
+            # Аргумент относился к прежней команде.
+            message.command, message.argument = command, None
+        elif 'text' in request.data or 'command' in request.data:
+            # Как в MessageSerializer.validate: без явной команды команда и аргумент определяются по тексту.
+            message.command, message.argument = parse_command(message.text)
+        with transaction.atomic():
+            message.save()
+            rollups.reclassify(message, old_command)
 
         serializer = MessageSerializer(message)
         return Response(serializer.data)
@@ -141,6 +401,10 @@ class DashboardView(APIView):
     """
     API-представление для отображения данных на дашборде.
 
+    Данные читаются из агрегатов MessageRollup и реестра чатов, которые обновляются при сохранении
+    сообщений, поэтому время ответа не зависит от размера таблицы Message. Те же данные с изменениями
+    в реальном времени отдает WebSocket /ws/dashboard/ (DashboardConsumer).
+
     Attributes:
         permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
                                    В данном случае используется разрешение IsAuthenticated, которое позволяет
@@ -156,20 +420,11 @@ class DashboardView(APIView):
             request (Request): Объект запроса.
 
         Returns:
-            Response: JSON-ответ с данными для отображения на дашборде, такими как количество активных диалогов,
-                      статистика по количеству запросов и наиболее популярные команды.
+            Response: JSON-ответ с данными для отображения на дашборде: количество чатов, писавших боту
+                      за последние DASHBOARD_WINDOW_HOURS часов, количество запросов по часам за этот период
+                      и наиболее популярные команды.
         """
-        active_dialogs = Message.objects.filter(is_active=True).count()
-        request_counts = Message.objects.values('timestamp').annotate(count=Count('id'))
-        popular_commands = Message.objects.values('command').annotate(count=Count('id')).order_by('-count')[:5]
-
-        dashboard_data = {
-            'active_dialogs': active_dialogs,
-            'request_counts': request_counts,
-            'popular_commands': popular_commands,
-        }
-
-        return Response(dashboard_data)
+        return Response(dashboard_data())
 
 
 class UserRegistrationView(APIView):
@@ -180,8 +435,12 @@ class UserRegistrationView(APIView):
         permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
                                    В данном случае используется разрешение AllowAny, которое позволяет
                                    выполнять запросы к представлению без аутентификации.
+        throttle_classes (list): Ограничения частоты попыток с одного IP-адреса и под одним именем пользователя
+                                 с одного IP-адреса (DEFAULT_THROTTLE_RATES "login" и "login_username"),
+                                 ответ 429 при превышении.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
 
     def post(self, request):
         """
@@ -212,8 +471,12 @@ class UserLoginView(APIView):
         permission_classes (list): Список классов разрешений для определения прав доступа к представлению.
                                    В данном случае используется разрешение AllowAny, которое позволяет
                                    выполнять запросы к представлению без аутентификации.
+        throttle_classes (list): Ограничения частоты попыток с одного IP-адреса и под одним именем пользователя
+                                 с одного IP-адреса (DEFAULT_THROTTLE_RATES "login" и "login_username"),
+                                 ответ 429 при превышении.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
 
     def post(self, request):
         """
@@ -238,3 +501,147 @@ class UserLoginView(APIView):
             }, status=200)
 
         return Response({'detail': 'Invalid credentials'}, status=401)
+
+
+class TelegramWebhookView(APIView):
+    """
+    API-представление для приема обновлений Telegram в режиме webhook.
+
+    Проверяет секретный токен из заголовка X-Telegram-Bot-Api-Secret-Token, ставит обновление в очередь
+    и сразу отвечает 200; обработка команд выполняется в фоне диспетчером webhook.
+
+    Attributes:
+        authentication_classes (list): Пустой список - Telegram не передает JWT, проверяется только секретный токен.
+        permission_classes (list): Список классов разрешений. Используется AllowAny.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """
+        Обработчик POST-запроса с обновлением Telegram.
+
+        Args:
+            request (Request): Объект запроса с обновлением в формате JSON Bot API.
+
+        Returns:
+            Response: Пустой ответ 200, если обновление принято; 403 при неверном секретном токене;
+                      400 при некорректном теле запроса; 503, если очередь обработки переполнена
+                      или приложение бота не удалось запустить.
+        """
+        secret = settings.TELEGRAM_WEBHOOK_SECRET
+        token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not secret or not hmac.compare_digest(token.encode(), secret.encode()):
+            return Response({'detail': 'Invalid secret token'}, status=403)
+
+        if not isinstance(request.data, dict) or 'update_id' not in request.data:
+            return Response({'detail': 'Invalid update'}, status=400)
+
+        try:
+            dispatcher = get_dispatcher()
+        except Exception:
+            return Response({'detail': 'Bot is unavailable'}, status=503)
+
+        if not dispatcher.submit(request.data):
+            return Response({'detail': 'Queue is full'}, status=503)
+
+        return Response(status=200)
+
+
+class BroadcastListCreateView(generics.ListCreateAPIView):
+    """
+    API-представление для просмотра рассылок и создания новой рассылки по всем известным чатам.
+
+    Созданную рассылку выполняет работающий бот (или команда broadcast --resume); ход выполнения
+    отражается в счетчиках sent, blocked, failed и last_chat_id.
+
+    Attributes:
+        queryset (QuerySet): Рассылки, начиная с последней.
+        serializer_class (Serializer): Класс сериализатора рассылок.
+        permission_classes (list): Список классов разрешений. Используется IsAdmin - только администраторы.
+    """
+    queryset = Broadcast.objects.order_by('-id')
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAdmin]
+
+    def perform_create(self, serializer):
+        """
+        Создает рассылку с количеством чатов на момент создания.
+
+        Args:
+            serializer (BroadcastSerializer): Проверенный сериализатор с текстом рассылки.
+        """
+        serializer.instance = create_broadcast(serializer.validated_data['text'])
+
+
+class BroadcastDetailView(generics.RetrieveAPIView):
+    """
+    API-представление для просмотра состояния рассылки.
+
+    Attributes:
+        queryset (QuerySet): Набор рассылок.
+        serializer_class (Serializer): Класс сериализатора рассылок.
+        permission_classes (list): Список классов разрешений. Используется IsAdmin - только администраторы.
+    """
+    queryset = Broadcast.objects.all()
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAdmin]
+
+
+class BroadcastCancelView(APIView):
+    """
+    API-представление для отмены рассылки.
+
+    Attributes:
+        permission_classes (list): Список классов разрешений. Используется IsAdmin - только администраторы.
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request, pk):
+        """
+        Обработчик POST-запроса для отмены рассылки. Выполняющая рассылку задача останавливается
+        после текущего куска чатов.
+
+        Args:
+            request (Request): Объект запроса.
+            pk (int): Идентификатор рассылки.
+
+        Returns:
+            Response: JSON-ответ с рассылкой; 404, если рассылка не найдена; 409, если она уже завершена.
+        """
+        broadcast = get_object_or_404(Broadcast, pk=pk)
+        if not cancel_broadcast(broadcast.pk):
+            return Response({'detail': f'Broadcast is already {broadcast.status}'}, status=409)
+        broadcast.refresh_from_db()
+        return Response(BroadcastSerializer(broadcast).data)
+
+
+class MetricsView(APIView):
+    """
+    API-представление с показателями процесса в текстовом формате Prometheus.
+
+    Attributes:
+        authentication_classes (list): Пустой список - Prometheus не передает JWT; если задан METRICS_TOKEN,
+                                       проверяется заголовок Authorization: Bearer <METRICS_TOKEN>.
+        permission_classes (list): Список классов разрешений. Используется AllowAny.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        """
+        Обработчик GET-запроса для получения показателей.
+
+        Args:
+            request (Request): Объект запроса.
+
+        Returns:
+            HttpResponse: Показатели запросов к API, соединений с базой данных и бота в режиме webhook;
+                          403 при неверном токене.
+        """
+        token = settings.METRICS_TOKEN
+        if token:
+            header = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+                return Response({'detail': 'Invalid metrics token'}, status=403)
+        return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,223 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+class CacheStats:
+    """
+    Счетчики работы кэша погоды.
+
+    Attributes:
+        hits (int): Количество запросов, обслуженных из локального кэша.
+        shared_hits (int): Количество запросов, обслуженных из общего кэша (Django cache).
+        misses (int): Количество промахов, для которых пришлось обращаться к источнику.
+        negative_hits (int): Сколько из попаданий пришлось на запись о несуществующем городе.
+        coalesced (int): Количество запросов, дождавшихся уже выполняющейся загрузки того же города.
+        evictions (int): Количество записей, вытесненных по LRU.
+        stale_hits (int): Количество запросов, обслуженных устаревшей записью из-за ошибки источника.
+    """
+
+    FIELDS = ('hits', 'shared_hits', 'misses', 'negative_hits', 'coalesced', 'evictions', 'stale_hits')
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def as_dict(self):
+        """
+        Возвращает текущие значения счетчиков.
+
+        Returns:
+            dict: Словарь вида {имя счетчика: значение}.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class WeatherCache:
+    """
+    Кэш ответов OpenWeatherMap с ограничением размера (LRU) и временем жизни записей.
+
+    Ключом служит нормализованное название города. Если источник сообщил, что город не найден
+    (загрузчик вернул None), это тоже кэшируется, но на более короткий срок. Одновременные промахи
+    по одному городу объединяются в один запрос к источнику. При указании общего бэкенда
+    (алиас из settings.CACHES) записи дополнительно хранятся в нем, чтобы несколько процессов бота
+    пользовались одним кэшем. Если источник недоступен, в течение stale_ttl секунд после истечения
+    срока жизни записи возвращается последнее известное значение.
+
+    Кэш рассчитан на работу в одном цикле событий asyncio и не является потокобезопасным.
+
+    Attributes:
+        maxsize (int): Максимальное количество записей в локальном кэше.
+        ttl (float): Время жизни записи о найденном городе, в секундах.
+        negative_ttl (float): Время жизни записи о ненайденном городе, в секундах.
+        stale_ttl (float): Сколько секунд после истечения срока жизни запись может использоваться
+                           при ошибке источника (0 - не использовать устаревшие записи).
+        backend (BaseCache, optional): Общий кэш Django или None.
+        stats (CacheStats): Счетчики попаданий, промахов и вытеснений.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600, negative_ttl=60, stale_ttl=0, backend=None, key_prefix='weather:'):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.key_prefix = key_prefix
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает кэш с параметрами из настроек проекта.
+
+        Returns:
+            WeatherCache: Кэш, настроенный через WEATHER_CACHE_* в settings.
+        """
+        backend = None
+        if settings.WEATHER_CACHE_ALIAS:
+            from django.core.cache import caches
+            backend = caches[settings.WEATHER_CACHE_ALIAS]
+        return cls(
+            maxsize=settings.WEATHER_CACHE_MAX_ENTRIES,
+            ttl=settings.WEATHER_CACHE_TTL,
+            negative_ttl=settings.WEATHER_CACHE_NEGATIVE_TTL,
+            stale_ttl=settings.WEATHER_CACHE_STALE_TTL,
+            backend=backend,
+        )
+
+    @staticmethod
+    def normalize(city):
+        """
+        Приводит название города к виду, используемому в качестве ключа.
+
+        Args:
+            city (str): Название города в том виде, в котором его ввел пользователь.
+
+        Returns:
+            str: Название без лишних пробелов, в нижнем регистре и с "ё", замененной на "е".
+        """
+        return ' '.join(city.split()).casefold().replace('ё', 'е')
+
+    async def get_or_load(self, city, loader):
+        """
+        Возвращает данные о погоде из кэша или загружает их.
+
+        Args:
+            city (str): Название города.
+            loader (callable): Корутинная функция, принимающая нормализованное название города и
+                               возвращающая данные о погоде или None, если город не найден. Исключения
+                               загрузчика не кэшируются: если есть устаревшая запись не старше stale_ttl,
+                               возвращается она, иначе исключение пробрасывается всем ожидающим вызовам.
+
+        Returns:
+            Данные, которые вернул загрузчик (None для несуществующего города).
+        """
+        key = self.normalize(city)
+
+        entry = self._get_local(key)
+        if entry is not None:
+            self.stats.hits += 1
+            return self._unpack(entry)
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(flight)
+
+        flight = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            entry = await self._get_shared(key)
+            if entry is not None:
+                self.stats.shared_hits += 1
+                self._set_local(key, entry)
+                value = self._unpack(entry)
+            else:
+                self.stats.misses += 1
+                value = await loader(key)
+                await self.set(key, value)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            stale = self._get_stale(key)
+            if stale is not None:
+                self.stats.stale_hits += 1
+                flight.set_result(stale)
+                return stale
+            flight.set_exception(e)
+            # Исключение уже получил текущий вызов; помечаем его полученным и для future,
+            # чтобы при отсутствии ожидающих asyncio не ругался на непрочитанную ошибку.
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def set(self, city, value):
+        """
+        Сохраняет данные о погоде для города.
+
+        Args:
+            city (str): Название города.
+            value: Данные о погоде или None, если город не найден.
+        """
+        key = self.normalize(city)
+        ttl = self.negative_ttl if value is None else self.ttl
+        entry = (time.time() + ttl, value)
+        self._set_local(key, entry)
+        if self.backend is not None:
+            await sync_to_async(self.backend.set, thread_sensitive=False)(self.key_prefix + key, entry, timeout=ttl)
+
+    def clear(self):
+        """
+        Очищает локальный кэш. Общий бэкенд не затрагивается.
+        """
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            # Истекшая запись остается в LRU до вытеснения, чтобы ее можно было вернуть при ошибке источника.
+            if entry[0] + self.stale_ttl <= time.time():
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_stale(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[1] is None or entry[0] + self.stale_ttl <= time.time():
+            return None
+        return entry[1]
+
+    def _set_local(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def _get_shared(self, key):
+        if self.backend is None:
+            return None
+        entry = await sync_to_async(self.backend.get, thread_sensitive=False)(self.key_prefix + key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry
+
+    def _unpack(self, entry):
+        if entry[1] is None:
+            self.stats.negative_hits += 1
+        return entry[1]
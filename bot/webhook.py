@@ -0,0 +1,121 @@
+import asyncio
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from telegram import Update
+
+from . import runtime
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """
+    Обработка обновлений, полученных через webhook, внутри процесса веб-сервера.
+
+    Приложение бота работает в отдельном потоке со своим циклом событий. Представление webhook
+    только кладет обновление в очередь приложения и сразу отвечает Telegram, а обработчики команд
+    выполняются пулом задач python-telegram-bot с ограничением settings.BOT_CONCURRENCY.
+
+    Attributes:
+        application (Application): Приложение бота без Updater.
+        max_queue (int): Максимальная длина очереди необработанных обновлений.
+    """
+
+    def __init__(self, token, base_url=None, max_queue=None):
+        self.application = runtime.build_application(token, base_url=base_url, polling=False)
+        self.max_queue = max_queue or settings.TELEGRAM_WEBHOOK_MAX_QUEUE
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='telegram-webhook', daemon=True)
+        self._started = threading.Event()
+        self._error = None
+
+    def start(self):
+        """
+        Запускает поток с приложением бота и дожидается его готовности.
+
+        Raises:
+            Exception: Ошибка запуска приложения (например, неверный токен или сбой getMe); поток при этом
+                       завершается.
+        """
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, timeout=30):
+        """
+        Останавливает приложение, дожидаясь завершения уже начатых обработчиков.
+
+        Args:
+            timeout (float): Максимальное время ожидания, в секундах.
+        """
+        if not self._thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(runtime.stop(self.application), self._loop)
+        try:
+            future.result(timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+
+    def submit(self, data):
+        """
+        Ставит обновление в очередь обработки.
+
+        Args:
+            data (dict): Обновление в формате JSON Bot API.
+
+        Returns:
+            bool: True, если обновление принято; False, если очередь переполнена.
+        """
+        if self.application.update_queue.qsize() >= self.max_queue:
+            return False
+        self._loop.call_soon_threadsafe(self._enqueue, data)
+        return True
+
+    def _enqueue(self, data):
+        update = Update.de_json(data, self.application.bot)
+        self.application.update_queue.put_nowait(update)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(runtime.start(self.application, polling=False))
+        except Exception as e:
+            logger.exception('Не удалось запустить приложение бота для webhook')
+            self._error = e
+        finally:
+            self._started.set()
+        if self._error is None:
+            self._loop.run_forever()
+        self._loop.close()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """
+    Возвращает общий для процесса диспетчер webhook, запуская его при первом обращении.
+
+    Если запуск не удался, диспетчер не сохраняется, и следующее обращение запускает его заново.
+
+    Returns:
+        WebhookDispatcher: Запущенный диспетчер.
+
+    Raises:
+        Exception: Ошибка запуска приложения бота.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                dispatcher = WebhookDispatcher(settings.TELEGRAM_BOT_TOKEN, base_url=settings.TELEGRAM_BOT_API_URL)
+                dispatcher.start()
+                atexit.register(dispatcher.stop)
+                _dispatcher = dispatcher
+    return _dispatcher
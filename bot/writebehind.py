@@ -0,0 +1,205 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .ingest import save_messages
+
+logger = logging.getLogger(__name__)
+
+BEST_EFFORT = 'best_effort'
+FLUSH_BEFORE_REPLY = 'flush_before_reply'
+
+
+class BufferFullError(Exception):
+    """
+    Сообщение не поставлено в очередь на запись, потому что очередь переполнена.
+    """
+
+
+class MessageBuffer:
+    """
+    Буфер отложенной записи входящих сообщений в базу данных.
+
+    Сообщения накапливаются в очереди и сохраняются отдельным потоком через bulk_create одной
+    транзакцией, когда набирается max_batch сообщений или с момента первого сообщения пачки прошло
+    max_delay секунд. Если кто-то ждет сохранения конкретного сообщения (режим flush_before_reply),
+    пачка сохраняется сразу, без ожидания таймера.
+
+    Attributes:
+        max_batch (int): Максимальное количество сообщений в одной транзакции.
+        max_delay (float): Максимальное время ожидания пачки, в секундах.
+        max_queue (int): Максимальная длина очереди; при переполнении add не блокируется, а отбрасывает сообщение.
+        retries (int): Количество повторных попыток сохранения пачки при ошибке.
+    """
+
+    def __init__(self, max_batch=500, max_delay=1.0, max_queue=100000, retries=3):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.retries = retries
+        self.flushes = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self._queue = queue.Queue(max_queue)
+        self._stop = object()
+        self._thread = None
+        self._full = False
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает буфер с параметрами из настроек проекта.
+
+        Returns:
+            MessageBuffer: Буфер, настроенный через MESSAGE_BUFFER_* в settings.
+        """
+        return cls(
+            max_batch=settings.MESSAGE_BUFFER_MAX_BATCH,
+            max_delay=settings.MESSAGE_BUFFER_MAX_DELAY,
+            max_queue=settings.MESSAGE_BUFFER_MAX_QUEUE,
+        )
+
+    @property
+    def depth(self):
+        """
+        Количество сообщений, ожидающих записи.
+        """
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        Возвращает показатели работы буфера.
+
+        Returns:
+            dict: Длина очереди, количество сохранений и сообщений, количество отброшенных сообщений (не удалось
+                  сохранить или очередь была переполнена), время последнего, максимального и среднего
+                  сохранения пачки в секундах.
+        """
+        return {
+            'depth': self.depth,
+            'flushes': self.flushes,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'last_flush_seconds': self.last_flush_seconds,
+            'max_flush_seconds': self.max_flush_seconds,
+            'avg_flush_seconds': self.total_flush_seconds / self.flushes if self.flushes else 0.0,
+        }
+
+    def add(self, message, wait=False):
+        """
+        Ставит сообщение в очередь на запись.
+
+        Не блокируется, поэтому может вызываться из цикла событий бота: если база данных не успевает
+        и очередь переполнена, сообщение отбрасывается, а возвращаемый Future завершается BufferFullError.
+
+        Args:
+            message (Message): Несохраненный объект Message.
+            wait (bool): Сохранить пачку с этим сообщением сразу, не дожидаясь таймера.
+
+        Returns:
+            Future: Завершается после сохранения сообщения (или с исключением, если сохранить не удалось).
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((message, future, wait))
+        except queue.Full:
+            if not self._full:
+                logger.warning('Очередь записи сообщений переполнена (%d), сообщения отбрасываются', self.max_queue)
+            self._full = True
+            self.dropped += 1
+            future.set_exception(BufferFullError(f'message buffer is full ({self.max_queue})'))
+        else:
+            self._full = False
+        return future
+
+    def start(self):
+        """
+        Запускает поток записи.
+        """
+        self._thread = threading.Thread(target=self._run, name='message-buffer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Сохраняет все накопленные сообщения и останавливает поток записи.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания, в секундах.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(self._stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._stop:
+                break
+            batch = [item]
+            urgent = item[2]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    if urgent:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._stop:
+                    stopping = True
+                    break
+                batch.append(item)
+                urgent = urgent or item[2]
+            self._flush(batch)
+
+        rest = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._stop:
+                rest.append(item)
+        for i in range(0, len(rest), self.max_batch):
+            self._flush(rest[i:i + self.max_batch])
+        connection.close()
+
+    def _flush(self, batch):
+        close_old_connections()
+        messages = [message for message, _, _ in batch]
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                save_messages(messages)
+            except Exception as e:
+                if attempt == self.retries:
+                    self.dropped += len(batch)
+                    logger.exception('Не удалось сохранить %d сообщений', len(batch))
+                    for _, future, _ in batch:
+                        future.set_exception(e)
+                    return
+                close_old_connections()
+                time.sleep(0.1 * 2 ** attempt)
+            else:
+                break
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed += len(batch)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+        for _, future, _ in batch:
+            future.set_result(None)